@@ -0,0 +1,202 @@
+import numpy as np
+
+from config import MISSION_DURATION
+
+# ==========================================
+# STREAMING AGGREGATION
+# ==========================================
+
+# Resources summarized per day (mean + quantile bands)
+BAND_FIELDS = ('o2', 'battery', 'water', 'food')
+
+# Config attribute giving the upper end of each field's histogram range
+FIELD_CAPACITY = {
+    'o2': 'max_o2_tank',
+    'battery': 'max_battery',
+    'water': 'max_water_tank',
+    'food': 'max_food_storage',
+}
+
+
+class ExperimentAccumulator:
+    """
+    Online summary of an experiment: updated as each run (or batch of runs) finishes,
+    after which the trace can be thrown away. Memory is O(MISSION_DURATION) whatever the
+    number of runs.
+
+    - Survival curve: exact number of deaths per day.
+    - Failure causes: exact counts.
+    - Resource bands: per-day sum (mean) and a fixed-bin histogram per day (quantiles).
+      The histogram range is [0, tank capacity] with one underflow and one overflow bin,
+      so quantiles are accurate to one bin width (capacity / n_bins).
+
+    Accumulators with the same config are mergeable (merge()), e.g. one per worker.
+    """
+    def __init__(self, config, name=None, n_bins=200):
+        """
+        Args:
+            config (MCSimConfig): Config of the experiment (gives the histogram ranges).
+            name (str, optional): Label used in plots. Defaults to config.mode.
+            n_bins (int): Histogram bins per day and field.
+        """
+        self.name = name if name is not None else config.mode
+        self.n_bins = n_bins
+        self.n_runs = 0
+        self.n_survived = 0
+        self.deaths_by_day = np.zeros(MISSION_DURATION + 1, dtype=np.int64)
+        self.cause_counts = {}
+        self.metadata = {} # Free-form annotations (e.g. adaptive stopping report)
+
+        self.upper = {field: float(getattr(config, attr)) for field, attr in FIELD_CAPACITY.items()}
+        self.day_counts = np.zeros(MISSION_DURATION, dtype=np.int64)
+        self.sums = {field: np.zeros(MISSION_DURATION) for field in BAND_FIELDS}
+        self.histograms = {field: np.zeros((MISSION_DURATION, n_bins + 2), dtype=np.int64) for field in BAND_FIELDS}
+
+    # --- Updating ---
+
+    def _add_outcomes(self, survived, causes, day_ended):
+        survived = np.asarray(survived, dtype=bool)
+        self.n_runs += survived.size
+        self.n_survived += int(survived.sum())
+        self.deaths_by_day += np.bincount(np.asarray(day_ended)[~survived], minlength=MISSION_DURATION + 1)
+        for cause in np.asarray(causes, dtype=object)[~survived]:
+            self.cause_counts[cause] = self.cause_counts.get(cause, 0) + 1
+
+    def _add_samples(self, field, day_index, values):
+        """Adds daily samples (day_index is 0-based) to the mean and histogram of a field."""
+        values = np.asarray(values, dtype=np.float64)
+        self.sums[field] += np.bincount(day_index, weights=values, minlength=MISSION_DURATION)
+
+        # Bin 0 = underflow (< 0), bins 1..n_bins = [0, capacity], bin n_bins+1 = overflow
+        width = self.upper[field] / self.n_bins
+        bins = np.floor(values / width).astype(np.int64) + 1
+        np.clip(bins, 0, self.n_bins + 1, out=bins)
+        flat = day_index * (self.n_bins + 2) + bins
+        self.histograms[field] += np.bincount(flat, minlength=self.histograms[field].size).reshape(self.histograms[field].shape)
+
+    def update_traces(self, traces, summaries):
+        """
+        Adds runs recorded in a TraceRecorder.
+
+        Args:
+            traces (TraceRecorder): Daily traces of the runs.
+            summaries (list): (run_id, survived, cause, day_ended) per run.
+        """
+        if not summaries:
+            return
+        _, survived, causes, day_ended = zip(*summaries)
+        self._add_outcomes(survived, causes, day_ended)
+
+        rows = traces.offsets[traces.n_runs]
+        day_index = traces.columns['day'][:rows].astype(np.int64) - 1
+        self.day_counts += np.bincount(day_index, minlength=MISSION_DURATION)
+        for field in BAND_FIELDS:
+            self._add_samples(field, day_index, traces.columns[field][:rows])
+
+    def update_history(self, survived, causes, day_ended, history):
+        """
+        Adds runs from BatchMarsColony.run_mission() (field -> (days, n) arrays).
+        """
+        self._add_outcomes(survived, causes, day_ended)
+
+        valid = np.arange(1, MISSION_DURATION + 1)[:, None] <= np.asarray(day_ended)[None, :]
+        day_index = np.nonzero(valid)[0]
+        self.day_counts += valid.sum(axis=1)
+        for field in BAND_FIELDS:
+            self._add_samples(field, day_index, history[field][valid])
+
+    def merge(self, other):
+        """Adds the runs of another accumulator (same config) into this one."""
+        if other.n_bins != self.n_bins or other.upper != self.upper:
+            raise ValueError("Cannot merge accumulators with different histogram ranges")
+        self.n_runs += other.n_runs
+        self.n_survived += other.n_survived
+        self.deaths_by_day += other.deaths_by_day
+        for cause, count in other.cause_counts.items():
+            self.cause_counts[cause] = self.cause_counts.get(cause, 0) + count
+        self.day_counts += other.day_counts
+        for field in BAND_FIELDS:
+            self.sums[field] += other.sums[field]
+            self.histograms[field] += other.histograms[field]
+        return self
+
+    # --- Persistence ---
+
+    def to_arrays(self):
+        """Flat dict of arrays (e.g. for np.savez); inverse of from_arrays()."""
+        arrays = {
+            'n_runs': np.array(self.n_runs),
+            'n_survived': np.array(self.n_survived),
+            'deaths_by_day': self.deaths_by_day,
+            'day_counts': self.day_counts,
+            'cause_names': np.array(list(self.cause_counts.keys()), dtype=str),
+            'cause_values': np.array(list(self.cause_counts.values()), dtype=np.int64),
+        }
+        for field in BAND_FIELDS:
+            arrays[f'sum_{field}'] = self.sums[field]
+            arrays[f'hist_{field}'] = self.histograms[field]
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, config, arrays, name=None):
+        """Rebuilds an accumulator saved with to_arrays()."""
+        n_bins = arrays[f'hist_{BAND_FIELDS[0]}'].shape[1] - 2
+        accumulator = cls(config, name=name, n_bins=n_bins)
+        accumulator.n_runs = int(arrays['n_runs'])
+        accumulator.n_survived = int(arrays['n_survived'])
+        accumulator.deaths_by_day = np.array(arrays['deaths_by_day'])
+        accumulator.day_counts = np.array(arrays['day_counts'])
+        accumulator.cause_counts = dict(zip(arrays['cause_names'].tolist(), arrays['cause_values'].tolist()))
+        for field in BAND_FIELDS:
+            accumulator.sums[field] = np.array(arrays[f'sum_{field}'])
+            accumulator.histograms[field] = np.array(arrays[f'hist_{field}'])
+        return accumulator
+
+    # --- Results ---
+
+    @property
+    def success_rate(self):
+        return self.n_survived / self.n_runs if self.n_runs else float('nan')
+
+    def survival_curve(self):
+        """Survival probability (%) at day 0..MISSION_DURATION."""
+        alive = self.n_runs - np.cumsum(self.deaths_by_day)
+        return alive / self.n_runs * 100
+
+    def mean(self, field):
+        """Per-day mean of a field over the colonies still alive that day (NaN once none are)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sums[field] / self.day_counts
+
+    def quantile(self, field, q):
+        """
+        Per-day q-quantile of a field (linear interpolation inside the histogram bin).
+        Underflow/overflow samples are reported at the range edges.
+        """
+        hist = self.histograms[field]
+        cumulative = np.cumsum(hist, axis=1)
+        totals = cumulative[:, -1]
+        target = q * totals
+
+        # First bin whose cumulative count reaches the target
+        idx = (cumulative < target[:, None]).sum(axis=1)
+        idx = np.minimum(idx, self.n_bins + 1)
+        rows = np.arange(hist.shape[0])
+        before = np.where(idx > 0, cumulative[rows, np.maximum(idx - 1, 0)], 0)
+        in_bin = hist[rows, idx]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = np.where(in_bin > 0, (target - before) / in_bin, 0.0)
+
+        width = self.upper[field] / self.n_bins
+        values = (np.clip(idx - 1, 0, self.n_bins - 1) + np.clip(fraction, 0.0, 1.0)) * width
+        values = np.where(idx == 0, 0.0, values)
+        values = np.where(idx == self.n_bins + 1, self.upper[field], values)
+        return np.where(totals > 0, values, np.nan)
+
+    def band(self, field, lower=0.05, upper=0.95):
+        """(lower quantile, mean, upper quantile) per day."""
+        return self.quantile(field, lower), self.mean(field), self.quantile(field, upper)
+
+    def death_causes(self):
+        """Failure cause counts, sorted like run_experiment's report."""
+        return dict(sorted(self.cause_counts.items(), key=lambda item: item[0], reverse=True))
@@ -0,0 +1,302 @@
+import math
+import numpy as np
+
+from config import MISSION_DURATION, CREW_SIZE
+from traces import TRACE_COLUMNS
+
+# ==========================================
+# VECTORIZED BATCH SIMULATION
+# ==========================================
+
+# Cause of death codes (index into this tuple). 0 means the colony survived.
+CAUSES = ("", "Power Failure", "Suffocation", "Dehydration", "Starvation")
+
+# Fields recorded per day (same keys as MarsColony.run_mission history)
+HISTORY_FIELDS = ('o2', 'water', 'waste_water', 'food', 'crop_health', 'battery', 'storm')
+
+
+class BatchMarsColony:
+    """
+    Steps N independent colonies in lockstep with NumPy.
+    Every colony follows exactly the same daily logic as simulation.MarsColony.step(),
+    but the state of all colonies is stored in arrays and the random variables
+    (failures, repair times, storms, crop variability) are drawn in vectorized form.
+    Dead colonies are masked out and keep their final state.
+    """
+    def __init__(self, config, n_colonies, rng=None):
+        """
+        Args:
+            config (MCSimConfig): Simulation parameters (shared by every colony).
+            n_colonies (int): Number of colonies to simulate in lockstep.
+            rng (np.random.Generator, optional): Random generator. A fresh one is created if omitted.
+        """
+        self.cfg = config
+        self.n = n_colonies
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.day = 0
+
+        # Survival state
+        self.alive = np.ones(n_colonies, dtype=bool)
+        self.cause = np.zeros(n_colonies, dtype=np.int8) # Index into CAUSES
+        self.day_ended = np.zeros(n_colonies, dtype=np.int32)
+
+        # Resources
+        self.o2 = np.full(n_colonies, float(self.cfg.starting_o2))
+        self.water = np.full(n_colonies, float(self.cfg.starting_water))
+        self.waste_water = np.zeros(n_colonies)
+        self.battery = np.full(n_colonies, float(self.cfg.starting_battery))
+        self.food = np.full(n_colonies, float(self.cfg.starting_food))
+
+        # Systems
+        self.crop_health = np.ones(n_colonies)
+        self.is_storming = np.zeros(n_colonies, dtype=bool)
+        self.storm_counter = np.zeros(n_colonies, dtype=np.int32)
+
+        # Machines: one column per machine (in the same order MarsColony runs them)
+        self.oxy_broken = np.zeros((n_colonies, self.cfg.num_oxygenators), dtype=bool)
+        self.oxy_repair = np.zeros((n_colonies, self.cfg.num_oxygenators), dtype=np.int32)
+        self.rec_broken = np.zeros((n_colonies, self.cfg.num_water_reclaimers), dtype=bool)
+        self.rec_repair = np.zeros((n_colonies, self.cfg.num_water_reclaimers), dtype=np.int32)
+
+    def _sunlight_efficiency(self, Ls_degrees, is_storming, storm_counter):
+        """
+        Vectorized MarsEnvironment.get_sunlight_efficiency().
+        Updates the storm state arrays in place and returns the efficiency per colony.
+        """
+        # --- 1. SEASONAL VARIATION --- (same for every colony on a given day)
+        tau_base = 0.65 - 0.35 * math.sin(math.radians(Ls_degrees))
+
+        # --- 2. DUST STORM MODEL ---
+        # Storm decay phase for colonies already in a storm
+        in_storm = is_storming.copy()
+        storm_counter[in_storm] -= 1
+        is_storming[in_storm & (storm_counter <= 0)] = False
+
+        # Roll for new storms in the remaining colonies
+        peak_prob = 0.005
+        mu = 250
+        sigma = 40
+        daily_storm_prob = peak_prob * math.exp( - ((Ls_degrees - mu) ** 2) / (2 * sigma ** 2) )
+        if daily_storm_prob > 0.0001:
+            idle = np.flatnonzero(~in_storm)
+            starts = idle[self.rng.random(idle.size) < daily_storm_prob]
+            is_storming[starts] = True
+            storm_counter[starts] = self.rng.integers(5, 16, starts.size) # 5-15 days
+
+        # --- 3. TOTAL OPACITY --- (only two possible values per day)
+        clear_eff = max(0.02, math.exp(-tau_base))
+        storm_eff = max(0.02, math.exp(-(tau_base + 2.0)))
+        return np.where(in_storm, storm_eff, clear_eff)
+
+    def _run_machines(self, broken, repair, production_rate, mtbf, power_cost,
+                      available_power, current_storage, max_storage,
+                      input_resource_limit=None):
+        """
+        Vectorized MarsColony._run_machines().
+        Machines are processed column by column so the sequential power/storage/input
+        checks match the scalar engine exactly. Machine state arrays are updated in place.
+
+        Args:
+            broken (np.ndarray): (n, machines) broken flags.
+            repair (np.ndarray): (n, machines) remaining repair days.
+            production_rate (float): Production per machine per day.
+            mtbf (float): Mean Time Between Failures (days).
+            power_cost (float): Power cost per machine per day.
+            available_power (np.ndarray): Available power per colony.
+            current_storage (np.ndarray): Current amount of the output resource.
+            max_storage (float): Maximum capacity for the output resource.
+            input_resource_limit (np.ndarray, optional): Limit on input resource consumption.
+
+        Returns:
+            tuple: (produced amount, input consumed, power used) arrays
+        """
+        n = available_power.size
+        produced = np.zeros(n)
+        input_consumed = np.zeros(n)
+        power_used = np.zeros(n)
+        available_power = available_power.copy()
+        output_storage = current_storage.copy()
+        fail_prob = 1 - math.exp(-1 / mtbf)
+
+        for j in range(broken.shape[1]):
+            is_broken = broken[:, j]
+            days_to_repair = repair[:, j]
+
+            # Check power and storage (stop if full)
+            attempted = (available_power >= power_cost) & (output_storage < max_storage)
+
+            # --- Machine.daily_check() ---
+            # Broken machines count down their repair timer
+            repairing = attempted & is_broken
+            days_to_repair[repairing] -= 1
+            repaired = repairing & (days_to_repair <= 0)
+            is_broken[repaired] = False
+            days_to_repair[repaired] = 0
+
+            # Working machines roll for a random failure
+            working = np.flatnonzero(attempted & ~repairing)
+            failed = working[self.rng.random(working.size) < fail_prob]
+            is_broken[failed] = True
+            days_to_repair[failed] = np.ceil(self.rng.lognormal(1.0, 0.8, failed.size))
+
+            raw_prod = np.zeros(n)
+            raw_prod[working] = production_rate
+            raw_prod[failed] = 0.0
+
+            # Limit by input availability (waste water)
+            actual_prod = raw_prod
+            if input_resource_limit is not None:
+                actual_prod = np.minimum(raw_prod, input_resource_limit - input_consumed)
+
+            # It consumes power if it produced something OR if it's broken but tried to run
+            ran = attempted & ((actual_prod > 0) | ((raw_prod == 0) & is_broken))
+            actual_prod = np.where(ran, actual_prod, 0.0)
+            produced += actual_prod
+            input_consumed += actual_prod
+            output_storage += actual_prod
+            power_used[ran] += power_cost
+            available_power[ran] -= power_cost
+
+        return produced, input_consumed, power_used
+
+    def step(self):
+        """Simulates one day for every colony that is still alive"""
+        self.day += 1
+        cfg = self.cfg
+        live = np.flatnonzero(self.alive)
+        if live.size == 0:
+            return
+
+        # Gather the state of the living colonies
+        o2 = self.o2[live]
+        water = self.water[live]
+        waste_water = self.waste_water[live]
+        battery = self.battery[live]
+        food = self.food[live]
+        health = self.crop_health[live]
+        is_storming = self.is_storming[live]
+        storm_counter = self.storm_counter[live]
+        oxy_broken, oxy_repair = self.oxy_broken[live], self.oxy_repair[live]
+        rec_broken, rec_repair = self.rec_broken[live], self.rec_repair[live]
+
+        # --- 1. Environment & Power Generation ---
+        sun_eff = self._sunlight_efficiency(self.day % 360, is_storming, storm_counter)
+        power_gen = cfg.solar_capacity * sun_eff * 8
+
+        # --- 2. Base Consumption ---
+        total_power_need = np.full(live.size, cfg.daily_base_power_consumption)
+        available_power = battery + power_gen - total_power_need
+        total_o2_need = cfg.daily_o2_consumption * CREW_SIZE
+        total_water_need = cfg.daily_water_consumption * CREW_SIZE
+        total_food_need = cfg.daily_food_consumption * CREW_SIZE
+
+        # --- 3. Crop Production ---
+        crop_water_available = (water >= (total_water_need + cfg.crop_daily_water_need)) & (water > 0.055 * cfg.max_water_tank)
+        total_water_need = np.where(crop_water_available, total_water_need + cfg.crop_daily_water_need, total_water_need)
+
+        health = np.where(crop_water_available, health + 0.05, health - cfg.crop_decay_rate)
+        health = np.clip(health, 0.0, 1.0)
+        growing = np.flatnonzero(health > 0.0)
+        bio_factor = self.rng.normal(1.0, 0.1, growing.size)
+        food_produced = np.zeros(live.size)
+        crop_o2_produced = np.zeros(live.size)
+        food_produced[growing] = cfg.crop_food_production * health[growing] * bio_factor
+        crop_o2_produced[growing] = cfg.crop_o2_production * health[growing] * bio_factor
+
+        # --- 4. Waste Water ---
+        waste_water = waste_water + total_water_need * cfg.water_recycle_efficiency
+
+        # --- 5. Machine Operation ---
+        o2_produced, _, oxy_power = self._run_machines(
+            oxy_broken, oxy_repair,
+            cfg.o2_production_rate, cfg.oxygenator_mtbf, cfg.oxygenator_power_cost,
+            available_power,
+            current_storage=o2,
+            max_storage=cfg.max_o2_tank,
+            input_resource_limit=None
+        )
+        available_power -= oxy_power
+        total_power_need += oxy_power
+
+        water_reclaimed, waste_processed, water_power = self._run_machines(
+            rec_broken, rec_repair,
+            cfg.water_reclamation_rate, cfg.water_reclaimer_mtbf, cfg.water_reclaimer_power_cost,
+            available_power,
+            current_storage=water,
+            max_storage=cfg.max_water_tank,
+            input_resource_limit=waste_water
+        )
+        waste_water -= waste_processed
+        available_power -= water_power
+        total_power_need += water_power
+
+        # --- 6. Update Resources ---
+        battery = np.minimum(cfg.max_battery, battery + power_gen - total_power_need)
+        o2 = np.minimum(cfg.max_o2_tank, o2 + o2_produced + crop_o2_produced - total_o2_need)
+        water = np.minimum(cfg.max_water_tank, water + water_reclaimed - total_water_need)
+
+        food = food + food_produced
+        food *= (1 - cfg.food_spoilage_rate)
+        food -= total_food_need
+        food = np.minimum(cfg.max_food_storage, food)
+
+        # --- 7. Check Survival Conditions --- (same priority as MarsColony.step)
+        cause = np.select(
+            [battery < 0, o2 < 0, water < 0, food < 0],
+            [1, 2, 3, 4],
+            default=0
+        )
+
+        # Scatter the new state back
+        self.o2[live] = o2
+        self.water[live] = water
+        self.waste_water[live] = waste_water
+        self.battery[live] = battery
+        self.food[live] = food
+        self.crop_health[live] = health
+        self.is_storming[live] = is_storming
+        self.storm_counter[live] = storm_counter
+        self.oxy_broken[live], self.oxy_repair[live] = oxy_broken, oxy_repair
+        self.rec_broken[live], self.rec_repair[live] = rec_broken, rec_repair
+
+        self.day_ended[live] = self.day
+        died = cause > 0
+        self.cause[live[died]] = cause[died]
+        self.alive[live[died]] = False
+
+    def run_mission(self, record_history=True):
+        """
+        Runs the full MISSION_DURATION days or until every colony is dead.
+
+        Args:
+            record_history (bool or tuple): Whether to keep the daily trace of every colony,
+                or the fields to keep (e.g. RecordingPolicy.fields).
+
+        Returns:
+            tuple: (alive flags, cause codes, days ended, history)
+                history maps each recorded field (HISTORY_FIELDS by default) to a
+                (MISSION_DURATION, n) array, valid up to each colony's day ended
+                (or None if not recorded).
+        """
+        fields = HISTORY_FIELDS if record_history is True else tuple(record_history or ())
+        for field in fields:
+            if field not in HISTORY_FIELDS:
+                raise ValueError(f"Unknown history field: {field}")
+        history = None
+        if fields:
+            history = {
+                field: np.zeros((MISSION_DURATION, self.n), dtype=TRACE_COLUMNS[field])
+                for field in fields
+            }
+        # Batch attribute of each field (same name unless listed)
+        sources = {'storm': 'is_storming'}
+
+        for d in range(MISSION_DURATION):
+            if not self.alive.any():
+                break
+            self.step()
+            if history is not None:
+                for field, values in history.items():
+                    values[d] = getattr(self, sources.get(field, field))
+
+        return self.alive, self.cause, self.day_ended, history
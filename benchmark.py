@@ -0,0 +1,437 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from config import MCSimConfig, MISSION_DURATION, MODEL_VERSION
+from machine_bank import MachineBank
+from models import Machine, CropModule, MarsEnvironment
+from simulation import MarsColony
+from seeding import BlockRandom, make_run_rng
+from traces import TraceRecorder, RecordingPolicy, RECORD_ALL, RECORD_NONE
+
+# ==========================================
+# BENCHMARK SUITE
+# ==========================================
+#
+# python benchmark.py run --output benchmarks/baseline.json
+# ... change something ...
+# python benchmark.py run --output benchmarks/current.json
+# python benchmark.py compare benchmarks/baseline.json benchmarks/current.json --threshold 0.10
+
+# Figures are only rendered to files
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+default_output = os.path.join(script_dir, 'benchmarks', 'current.json')
+
+SEED = 2025
+
+# Metrics where a higher value is better (everything else, e.g. seconds and peak_mb, is lower-is-better)
+HIGHER_IS_BETTER = ('calls_per_sec', 'runs_per_sec', 'days_per_sec')
+
+# Memory differences below this are noise
+MIN_MEMORY_MB = 1.0
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a benchmark. The decorated setup(quick) prepares the inputs (not timed) and returns
+    the work() callable to time; work() returns its counts ('calls', 'runs', 'days').
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _measure(work, repeat):
+    """
+    Times work() (best of `repeat`), then runs it once more under tracemalloc for the peak memory.
+
+    Returns:
+        tuple: (best seconds, peak MB, value returned by work())
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = work()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    work()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 ** 2, result
+
+
+# --- Components ---
+
+# Random streams of the component benchmarks: random.Random, or BlockRandom (random_source='block')
+RANDOM_SOURCES = {"python": random.Random, "block": BlockRandom}
+
+
+def _suffix(source):
+    return "" if source == "python" else f"[{source}]"
+
+
+def _machine_benchmark(source):
+    def setup(quick):
+        n = 50_000 if quick else 500_000
+
+        def work():
+            machine = Machine("Oxy-0", 6.0, 120, rng=RANDOM_SOURCES[source](SEED))
+            check = machine.daily_check
+            for _ in range(n):
+                check()
+            return {'calls': n}
+        return work
+    return setup
+
+
+def _crops_benchmark(source):
+    def setup(quick):
+        n = 50_000 if quick else 500_000
+
+        def work():
+            crops = CropModule(25000.0, 0.79, 0.3, rng=RANDOM_SOURCES[source](SEED))
+            grow = crops.grow
+            for i in range(n):
+                grow(i % 7 != 0)
+            return {'calls': n}
+        return work
+    return setup
+
+
+def _environment_benchmark(source):
+    def setup(quick):
+        n_runs = 100 if quick else 1000
+
+        def work():
+            for run in range(n_runs):
+                env = MarsEnvironment(rng=RANDOM_SOURCES[source](run))
+                for day in range(1, MISSION_DURATION + 1):
+                    env.get_sunlight_efficiency(day % 360)
+            return {'calls': n_runs * MISSION_DURATION}
+        return work
+    return setup
+
+
+for _source in RANDOM_SOURCES:
+    benchmark(f'machine.daily_check{_suffix(_source)}')(_machine_benchmark(_source))
+    benchmark(f'crops.grow{_suffix(_source)}')(_crops_benchmark(_source))
+    benchmark(f'environment.get_sunlight_efficiency{_suffix(_source)}')(_environment_benchmark(_source))
+
+
+def _machine_group_benchmark(n_machines, model):
+    def setup(quick):
+        n_days = 200 if quick else 2000
+        rate, mtbf, power_cost = 6.0, 120, 1.0
+
+        if model == "bank":
+            bank = MachineBank(rng=np.random.default_rng(SEED))
+            bank.add('oxygenator', n_machines, rate, mtbf, power_cost)
+
+            def run_day():
+                bank.run('oxygenator', n_machines * power_cost, 0.0, float('inf'))
+        else:
+            colony = MarsColony(MCSimConfig("CONTROL"), rng=random.Random(SEED))
+            machines = [Machine(f"Oxy-{i}", rate, mtbf, rng=random.Random(SEED + i)) for i in range(n_machines)]
+
+            def run_day():
+                colony._run_machines(machines, power_cost, n_machines * power_cost, 0.0, float('inf'))
+
+        def work():
+            for _ in range(n_days):
+                run_day()
+            return {'calls': n_days, 'days': n_days}
+        return work
+    return setup
+
+
+# One machine group for a day: Machine objects vs MachineBank arrays, as the fleet grows
+for _n in (10, 100, 1000):
+    for _model in ("list", "bank"):
+        benchmark(f'machines.run_day[{_model}, n={_n}]')(_machine_group_benchmark(_n, _model))
+
+
+# --- Simulation ---
+
+def _step_benchmark(source):
+    def setup(quick):
+        n_runs = 20 if quick else 200
+        cfg = MCSimConfig("CONTROL", random_source=source)
+
+        def work():
+            days = 0
+            for run_id in range(n_runs):
+                colony = MarsColony(cfg, rng=make_run_rng(SEED, run_id))
+                step = colony.step
+                while colony.alive and colony.day < MISSION_DURATION:
+                    step()
+                days += colony.day
+            return {'calls': days, 'days': days}
+        return work
+    return setup
+
+
+for _source in RANDOM_SOURCES:
+    benchmark(f'colony.step{_suffix(_source)}')(_step_benchmark(_source))
+
+
+@benchmark('colony.run_mission')
+def _bench_run_mission(quick):
+    n_runs = 20 if quick else 200
+    cfg = MCSimConfig("CONTROL")
+
+    def work():
+        days = 0
+        for run_id in range(n_runs):
+            colony = MarsColony(cfg, rng=make_run_rng(SEED, run_id))
+            colony.run_mission()
+            days += colony.day
+        return {'runs': n_runs, 'days': days}
+    return work
+
+
+def _recorded_mission_benchmark(policy):
+    def setup(quick):
+        n_runs = 20 if quick else 200
+        cfg = MCSimConfig("CONTROL")
+
+        def work():
+            recorder = TraceRecorder(n_runs, policy=policy)
+            days = 0
+            for run_id in range(n_runs):
+                colony = MarsColony(cfg, rng=make_run_rng(SEED, run_id), run_id=run_id)
+                colony.run_mission(recorder=recorder)
+                days += colony.day
+            return {'runs': n_runs, 'days': days}
+        return work
+    return setup
+
+
+# Recording policies, from the full daily trace down to the summary only
+RECORDING_BENCHMARKS = {
+    'all': RECORD_ALL,
+    'o2': RecordingPolicy(('o2',)),
+    'o2/minmax-10': RecordingPolicy(('o2',), every=10, reduce="minmax"),
+    'events': RecordingPolicy((), events=True),
+    'none': RECORD_NONE,
+}
+for _name, _policy in RECORDING_BENCHMARKS.items():
+    benchmark(f'colony.run_mission[record={_name}]')(_recorded_mission_benchmark(_policy))
+
+
+def _experiment_benchmark(n_simulations, engine):
+    def setup(quick):
+        from experiment import run_experiment
+
+        n = max(10, n_simulations // 10) if quick else n_simulations
+
+        def work():
+            with contextlib.redirect_stdout(io.StringIO()):
+                df_summary, _ = run_experiment("CONTROL", n_simulations=n, engine=engine, seed=SEED)
+            return {'runs': n, 'days': int(df_summary['Day_Ended'].sum())}
+        return work
+    return setup
+
+
+for _n in (100, 1000):
+    benchmark(f'run_experiment[scalar, n={_n}]')(_experiment_benchmark(_n, "scalar"))
+for _n in (1000, 10000):
+    benchmark(f'run_experiment[batch, n={_n}]')(_experiment_benchmark(_n, "batch"))
+
+
+# --- Reporting ---
+
+_plot_inputs = {}
+
+
+def _plot_data(quick):
+    """Results of the five experiments, shared by the plotting benchmarks (not timed)."""
+    if quick not in _plot_inputs:
+        import pandas as pd
+        from experiment import run_experiment
+
+        n = 200 if quick else 2000
+        summaries, traces = [], {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for mode in ("CONTROL", "OXYGENATOR_REDUNDANCY_TEST", "BATTERY_TEST", "CROP_SUBSTRATE_TEST", "COMBINED_TEST"):
+                summary, traces[mode] = run_experiment(mode, n_simulations=n, engine="batch", seed=SEED)
+                summaries.append(summary)
+        _plot_inputs[quick] = pd.concat(summaries, ignore_index=True), traces
+    return _plot_inputs[quick]
+
+
+def _plot_benchmark(plot_name, args):
+    def setup(quick):
+        import matplotlib.pyplot as plt
+        import visualization
+
+        df_all, traces = _plot_data(quick)
+        plot = getattr(visualization, plot_name)
+        inputs = args(df_all, traces)
+
+        def work():
+            # Figures go to a scratch directory, not results/
+            with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+                saved_dir, visualization.output_dir = visualization.output_dir, tmp
+                try:
+                    plot(*inputs)
+                finally:
+                    visualization.output_dir = saved_dir
+                    plt.close('all')
+            return {'calls': 1}
+        return work
+    return setup
+
+
+benchmark('visualization.plot_survival_curves')(
+    _plot_benchmark('plot_survival_curves', lambda df, traces: (df,)))
+benchmark('visualization.plot_failure_analysis')(
+    _plot_benchmark('plot_failure_analysis', lambda df, traces: (df,)))
+benchmark('visualization.plot_redundancy_validation')(
+    _plot_benchmark('plot_redundancy_validation', lambda df, traces: (traces["CONTROL"], traces["OXYGENATOR_REDUNDANCY_TEST"])))
+benchmark('visualization.plot_battery_stability')(
+    _plot_benchmark('plot_battery_stability', lambda df, traces: (traces["CONTROL"], traces["BATTERY_TEST"])))
+
+
+# ==========================================
+# RUN / COMPARE
+# ==========================================
+
+def run_benchmarks(names=None, quick=False, repeat=3):
+    """
+    Runs the registered benchmarks.
+
+    Args:
+        names (list, optional): Substrings selecting benchmarks (all if omitted).
+        quick (bool): Smaller workloads (smoke test, not comparable with full runs).
+        repeat (int): Timing repetitions (the best one is kept).
+
+    Returns:
+        dict: {'meta': environment info, 'results': name -> metrics}
+    """
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        work = setup(quick)
+        seconds, peak_mb, counts = _measure(work, repeat)
+        metrics = {'seconds': seconds, 'peak_mb': peak_mb}
+        if 'calls' in counts:
+            metrics['calls_per_sec'] = counts['calls'] / seconds
+        if 'runs' in counts:
+            metrics['runs_per_sec'] = counts['runs'] / seconds
+        if 'days' in counts:
+            metrics['days_per_sec'] = counts['days'] / seconds
+        results[name] = metrics
+        rates = ", ".join(f"{key}={value:,.0f}" for key, value in metrics.items() if key.endswith('_per_sec'))
+        print(f"{name:<48} {seconds:9.4f}s  {peak_mb:8.1f} MB  {rates}")
+
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'model_version': MODEL_VERSION,
+        'quick': quick,
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compares two benchmark result sets.
+
+    Args:
+        baseline (dict): Output of run_benchmarks() (e.g. loaded from a JSON baseline).
+        current (dict): Output of run_benchmarks() to check.
+        threshold (float): Relative slowdown / memory growth above which a metric is a regression.
+
+    Returns:
+        list: (benchmark, metric, baseline value, current value, relative change, is regression)
+            relative change > 0 means worse.
+    """
+    if baseline['meta'].get('quick') != current['meta'].get('quick'):
+        print("Warning: comparing a quick run with a full run")
+
+    rows = []
+    for name, old_metrics in baseline['results'].items():
+        new_metrics = current['results'].get(name)
+        if new_metrics is None:
+            continue
+        for metric, old in old_metrics.items():
+            new = new_metrics.get(metric)
+            if new is None or old == 0:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                change = old / new - 1 if new > 0 else float('inf')
+            else:
+                change = new / old - 1
+            regression = change > threshold
+            if metric == 'peak_mb' and abs(new - old) < MIN_MEMORY_MB:
+                regression = False
+            rows.append((name, metric, old, new, change, regression))
+    return rows
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mars colony simulation benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the benchmarks and save the results as JSON")
+    run_parser.add_argument('--output', default=default_output, help="JSON file to write")
+    run_parser.add_argument('--filter', nargs='*', help="Only benchmarks whose name contains one of these")
+    run_parser.add_argument('--quick', action='store_true', help="Smaller workloads")
+    run_parser.add_argument('--repeat', type=int, default=3, help="Timing repetitions (best is kept)")
+
+    compare_parser = commands.add_parser('compare', help="Flag regressions against a baseline")
+    compare_parser.add_argument('baseline', help="Baseline JSON")
+    compare_parser.add_argument('current', help="JSON to check")
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help="Relative regression threshold")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run_benchmarks(args.filter, args.quick, args.repeat)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved: {args.output}")
+        return 0
+
+    rows = compare(_load(args.baseline), _load(args.current), args.threshold)
+    n_regressions = 0
+    for name, metric, old, new, change, regression in rows:
+        flag = "REGRESSION" if regression else ""
+        n_regressions += regression
+        print(f"{name:<48} {metric:<14} {old:14,.4f} -> {new:14,.4f}  {change:+7.1%}  {flag}")
+    print(f"{n_regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if n_regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
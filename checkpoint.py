@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+
+from aggregation import ExperimentAccumulator
+from result_store import runs_to_arrays, runs_from_arrays
+from seeding import new_master_seed
+
+# ==========================================
+# CHECKPOINT / RESUME
+# ==========================================
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+default_checkpoint_dir = os.path.join(script_dir, 'checkpoints')
+
+# Saved work unit: <first Run_ID>-<end Run_ID>.npz
+UNIT_PATTERN = re.compile(r"^(\d+)-(\d+)\.npz$")
+
+
+class Checkpoint:
+    """
+    On-disk progress of a campaign of experiments (run_experiment(checkpoint=...)), so an
+    interrupted campaign (preemption, Ctrl+C) can be resumed where it stopped.
+
+    Every completed work unit (a chunk of runs with the scalar engine, a batch with the
+    batch engine) is written to its own file, in Run_ID order, at most every `interval`
+    seconds and when the simulation stops (normally or by an exception). Files are written
+    to a temporary name and renamed, so a unit file is either complete or absent.
+
+    The random state needs no saving: every run (scalar engine) or batch (batch engine)
+    draws from a stream derived from the master seed and its first Run_ID, so the seed plus
+    the completed units is the whole state. Unseeded experiments get a master seed kept in
+    the checkpoint (master_seed()). On resume the saved units are loaded and only the
+    following ones are simulated, so a resumed experiment gives exactly the same results as
+    an uninterrupted one run with the same arguments.
+    """
+    def __init__(self, root=default_checkpoint_dir, interval=60.0):
+        """
+        Args:
+            root (str): Checkpoint directory (one per campaign).
+            interval (float): Minimum seconds between two writes.
+        """
+        self.root = root
+        self.interval = interval
+        self._pending = []
+        self._last_write = time.monotonic()
+        os.makedirs(root, exist_ok=True)
+
+    def master_seed(self):
+        """Master seed of the campaign (drawn and saved on first use)."""
+        path = os.path.join(self.root, 'campaign.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)['seed']
+        seed = new_master_seed()
+        _write_atomic(path, lambda f: f.write(json.dumps({'seed': seed}).encode()))
+        return seed
+
+    def clear(self):
+        """Deletes all saved progress (starts the campaign over)."""
+        self._pending = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    # --- Work units ---
+
+    def saved_units(self, key):
+        """Saved units of an experiment: first Run_ID -> (end Run_ID, path)."""
+        directory = os.path.join(self.root, key)
+        units = {}
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                match = UNIT_PATTERN.match(name)
+                if match:
+                    units[int(match.group(1))] = (int(match.group(2)), os.path.join(directory, name))
+        return units
+
+    def parts(self, key, cfg, first_run, n_runs, simulate, aggregate):
+        """
+        Work units of runs first_run..first_run+n_runs-1: the saved ones, then simulate(start, n)
+        for the rest, saving every unit it yields.
+
+        Args:
+            key (str): Experiment key (see ResultStore.key).
+            cfg (MCSimConfig): Config of the experiment (to rebuild accumulators).
+            first_run, n_runs (int): Runs requested.
+            simulate (callable): simulate(start, n) -> iterator of units of runs start..start+n-1.
+            aggregate (bool): Units are ExperimentAccumulators instead of (summary, TraceRecorder).
+
+        Yields:
+            Units in Run_ID order.
+        """
+        end = first_run + n_runs
+        start = first_run
+        saved = self.saved_units(key)
+        while start in saved and saved[start][0] <= end:
+            stop, path = saved[start]
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+            yield ExperimentAccumulator.from_arrays(cfg, arrays) if aggregate else runs_from_arrays(arrays)
+            start = stop
+        if start == end:
+            return
+        if start > first_run:
+            print(f"Resuming from checkpoint: {start - first_run} runs done, simulating {end - start} more")
+
+        directory = os.path.join(self.root, key)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            for part in simulate(start, end - start):
+                n = part.n_runs if aggregate else len(part[0]['survived'])
+                arrays = part.to_arrays() if aggregate else runs_to_arrays(*part)
+                self._pending.append((os.path.join(directory, f"{start}-{start + n}.npz"), arrays))
+                start += n
+                if time.monotonic() - self._last_write >= self.interval:
+                    self.flush()
+                yield part
+        finally:
+            # Also on KeyboardInterrupt / SystemExit: completed units are not lost
+            self.flush()
+
+    def flush(self):
+        """Writes the pending units (in Run_ID order)."""
+        for path, arrays in self._pending:
+            _write_atomic(path, lambda f: np.savez(f, **arrays))
+        self._pending = []
+        self._last_write = time.monotonic()
+
+
+def _write_atomic(path, write):
+    """Writes a file through a temporary file + rename (never leaves a partial file at `path`)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -6,11 +6,17 @@
 MISSION_DURATION = 500 # Days
 CREW_SIZE = 6
 
+# Bump whenever a change to the models/simulation can change results (invalidates cached results)
+MODEL_VERSION = "1.1"
+
 class MCSimConfig:
-    def __init__(self, mode="CONTROL"):
+    def __init__(self, mode="CONTROL", **overrides):
         """
         Parameters for the hypotheses.
         Modes: 'CONTROL', 'OXYGENATOR_REDUNDANCY_TEST', 'BATTERY_TEST', 'CROP_SUBSTRATE_TEST', 'COMBINED_TEST'
+
+        Any attribute can be overridden by keyword (applied after the mode settings),
+        e.g. MCSimConfig("CONTROL", num_oxygenators=2, solar_capacity=50.0).
         """
         self.mode = mode
         
@@ -36,7 +42,15 @@ class MCSimConfig:
         self.crop_o2_production = 0.79 # kg/day
         self.crop_decay_rate = 0.3 # Health decay rate without water
 
+        # --- Environment ---
+        self.environment_model = "daily" # 'daily' computation or 'scheduled' (season tables + storms sampled up front)
+
         # --- Default Machine Settings ---
+        self.failure_model = "daily" # 'daily' Bernoulli roll or 'next_event' (sampled time-to-failure)
+        self.machine_model = "objects" # 'objects' (one Machine per machine) or 'bank' (machine_bank.MachineBank arrays, for large fleets)
+
+        # --- Random Streams (scalar engine) ---
+        self.random_source = "python" # 'python' (random.Random draws) or 'block' (seeding.BlockRandom: normal/log-normal variates drawn by NumPy in blocks, uniforms unchanged; ~10% more colony-days/s in benchmark.py)
         
         # Oxygenators
         self.num_oxygenators = 1
@@ -77,3 +91,9 @@ class MCSimConfig:
             # Soil Farming Strategy
             self.crop_food_production = 20000.0
             self.crop_decay_rate = 0.05
+
+        # --- Overrides (parameter sweeps) ---
+        for name, value in overrides.items():
+            if name not in vars(self):
+                raise ValueError(f"Unknown MCSimConfig field: {name}")
+            setattr(self, name, value)
@@ -0,0 +1,350 @@
+import abc
+import argparse
+import itertools
+import os
+import pickle
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Executor, Future
+
+# ==========================================
+# DISTRIBUTED EXECUTION
+# ==========================================
+# A coordinator (ClusterExecutor) puts work units in a WorkQueue, worker processes on any
+# number of nodes (run_worker) claim them, run them and put back their result. A unit is a
+# pickled call of a module-level function (parallel.simulate_runs, parallel.simulate_batch,
+# sweep.simulate_point...), so workers only need the same code tree, and the ClusterExecutor
+# is a concurrent.futures.Executor: it plugs in wherever a process pool does
+# (run_experiment(executor=...), run_sweep(executor=...), find_cheapest_config(executor=...)).
+#
+# Determinism: every unit draws from streams derived from the master seed and its Run_IDs,
+# and results are merged in submission order (Executor.map), so the results do not depend
+# on the number of nodes, which node ran a unit or how many times.
+#
+# Lost units: a worker holds a lease on the unit it runs and renews it while the unit runs.
+# Units whose lease expired (node crash, network partition) go back to the queue and are
+# run again; a late duplicate result is ignored.
+
+
+class WorkQueue(abc.ABC):
+    """
+    Transport between a ClusterExecutor and its workers (interface).
+
+    Units and results are opaque bytes. A unit is either pending, claimed by one worker
+    (with a lease renewed by renew()) or done. Implementations must make claim() atomic:
+    a pending unit goes to exactly one worker.
+    """
+    def __init__(self, lease=60.0):
+        """
+        Args:
+            lease (float): Seconds a claimed unit is kept without renewal before it is
+                re-dispatched (use the same value on every node).
+        """
+        self.lease = lease
+
+    @abc.abstractmethod
+    def put(self, unit_id, payload):
+        """Adds a pending unit."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def claim(self, worker_id):
+        """Takes a pending unit: (unit_id, payload), or None if there is none."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def renew(self, unit_id, worker_id):
+        """Extends the lease of a claimed unit. Returns False if the worker lost it."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def complete(self, unit_id, worker_id, payload):
+        """Stores the result of a claimed unit and releases it."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def results(self, prefix=""):
+        """Takes the stored results of the units whose id starts with prefix: list of (unit_id, payload)."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def requeue_expired(self):
+        """Puts the claimed units whose lease expired back in the queue. Returns their ids."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cancel(self, unit_id):
+        """Removes a pending unit (no effect once it is claimed)."""
+        raise NotImplementedError
+
+
+class FileQueue(WorkQueue):
+    """
+    WorkQueue in a directory, for one machine or nodes sharing a file system (NFS...):
+        pending/<unit>            pending units
+        claimed/<unit>@<worker>   claimed units (lease: modification time)
+        done/<unit>               results
+    Claims are renames, which are atomic: of several workers renaming the same file, one
+    succeeds and the others get FileNotFoundError.
+    """
+    def __init__(self, root, lease=60.0):
+        """
+        Args:
+            root (str): Queue directory (created if needed).
+            lease (float): See WorkQueue.
+        """
+        super().__init__(lease)
+        self.root = root
+        for name in ('pending', 'claimed', 'done'):
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+
+    def _path(self, state, name):
+        return os.path.join(self.root, state, name)
+
+    def _write(self, state, name, payload):
+        # Temporary file + rename: readers never see a partial file
+        tmp_path = self._path(state, f".{name}.tmp-{uuid.uuid4().hex}")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(state, name))
+
+    def put(self, unit_id, payload):
+        self._write('pending', unit_id, payload)
+
+    def claim(self, worker_id):
+        for name in sorted(os.listdir(os.path.join(self.root, 'pending'))):
+            if name.startswith('.'):
+                continue
+            pending = self._path('pending', name)
+            claimed = self._path('claimed', f"{name}@{worker_id}")
+            try:
+                # The lease starts now. Touched before the rename, which keeps the modification
+                # time: a unit that waited longer than the lease would look expired once claimed
+                os.utime(pending)
+                os.rename(pending, claimed)
+                with open(claimed, 'rb') as f:
+                    return name, f.read()
+            except FileNotFoundError:
+                continue # Taken by another worker (or re-dispatched meanwhile)
+        return None
+
+    def renew(self, unit_id, worker_id):
+        try:
+            os.utime(self._path('claimed', f"{unit_id}@{worker_id}"))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, unit_id, worker_id, payload):
+        self._write('done', unit_id, payload)
+        try:
+            os.remove(self._path('claimed', f"{unit_id}@{worker_id}"))
+        except FileNotFoundError:
+            pass # Lease expired and the unit was re-dispatched: this result still counts
+
+    def results(self, prefix=""):
+        results = []
+        for name in sorted(os.listdir(os.path.join(self.root, 'done'))):
+            if name.startswith('.') or not name.startswith(prefix):
+                continue
+            path = self._path('done', name)
+            with open(path, 'rb') as f:
+                results.append((name, f.read()))
+            os.remove(path)
+        return results
+
+    def requeue_expired(self):
+        now = time.time()
+        requeued = []
+        for name in os.listdir(os.path.join(self.root, 'claimed')):
+            path = self._path('claimed', name)
+            try:
+                expired = now - os.path.getmtime(path) > self.lease
+                if expired:
+                    unit_id = name.rsplit('@', 1)[0]
+                    os.rename(path, self._path('pending', unit_id))
+                    requeued.append(unit_id)
+            except FileNotFoundError:
+                continue # Completed meanwhile
+        return requeued
+
+    def cancel(self, unit_id):
+        try:
+            os.remove(self._path('pending', unit_id))
+        except FileNotFoundError:
+            pass
+
+
+# ==========================================
+# COORDINATOR
+# ==========================================
+
+class ClusterExecutor(Executor):
+    """
+    concurrent.futures.Executor running calls on the workers of a WorkQueue.
+
+    submit(fn, *args) pickles the call into a unit (fn must be importable by the workers);
+    a collector thread turns results into future results and re-dispatches units whose
+    lease expired. Exceptions raised by fn are re-raised by future.result().
+
+    Example:
+        queue = FileQueue('/shared/queue')   # python distributed.py worker /shared/queue on each node
+        with ClusterExecutor(queue) as executor:
+            df_summary, traces = run_experiment("CONTROL", 100000, seed=1, executor=executor)
+    """
+    def __init__(self, queue, poll=0.2):
+        """
+        Args:
+            queue (WorkQueue): Transport to the workers.
+            poll (float): Seconds between two checks for results.
+        """
+        self.queue = queue
+        self.poll = poll
+        # Unit ids start with a session id: coordinators can share a queue
+        self._session = uuid.uuid4().hex[:12]
+        self._counter = itertools.count()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._wakeup = threading.Event()
+        self.redispatched = 0 # Units re-dispatched after a lost lease
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit to an executor after shutdown")
+            unit_id = f"{self._session}-{next(self._counter):08d}"
+            future = Future()
+            self._futures[unit_id] = future
+        self.queue.put(unit_id, pickle.dumps((fn, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL))
+        return future
+
+    def _collect(self):
+        """Collector thread: resolves futures from results, re-dispatches lost units."""
+        last_check = time.monotonic()
+        while True:
+            for unit_id, payload in self.queue.results(self._session):
+                with self._lock:
+                    future = self._futures.pop(unit_id, None)
+                if future is None or not future.set_running_or_notify_cancel():
+                    continue # Duplicate of a re-dispatched unit, another session's or cancelled
+                ok, value = pickle.loads(payload)
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+            if time.monotonic() - last_check >= self.queue.lease / 4:
+                self.redispatched += len(self.queue.requeue_expired())
+                last_check = time.monotonic()
+
+            with self._lock:
+                for unit_id in [unit_id for unit_id, future in self._futures.items() if future.cancelled()]:
+                    self.queue.cancel(unit_id)
+                    del self._futures[unit_id]
+                if self._shutdown and not self._futures:
+                    return
+            self._wakeup.wait(self.poll)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                for future in self._futures.values():
+                    future.cancel()
+        self._wakeup.set()
+        if wait:
+            self._collector.join()
+
+
+# ==========================================
+# WORKER
+# ==========================================
+
+def run_worker(queue, worker_id=None, poll=0.5, max_units=None, idle_timeout=None):
+    """
+    Runs units of a WorkQueue until stopped (or max_units / idle_timeout).
+
+    Args:
+        queue (WorkQueue): Queue shared with the coordinator.
+        worker_id (str, optional): Name of this worker (default: host-pid).
+        poll (float): Seconds between two claims when the queue is empty.
+        max_units (int, optional): Stop after this many units.
+        idle_timeout (float, optional): Stop after this many seconds without work.
+
+    Returns:
+        int: Units completed
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    completed = 0
+    idle_since = time.monotonic()
+    while max_units is None or completed < max_units:
+        claimed = queue.claim(worker_id)
+        if claimed is None:
+            if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                break
+            time.sleep(poll)
+            continue
+        unit_id, payload = claimed
+
+        # Keep the lease while the unit runs
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(queue.lease / 4):
+                queue.renew(unit_id, worker_id)
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            fn, args, kwargs = pickle.loads(payload)
+            result = (True, fn(*args, **kwargs))
+        except Exception as error:
+            error.__notes__ = getattr(error, '__notes__', []) + [f"On worker {worker_id}:\n{traceback.format_exc()}"]
+            result = (False, error)
+        finally:
+            done.set()
+            thread.join()
+        try:
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as error:
+            # e.g. an exception holding an unpicklable object
+            payload = pickle.dumps((False, RuntimeError(f"Unpicklable result of unit {unit_id}: {error!r}")))
+        queue.complete(unit_id, worker_id, payload)
+        completed += 1
+        idle_since = time.monotonic()
+    return completed
+
+
+def _worker_process(root, lease, worker_id, idle_timeout):
+    run_worker(FileQueue(root, lease), worker_id=worker_id, idle_timeout=idle_timeout)
+
+
+# ==========================================
+# MAIN
+# ==========================================
+
+if __name__ == "__main__":
+    from concurrent.futures import ProcessPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Worker node of a distributed Mars colony campaign")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    worker = subparsers.add_parser('worker', help="Run units of a file queue")
+    worker.add_argument('root', help="Queue directory (shared by the coordinator and every node)")
+    worker.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Worker processes on this node")
+    worker.add_argument('--lease', type=float, default=60.0, help="Lease seconds (same as the coordinator)")
+    worker.add_argument('--idle-timeout', type=float, default=None, help="Exit after this many idle seconds")
+    args = parser.parse_args()
+
+    node = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Node {node}: {args.processes} workers on {args.root}")
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        workers = [pool.submit(_worker_process, args.root, args.lease, f"{node}-{i}", args.idle_timeout)
+                   for i in range(args.processes)]
+        for future in workers:
+            future.result()
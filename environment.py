@@ -0,0 +1,230 @@
+import functools
+import math
+import random
+
+import numpy as np
+
+from config import MISSION_DURATION
+from models import MarsEnvironment
+
+# ==========================================
+# PRECOMPUTED ENVIRONMENT (SEASON TABLES + STORM SCHEDULES)
+# ==========================================
+
+# Same constants as MarsEnvironment.get_sunlight_efficiency()
+STORM_OPACITY = 2.0
+STORM_PEAK_PROB = 0.005
+STORM_PEAK_LS = 250
+STORM_SIGMA = 40
+STORM_MIN_PROB = 0.0001 # Below this the day is not rolled at all
+STORM_DURATION = (5, 15) # Days (inclusive)
+
+
+@functools.lru_cache(maxsize=None)
+def season_tables():
+    """
+    Per-Ls (0..359) tables, computed once per process with the same float operations
+    as MarsEnvironment so that lookups are bit-identical to the daily computation.
+
+    Returns:
+        tuple: (clear-sky efficiency, storm efficiency, daily storm probability) arrays.
+            The probability is 0 where MarsEnvironment does not roll for a storm.
+    """
+    clear, storm, prob = [], [], []
+    for ls in range(360):
+        tau_base = 0.65 - 0.35 * math.sin(math.radians(ls))
+        clear.append(max(0.02, math.exp(-tau_base)))
+        storm.append(max(0.02, math.exp(-(tau_base + STORM_OPACITY))))
+        p = STORM_PEAK_PROB * math.exp( - ((ls - STORM_PEAK_LS) ** 2) / (2 * STORM_SIGMA ** 2) )
+        prob.append(p if p > STORM_MIN_PROB else 0.0)
+    tables = np.array(clear), np.array(storm), np.array(prob)
+    for table in tables:
+        table.flags.writeable = False
+    return tables
+
+
+@functools.lru_cache(maxsize=None)
+def _daily_tables(n_days):
+    """
+    Lists for per-day lookups, shared by every schedule: storm probability per Ls, and
+    clear-sky / storm efficiency of mission days 0..n_days.
+    """
+    clear, storm, prob = season_tables()
+    ls = np.arange(n_days + 1) % 360
+    return prob.tolist(), clear[ls].tolist(), storm[ls].tolist()
+
+
+class StormSchedule:
+    """
+    Every dust storm of one run, sampled up front.
+    Storm k is rolled on day starts[k] and blocks the sun on days
+    starts[k] + 1 .. starts[k] + durations[k] (same timing as MarsEnvironment).
+
+    Schedules can be exported (to_arrays(), to_frame()) and replayed in any mode
+    with MarsColony(cfg, storm_schedule=schedule).
+    """
+    def __init__(self, starts, durations, n_days=MISSION_DURATION):
+        """
+        Args:
+            starts (array-like): Day each storm starts (1-based mission day).
+            durations (array-like): Length of each storm in days.
+            n_days (int): Number of mission days covered by the schedule.
+        """
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.durations = np.asarray(durations, dtype=np.int16)
+        self.n_days = n_days
+        self._daily_lists = None
+
+    @classmethod
+    def sample(cls, rng=None, n_days=MISSION_DURATION, first_day=1):
+        """
+        Samples the storms of days first_day..n_days.
+        Consumes `rng` in the same order as a MarsEnvironment stepped over those days,
+        so the same stream gives the same storms in both environments.
+
+        Args:
+            rng (random.Random, optional): Random stream. Defaults to the global `random` module.
+            n_days (int): Last mission day to cover.
+            first_day (int): First day that can roll for a storm (no storm in progress).
+        """
+        rng = rng if rng is not None else random
+        prob = _daily_tables(n_days)[0]
+        low, high = STORM_DURATION
+        starts, durations = [], []
+        day = first_day
+        while day <= n_days:
+            p = prob[day % 360]
+            if p and rng.random() < p:
+                duration = rng.randint(low, high)
+                starts.append(day)
+                durations.append(duration)
+                day += duration + 1 # Next roll is the day after the storm has cleared
+            else:
+                day += 1
+        return cls(starts, durations, n_days)
+
+    def continued(self, day, rng=None):
+        """
+        Keeps the storms started up to `day` and resamples everything after (e.g. for a
+        cloned colony). Valid since the storm process only depends on the current storm.
+        """
+        keep = self.starts <= day
+        next_roll = day + 1
+        if keep.any():
+            next_roll = max(next_roll, int(self.starts[keep][-1]) + int(self.durations[keep][-1]) + 1)
+        tail = StormSchedule.sample(rng, self.n_days, first_day=next_roll)
+        return StormSchedule(np.concatenate([self.starts[keep], tail.starts]),
+                             np.concatenate([self.durations[keep], tail.durations]),
+                             self.n_days)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def daily_arrays(self):
+        """
+        Per-day sunlight efficiency and storm flag (MarsEnvironment.is_storming after that day),
+        indexed by mission day (index 0 is unused).
+
+        Returns:
+            tuple: (efficiency, storming) arrays of length n_days + 1
+        """
+        clear, storm, _ = season_tables()
+        days = np.arange(self.n_days + 1)
+        # +1/-1 markers, cumulated into masks (storms never overlap)
+        opaque = np.zeros(self.n_days + 2, dtype=np.int32)
+        storming = np.zeros(self.n_days + 2, dtype=np.int32)
+        np.add.at(opaque, np.minimum(self.starts + 1, self.n_days + 1), 1)
+        np.add.at(opaque, np.minimum(self.starts + self.durations + 1, self.n_days + 1), -1)
+        np.add.at(storming, self.starts, 1)
+        np.add.at(storming, np.minimum(self.starts + self.durations, self.n_days + 1), -1)
+        opaque = np.cumsum(opaque)[:-1] > 0
+        storming = np.cumsum(storming)[:-1] > 0
+
+        ls = days % 360
+        efficiency = np.where(opaque, storm[ls], clear[ls])
+        return efficiency, storming
+
+    def daily_lists(self):
+        """
+        daily_arrays() as lists (fast scalar indexing), built once per schedule from the
+        shared clear-sky list: only the storm days are patched, and the floats are shared.
+        """
+        if self._daily_lists is None:
+            _, clear, storm = _daily_tables(self.n_days)
+            efficiency = clear[:]
+            storming = [False] * (self.n_days + 1)
+            for start, duration in zip(self.starts.tolist(), self.durations.tolist()):
+                efficiency[start + 1:start + duration + 1] = storm[start + 1:start + duration + 1]
+                storming[start:start + duration] = [True] * min(duration, self.n_days + 1 - start)
+            self._daily_lists = efficiency, storming
+        return self._daily_lists
+
+    # --- Export ---
+
+    def to_arrays(self):
+        """Dict of arrays (e.g. for np.savez); inverse of from_arrays()."""
+        return {'starts': self.starts, 'durations': self.durations, 'n_days': np.array(self.n_days)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['starts'], arrays['durations'], int(arrays['n_days']))
+
+    def to_frame(self):
+        """One row per storm: start day, duration, last dark day and Ls at the start."""
+        import pandas as pd
+        return pd.DataFrame({
+            'Start_Day': self.starts,
+            'Duration': self.durations,
+            'End_Day': self.starts + self.durations,
+            'Start_Ls': self.starts % 360,
+        })
+
+
+class ScheduledMarsEnvironment(MarsEnvironment):
+    """
+    MarsEnvironment that serves every day from precomputed arrays: the season tables
+    and a StormSchedule sampled when the environment is created (or given).
+    Same distribution as MarsEnvironment; with its own random stream (CRN) it even
+    gives the same storms.
+
+    get_sunlight_efficiency() must be called once per mission day, in order, like
+    MarsColony.step() does; day d uses Ls = d % 360.
+    """
+    __slots__ = ('day', 'schedule', '_efficiency', '_storming')
+
+    def __init__(self, rng=None, schedule=None, n_days=MISSION_DURATION):
+        """
+        Args:
+            rng (random.Random, optional): Random stream used to sample the schedule.
+            schedule (StormSchedule, optional): Storms to replay instead of sampling new ones.
+            n_days (int): Days to sample when no schedule is given.
+        """
+        super().__init__(rng=rng)
+        self.day = 0
+        self.set_schedule(schedule if schedule is not None else StormSchedule.sample(self.rng, n_days))
+
+    def set_schedule(self, schedule):
+        self.schedule = schedule
+        # Shared with every environment replaying the same schedule (read only)
+        self._efficiency, self._storming = schedule.daily_lists()
+
+    def redraw_storms(self):
+        """Resamples the storms after the current day from self.rng."""
+        self.set_schedule(self.schedule.continued(self.day, self.rng))
+
+    def get_sunlight_efficiency(self, Ls_degrees):
+        """
+        Returns the sunlight efficiency of the next mission day (Ls_degrees is implied by the day).
+        """
+        self.day += 1
+        self.is_storming = self._storming[self.day]
+        return self._efficiency[self.day]
+
+    def get_state(self):
+        """(is_storming, storm_counter, day, schedule); the schedule is shared, not copied."""
+        return self.is_storming, self.storm_counter, self.day, self.schedule
+
+    def set_state(self, state):
+        self.is_storming, self.storm_counter, self.day, schedule = state
+        if schedule is not self.schedule:
+            self.set_schedule(schedule)
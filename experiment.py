@@ -0,0 +1,619 @@
+import copy
+import math
+from itertools import repeat
+
+import numpy as np
+
+from config import MCSimConfig
+from batch_simulation import CAUSES
+from seeding import new_master_seed
+from traces import TraceRecorder, RecordingPolicy, EventLog, RECORD_ALL
+from aggregation import ExperimentAccumulator, BAND_FIELDS
+from result_store import ResultStore
+from stats import binomial_interval, z_score
+from surrogate import control_variate_estimate
+from profiler import StepProfiler
+from simulation import MACHINE_COUNTER_COLUMNS, scalar_model_changes
+import parallel
+
+# ==========================================
+# MONTE CARLO SIMULATION
+# ==========================================
+
+def run_experiment(experiment_mode, n_simulations=1000, engine="scalar", batch_size=5000, seed=None,
+                   n_workers=1, chunk_size=None, aggregate=False, store=None,
+                   target_half_width=None, targets=("Survival",), confidence=0.95, interval="wilson",
+                   max_runs=100000, crn=False, antithetic=False, profile=False, checkpoint=None, record=None,
+                   control_variates=False, executor=None, overrides=None):
+    """
+    Runs n_simulations Monte Carlo missions for one experiment mode.
+
+    Args:
+        experiment_mode (str): MCSimConfig mode.
+        n_simulations (int): Number of missions to simulate.
+        engine (str): 'scalar' (one MarsColony per run) or 'batch' (BatchMarsColony, vectorized).
+        batch_size (int): Colonies stepped in lockstep per batch (batch engine only).
+        seed (int, optional): Master seed. With the scalar engine every run gets its own stream
+            derived from (seed, Run_ID), so results do not depend on n_workers/chunk_size and any
+            run can be replayed with parallel.run_single(). Without a seed (and n_workers=1) runs
+            use the global `random` state.
+        n_workers (int): Worker processes for the scalar engine (runs are sharded across a process pool).
+        chunk_size (int, optional): Runs per work unit sent to a worker.
+        aggregate (bool): Streaming mode: only keep an ExperimentAccumulator (survival curve,
+            failure causes, resource bands). Traces are discarded as each chunk of runs finishes.
+        store (ResultStore, optional): Result cache. Seeded experiments already in the store are
+            loaded instead of simulated; if fewer runs are cached, only the missing ones are simulated
+            (batch engine: from the end of the last whole cached batch, see _reusable_runs()).
+        target_half_width (float or dict, optional): Adaptive stopping. n_simulations becomes the
+            first batch; more runs are added until the confidence interval of every target has
+            at most this half-width (a dict gives one value per target) or max_runs is reached.
+        targets (tuple): Proportions to estimate: 'Survival' and/or causes of death (e.g. 'Suffocation').
+        confidence (float): Confidence level of the intervals.
+        interval (str): 'wilson' or 'clopper-pearson'.
+        max_runs (int): Run budget of the adaptive mode.
+        crn (bool): Common random numbers (scalar engine, needs a seed): run i of every mode sees the
+            same storm schedule, crop variability and per-machine failure/repair streams, so modes
+            can be compared run by run (stats.paired_difference_report).
+        antithetic (bool): With crn, runs 2k and 2k+1 use antithetic draws of the same streams.
+        profile (bool): Instrument MarsColony.step with a StepProfiler (scalar engine). Every run
+            is simulated (the store is not used) and the merged profiler is returned in
+            df_summary.attrs['profile'] (accumulator.metadata['profile'] when aggregate=True).
+        checkpoint (Checkpoint, optional): Saves completed work units as they finish. Calling
+            run_experiment again with the same arguments and checkpoint resumes an interrupted
+            experiment (or reloads a finished one) and gives exactly the same results. Without a
+            seed, the campaign seed of the checkpoint is used.
+        record (RecordingPolicy, optional): What each run keeps besides its summary (fields,
+            decimation, traced runs, event log; see traces.RecordingPolicy). Defaults to the
+            cheapest policy the result needs: the full daily trace (RECORD_ALL), or only the
+            banded fields when aggregating. visualization.trace_policy() gives what the plots need.
+        control_variates (bool): Record the machine failure/repair counters of every run (scalar
+            engine, not aggregated) and estimate the survival rate with them as control variates
+            (surrogate.control_variate_estimate): same expected value, narrower interval. The
+            estimates are in df_summary.attrs['control_variates'] and the adaptive mode stops on
+            their intervals.
+        executor (concurrent.futures.Executor, optional): Runs the work units (chunks of runs,
+            batches) on this executor instead of n_workers local processes, e.g. a
+            distributed.ClusterExecutor spreading them over several nodes. Results are merged
+            in Run_ID order, so they are the same as with a local run.
+        overrides (dict, optional): MCSimConfig fields set on top of the mode, e.g.
+            {'failure_model': 'next_event', 'machine_model': 'bank'} (part of the cache key).
+
+    Returns:
+        tuple: (summary DataFrame, TraceRecorder with the daily trace of every run)
+            traces[i]['o2'] is a zero-copy view of run i, traces.to_frame() a long-form table,
+            traces.events the EventLog when the policy keeps events.
+        ExperimentAccumulator: when aggregate=True.
+        In adaptive mode the stopping report (runs spent, intervals) is in df_summary.attrs['adaptive']
+        (accumulator.metadata['adaptive'] when aggregate=True).
+    """
+    if profile:
+        # Cached runs would not be profiled
+        store = None
+    cfg, options = _prepare(experiment_mode, engine, batch_size, seed, n_workers, chunk_size, aggregate, crn,
+                            antithetic, profile, checkpoint, record, control_variates, executor, overrides)
+
+    report = None
+    if target_half_width is not None:
+        result, report = _run_adaptive(cfg, n_simulations, store, options, target_half_width,
+                                       targets, confidence, interval, max_runs)
+        n_simulations = report['runs_spent']
+    elif store is not None and options['seed'] is not None:
+        result = _run_cached(cfg, n_simulations, store, options)
+    else:
+        result = _simulate(cfg, 0, n_simulations, options)
+
+    if aggregate:
+        _print_report(result.n_runs, result.n_survived, result.death_causes())
+        if report is not None:
+            result.metadata['adaptive'] = report
+        if profile:
+            result.metadata['profile'] = options['profiler']
+        return result
+
+    summary, traces = result
+    df_summary = summary_frame(experiment_mode, summary)
+
+    # Sort death causes by index descending
+    death_causes = df_summary.loc[~df_summary["Survived"], "Cause"].value_counts().to_dict()
+    death_causes = dict(sorted(death_causes.items(), key=lambda item: item[0], reverse=True))
+    _print_report(n_simulations, int(df_summary["Survived"].sum()), death_causes)
+
+    if control_variates:
+        estimates = {target: control_variate_estimate(df_summary, cfg, target, confidence) for target in targets}
+        for target, estimate in estimates.items():
+            print(f"{target} (control variates): {estimate['estimate'] * 100:.2f}%"
+                  f" [{estimate['ci_low'] * 100:.2f}%, {estimate['ci_high'] * 100:.2f}%],"
+                  f" variance reduction x{estimate['variance_reduction']:.2f}")
+        df_summary.attrs['control_variates'] = estimates
+    if report is not None:
+        df_summary.attrs['adaptive'] = report
+    if profile:
+        df_summary.attrs['profile'] = options['profiler']
+    return df_summary, traces
+
+
+# ==========================================
+# INCREMENTAL RESULTS
+# ==========================================
+
+def iter_experiment(experiment_mode, n_simulations=1000, engine="scalar", batch_size=5000, seed=None,
+                    n_workers=1, chunk_size=None, aggregate=False, store=None, crn=False, antithetic=False,
+                    checkpoint=None, record=None, control_variates=False, executor=None, overrides=None):
+    """
+    Runs an experiment like run_experiment(), but yields its results as they complete:
+    one item per work unit (a chunk of runs with the scalar engine, chunk_size runs; a
+    batch with the batch engine, batch_size runs), in Run_ID order. Runs already in the
+    store come first as one unit; the store is updated once every run is done.
+
+    Closing the generator (break out of the loop, .close()) stops the experiment: the units
+    not started yet are cancelled. progress.aiter_experiment() is the asyncio version.
+
+    Args:
+        Same as run_experiment() (no adaptive stopping or profiling).
+
+    Returns:
+        generator: (part, cached) per unit. part is (summary arrays, TraceRecorder), or an
+            ExperimentAccumulator when aggregate=True; cached is True for the runs loaded from
+            the store. merge_parts() combines the parts into run_experiment()'s result.
+    """
+    # Validated now, not on the first next()
+    cfg, options = _prepare(experiment_mode, engine, batch_size, seed, n_workers, chunk_size, aggregate, crn,
+                            antithetic, False, checkpoint, record, control_variates, executor, overrides)
+    return _iter_units(cfg, n_simulations, store, options)
+
+
+def _iter_units(cfg, n_runs, store, options):
+    """Units of iter_experiment(): cached runs first, then the simulated ones (saved at the end)."""
+    if store is None or options['seed'] is None:
+        for part in _parts(cfg, 0, n_runs, options):
+            yield part, False
+        return
+
+    key = store.key(cfg, options['seed'], **_result_params(options))
+    n_cached = 0
+    cached_part = None
+    if options['aggregate']:
+        cached = store.load_accumulator(key)
+        # An accumulator cannot be cut down to fewer runs: ignore a bigger entry
+        if cached is not None and cached[0] <= n_runs and _reusable_runs(cached[0], n_runs, options) == cached[0]:
+            n_cached = cached[0]
+            cached_part = ExperimentAccumulator.from_arrays(cfg, cached[1])
+    else:
+        cached = store.load_runs(key)
+        if cached is not None:
+            n_cached = _reusable_runs(cached[0], n_runs, options)
+            if n_cached:
+                cached_part = ({name: values[:n_cached] for name, values in cached[1].items()}, cached[2].head(n_cached))
+
+    parts = []
+    if cached_part is not None:
+        print(f"Loaded {n_cached} cached runs")
+        parts.append(cached_part)
+        yield cached_part, True
+    if n_cached == n_runs:
+        return
+    for part in _parts(cfg, n_cached, n_runs - n_cached, options):
+        parts.append(part)
+        yield part, False
+
+    if cached is not None and cached[0] > n_runs:
+        # Keep the bigger entry
+        return
+    result = merge_parts(parts)
+    if options['aggregate']:
+        store.save_accumulator(key, result)
+    else:
+        store.save_runs(key, *result)
+
+
+def merge_parts(parts):
+    """
+    Combines the parts of iter_experiment()'s units (all of them, or the first ones of a
+    stopped experiment).
+
+    Returns:
+        tuple: (summary arrays, TraceRecorder) of the runs of the units
+        ExperimentAccumulator: for units of an aggregated experiment.
+        None: without units.
+    """
+    if not parts:
+        return None
+    if isinstance(parts[0], ExperimentAccumulator):
+        # The units stay as they are (the caller may keep them)
+        accumulator = copy.deepcopy(parts[0])
+        for part in parts[1:]:
+            accumulator.merge(part)
+        return accumulator
+
+    summary = {name: np.concatenate([part[0][name] for part in parts]) for name in parts[0][0]}
+    # Concatenate the columns (the units may come from different policies' recorders, e.g. the store)
+    recorders = [part[1] for part in parts]
+    rows = [int(recorder.offsets[recorder.n_runs]) for recorder in recorders]
+    columns = {
+        field: np.concatenate([recorder.columns[field][:n] for recorder, n in zip(recorders, rows)])
+        for field in recorders[0].columns
+    }
+    offsets = np.concatenate([[0]] + [
+        start + recorder.offsets[1:recorder.n_runs + 1]
+        for start, recorder in zip(np.cumsum([0] + rows[:-1]), recorders)
+    ]).astype(np.int64)
+    run_ids = np.concatenate([recorder.run_ids[:recorder.n_runs] for recorder in recorders])
+    events = None
+    if recorders[0].events is not None:
+        events = EventLog()
+        for recorder in recorders:
+            events.extend(recorder.events)
+    return summary, TraceRecorder.from_arrays(columns, offsets, run_ids, events)
+
+
+def _prepare(experiment_mode, engine, batch_size, seed, n_workers, chunk_size, aggregate, crn, antithetic,
+             profile, checkpoint, record, control_variates, executor, overrides=None):
+    """
+    Validates the options of run_experiment() / iter_experiment() and resolves their defaults.
+
+    Returns:
+        tuple: (MCSimConfig, options dict shared by the helpers below)
+    """
+    if engine not in ("scalar", "batch"):
+        raise ValueError(f"Unknown engine: {engine}")
+    if (crn or antithetic) and engine != "scalar":
+        raise ValueError("Common random numbers are only supported by the scalar engine")
+    if antithetic and not crn:
+        raise ValueError("Antithetic variates need crn=True")
+    if profile and engine != "scalar":
+        raise ValueError("Step profiling is only supported by the scalar engine")
+    if profile and checkpoint is not None:
+        raise ValueError("Step profiling cannot be combined with a checkpoint")
+    if record is None:
+        # Accumulators only need the banded fields of every day
+        record = RecordingPolicy(fields=BAND_FIELDS) if aggregate else RECORD_ALL
+    if aggregate and (set(BAND_FIELDS) - set(record.fields) or record.decimates or record.n_traced is not None):
+        raise ValueError(f"Aggregation needs every day of {', '.join(BAND_FIELDS)} for every run")
+    if record.events and engine != "scalar":
+        raise ValueError("Event logging is only supported by the scalar engine")
+    if control_variates and (engine != "scalar" or aggregate):
+        raise ValueError("Control variates need the per-run counters of the scalar engine (aggregate=False)")
+
+    engine_label = " (batch engine)" if engine == "batch" else ""
+    print(f"\n--- Starting Experiment: {experiment_mode}{engine_label} ---")
+
+    cfg = MCSimConfig(experiment_mode, **(overrides or {}))
+    # The batch engine has its own vectorized models: these switches would be silently ignored
+    changed = scalar_model_changes(cfg)
+    if changed and engine != "scalar":
+        raise ValueError(f"{', '.join(changed)}: only supported by the scalar engine")
+
+    if seed is None and checkpoint is not None:
+        # Resumed runs must draw from the same streams
+        seed = checkpoint.master_seed()
+    if seed is None and (n_workers > 1 or crn or executor is not None):
+        # Parallel, distributed and CRN runs need seeded streams: pick a master seed and report it
+        seed = new_master_seed()
+        print(f"Master Seed: {seed}")
+
+    options = dict(engine=engine, batch_size=batch_size, seed=seed, n_workers=n_workers,
+                   chunk_size=chunk_size, aggregate=aggregate, crn=crn, antithetic=antithetic,
+                   profiler=StepProfiler() if profile else None, checkpoint=checkpoint, record=record,
+                   control_variates=control_variates, executor=executor)
+    if checkpoint is not None:
+        options['checkpoint_key'] = ResultStore.key(cfg, seed, **_result_params(options))
+    return cfg, options
+
+
+def summary_frame(experiment_mode, summary):
+    """
+    Summary DataFrame of a run set (one row per run).
+
+    Args:
+        experiment_mode (str): Value of the Experiment column.
+        summary (dict): Summary arrays ('survived', 'cause' codes, 'day_ended' + machine counters).
+
+    Returns:
+        pd.DataFrame: Experiment, Run_ID, Survived, Cause, Day_Ended (+ Oxygenator_Failures...)
+    """
+    # pandas is only loaded for the summary table (workers and the simulation do not need it)
+    import pandas as pd
+
+    df_summary = pd.DataFrame({
+        "Experiment": experiment_mode,
+        "Run_ID": np.arange(len(summary['survived'])),
+        "Survived": np.asarray(summary['survived'], dtype=bool),
+        "Cause": np.asarray(CAUSES, dtype=object)[summary['cause']],
+        "Day_Ended": np.asarray(summary['day_ended'])
+    })
+    # Machine counters (control_variates=True): Oxygenator_Failures, Water_Reclaimer_Checks_At_Risk...
+    for name in MACHINE_COUNTER_COLUMNS:
+        if name in summary:
+            df_summary[name.title()] = np.asarray(summary[name])
+    return df_summary
+
+
+def _print_report(n_simulations, success_count, death_causes):
+    # Summarize Results
+    success_rate = (success_count / n_simulations) * 100
+    print(f"Simulations: {n_simulations}")
+    print(f"Success Rate: {success_rate:.2f}%")
+    print(f"Failure Causes: {death_causes}")
+
+
+def _parts(cfg, first_run, n_runs, options):
+    """
+    Work units of runs first_run..first_run+n_runs-1, in Run_ID order (through the checkpoint
+    when there is one).
+
+    Yields:
+        Per unit: (summary arrays, TraceRecorder), or an ExperimentAccumulator when aggregating.
+    """
+    def simulate(start, n):
+        if options['engine'] == "batch":
+            return _iter_batch(cfg, start, n, options['seed'], options['batch_size'], options['aggregate'],
+                               options['record'], options['executor'])
+        return _iter_scalar(cfg, start, n, options)
+
+    checkpoint = options['checkpoint']
+    if checkpoint is None:
+        return simulate(first_run, n_runs)
+    # Units saved by an interrupted run are loaded, the rest is simulated and saved
+    return checkpoint.parts(options['checkpoint_key'], cfg, first_run, n_runs, simulate, options['aggregate'])
+
+
+def _simulate(cfg, first_run, n_runs, options):
+    """
+    Simulates runs first_run..first_run+n_runs-1.
+
+    Returns:
+        tuple: (summary arrays {'survived', 'cause', 'day_ended'} + machine counters with
+            options['control_variates'], TraceRecorder)
+        ExperimentAccumulator: when options['aggregate'] is set.
+    """
+    parts = _parts(cfg, first_run, n_runs, options)
+    if options['aggregate']:
+        accumulator = ExperimentAccumulator(cfg)
+        for part in parts:
+            # Only the aggregates are kept
+            accumulator.merge(part)
+        return accumulator
+
+    summaries = []
+    traces = TraceRecorder(n_runs, policy=options['record'], first_run=first_run)
+    for summary, unit_traces in parts:
+        summaries.append(summary)
+        # Save the daily traces (Resources over time)
+        traces.extend(unit_traces)
+    summary = {name: np.concatenate([part[name] for part in summaries]) for name in summaries[0]}
+    return summary, traces
+
+
+def _iter_scalar(cfg, first_run, n_runs, options):
+    """
+    One MarsColony per run (in this process, or sharded across a process pool).
+
+    Yields:
+        Per chunk of runs: (summary arrays, TraceRecorder), or an ExperimentAccumulator when aggregating.
+    """
+    profiler = options['profiler']
+
+    # Without a seed, runs draw from the global `random` state in this process
+    runs = parallel.iter_runs(cfg, n_runs, options['seed'], n_workers=options['n_workers'],
+                              chunk_size=options['chunk_size'], aggregate=options['aggregate'], first_run=first_run,
+                              crn=options['crn'], antithetic=options['antithetic'], profile=profiler is not None,
+                              record=options['record'], counters=options['control_variates'],
+                              executor=options['executor'])
+
+    for chunk in runs:
+        chunk_summaries, chunk_result, *extras = chunk
+        if profiler is not None:
+            profiler.merge(extras.pop(0))
+
+        if options['aggregate']:
+            yield chunk_result
+            continue
+
+        _, survived, causes, day_ended = zip(*chunk_summaries)
+        summary = {
+            'survived': np.array(survived, dtype=bool),
+            'cause': np.array([CAUSES.index(cause) for cause in causes], dtype=np.int8),
+            'day_ended': np.array(day_ended, dtype=np.int32)
+        }
+        if options['control_variates']:
+            summary.update(extras.pop(0))
+        yield summary, chunk_result
+
+
+def _iter_batch(cfg, first_run, n_runs, seed, batch_size, aggregate, record, executor=None):
+    """
+    Steps the colonies in lockstep with BatchMarsColony, batch_size colonies at a time
+    (parallel.simulate_batch), in this process or on an executor.
+
+    Yields:
+        Per batch: (summary arrays, TraceRecorder), or an ExperimentAccumulator when aggregating.
+    """
+    end = first_run + n_runs
+    batches = [range(start, min(start + batch_size, end)) for start in range(first_run, end, batch_size)]
+    if executor is None:
+        for run_ids in batches:
+            yield parallel.simulate_batch(cfg, run_ids, seed, aggregate, record)
+        return
+    yield from executor.map(parallel.simulate_batch, repeat(cfg), batches, repeat(seed), repeat(aggregate), repeat(record))
+
+
+def _append_runs(cfg, previous, first_run, n_runs, options):
+    """Simulates n_runs more runs and combines them with a previous result (None for the first batch)."""
+    new = _simulate(cfg, first_run, n_runs, options)
+    if previous is None:
+        return new
+    if options['aggregate']:
+        return previous.merge(new)
+
+    (old_summary, old_traces), (new_summary, new_traces) = previous, new
+    summary = {name: np.concatenate([old_summary[name], new_summary[name]]) for name in new_summary}
+    traces = TraceRecorder(first_run + n_runs, policy=options['record'])
+    traces.extend(old_traces)
+    traces.extend(new_traces)
+    return summary, traces
+
+
+def _target_counts(result, targets):
+    """Number of runs counting towards each target proportion ('Survival' or a cause of death)."""
+    counts = {}
+    for target in targets:
+        if isinstance(result, ExperimentAccumulator):
+            counts[target] = result.n_survived if target == "Survival" else result.cause_counts.get(target, 0)
+        else:
+            summary = result[0]
+            if target == "Survival":
+                counts[target] = int(np.sum(summary['survived']))
+            else:
+                counts[target] = int(np.sum(np.asarray(summary['cause']) == CAUSES.index(target)))
+    return counts
+
+
+def _run_adaptive(cfg, n_initial, store, options, target_half_width, targets, confidence, interval, max_runs):
+    """
+    Sequential stopping: adds runs until every target interval is tight enough or the budget is spent.
+    Runs are always 0..n-1, so with the scalar engine the result equals a fixed run of the same size.
+    With options['control_variates'] the intervals are those of the control variate estimates.
+
+    Returns:
+        tuple: (result as returned by _simulate(), report dict)
+    """
+    if isinstance(target_half_width, dict):
+        half_widths = dict(target_half_width)
+    else:
+        half_widths = {target: target_half_width for target in targets}
+    for target in half_widths:
+        if target != "Survival" and target not in CAUSES[1:]:
+            raise ValueError(f"Unknown target: {target}")
+
+    z = z_score(confidence)
+    result = None
+    n_done = 0
+    n_total = min(n_initial, max_runs)
+
+    while True:
+        if store is not None and options['seed'] is not None:
+            result = _run_cached(cfg, n_total, store, options)
+        else:
+            result = _append_runs(cfg, result, n_done, n_total - n_done, options)
+        n_done = n_total
+
+        if options['control_variates']:
+            # Regression estimates: per-run variance = residual variance after the controls
+            summary = result[0]
+            estimates = {target: control_variate_estimate(summary, cfg, target, confidence) for target in half_widths}
+            intervals = {target: (e['estimate'], e['ci_low'], e['ci_high']) for target, e in estimates.items()}
+            variances = {target: e['residual_variance'] for target, e in estimates.items()}
+        else:
+            counts = _target_counts(result, half_widths)
+            intervals = {target: (k / n_total,) + binomial_interval(k, n_total, confidence, interval)
+                         for target, k in counts.items()}
+            variances = {}
+            for target, k in counts.items():
+                p = min(max(k, 1) / n_total, 0.5)
+                variances[target] = p * (1 - p)
+        unmet = [target for target, (_, low, high) in intervals.items() if (high - low) / 2 > half_widths[target]]
+        if not unmet or n_total >= max_runs:
+            break
+
+        # Normal-approximation guess of the runs each unmet target needs (+10%)
+        needed = 0
+        for target in unmet:
+            needed = max(needed, z ** 2 * variances[target] / half_widths[target] ** 2)
+        n_total = min(max_runs, max(n_total + n_initial, math.ceil(1.1 * needed)))
+
+    report = {
+        'runs_spent': n_total,
+        'converged': not unmet,
+        'confidence': confidence,
+        'intervals': intervals,
+    }
+
+    status = "converged" if report['converged'] else f"budget of {max_runs} runs exhausted"
+    print(f"Adaptive Stopping: {n_total} runs spent ({status})")
+    for target, (estimate, low, high) in report['intervals'].items():
+        print(f"  {target}: {estimate * 100:.2f}% [{low * 100:.2f}%, {high * 100:.2f}%]"
+              f" (half-width {(high - low) / 2 * 100:.2f}% / target {half_widths[target] * 100:.2f}%)")
+    return result, report
+
+
+def _result_params(options):
+    """Settings besides the config and seed that change the results (ResultStore / Checkpoint keys)."""
+    params = dict(engine=options['engine'], kind="aggregate" if options['aggregate'] else "runs")
+    if options['engine'] == "batch":
+        params['batch_size'] = options['batch_size']
+    if not options['aggregate'] and options['record'] != RECORD_ALL:
+        # Accumulators are the same under any valid policy, stored runs are not
+        params['record'] = options['record'].to_dict()
+    if options['crn']:
+        params.update(crn=True, antithetic=options['antithetic'])
+    if options['control_variates']:
+        # Stored runs also hold the machine counters
+        params['control_variates'] = True
+    return params
+
+
+def _reusable_runs(n_cached, n_runs, options):
+    """
+    Number of the n_cached stored runs that a result of n_runs runs can start from.
+
+    A scalar run only depends on its Run_ID, so every cached run carries over. The colonies
+    of a batch share one stream and their draws depend on the batch size: cached runs only
+    carry over by whole batches (or all of them, for the same number of runs), so a top-up
+    gives the same result as an uninterrupted run.
+    """
+    n_reused = min(n_cached, n_runs)
+    if options['engine'] != "batch" or n_cached == n_runs:
+        return n_reused
+    return n_reused // options['batch_size'] * options['batch_size']
+
+
+def _run_cached(cfg, n_simulations, store, options):
+    """
+    run_experiment() through a ResultStore: load what is cached, simulate the missing runs.
+    """
+    aggregate = options['aggregate']
+    key = store.key(cfg, options['seed'], **_result_params(options))
+
+    if aggregate:
+        cached = store.load_accumulator(key)
+        n_cached = cached[0] if cached is not None else 0
+        # An accumulator cannot be cut down to fewer runs (nor to whole batches): recompute
+        # (and keep the bigger entry)
+        if cached is None or _reusable_runs(n_cached, n_simulations, options) < n_cached:
+            result = _simulate(cfg, 0, n_simulations, options)
+            if n_simulations > n_cached:
+                store.save_accumulator(key, result)
+            return result
+
+        accumulator = ExperimentAccumulator.from_arrays(cfg, cached[1])
+        if n_cached == n_simulations:
+            print(f"Loaded {n_cached} cached runs")
+            return accumulator
+        print(f"Loaded {n_cached} cached runs, simulating {n_simulations - n_cached} more")
+        accumulator.merge(_simulate(cfg, n_cached, n_simulations - n_cached, options))
+        store.save_accumulator(key, accumulator)
+        return accumulator
+
+    cached = store.load_runs(key)
+    n_cached = cached[0] if cached is not None else 0
+    n_reused = _reusable_runs(n_cached, n_simulations, options)
+    if n_reused == n_simulations:
+        print(f"Loaded {n_simulations} cached runs")
+        _, summary, traces = cached
+        return {name: values[:n_simulations] for name, values in summary.items()}, traces.head(n_simulations)
+
+    if n_reused == 0:
+        summary, traces = _simulate(cfg, 0, n_simulations, options)
+    else:
+        print(f"Loaded {n_reused} cached runs, simulating {n_simulations - n_reused} more")
+        _, old_summary, old_traces = cached
+        new_summary, new_traces = _simulate(cfg, n_reused, n_simulations - n_reused, options)
+        summary = {name: np.concatenate([old_summary[name][:n_reused], new_summary[name]]) for name in new_summary}
+        traces = TraceRecorder(n_simulations, policy=options['record'])
+        traces.extend(old_traces.head(n_reused))
+        traces.extend(new_traces)
+
+    if n_simulations > n_cached:
+        # Keep the bigger entry
+        store.save_runs(key, summary, traces)
+    return summary, traces
@@ -0,0 +1,221 @@
+import numpy as np
+
+from models import REPAIR_LOG_MEAN, REPAIR_LOG_SIGMA
+
+# ==========================================
+# ARRAY-BACKED MACHINES
+# ==========================================
+
+class MachineBank:
+    """
+    Every machine of a colony in flat arrays (rate, MTBF, power cost, breakdown state),
+    for outposts with hundreds of machines of several types (oxygenators, water reclaimers,
+    CO2 scrubbers, heaters...).
+
+    Machines of a type are contiguous and checked in order, like a list of Machine objects
+    in MarsColony._run_machines(): the first machine without power or free storage stops the
+    group, a broken machine still draws power, and an input limit (e.g. waste water) caps the
+    production. A day of a group is resolved with a fixed number of array operations, whatever
+    the number of machines: the outcome of every machine's check is computed up front, the
+    power left and storage reached before each machine are prefix sums, and only the checked
+    prefix commits its state changes.
+
+    Same failure models as Machine ('daily' or 'next_event'), drawn from a NumPy Generator.
+    """
+    def __init__(self, rng=None, failure_model="daily"):
+        """
+        Args:
+            rng (np.random.Generator, optional): Stream of the failure and repair draws.
+            failure_model (str): 'daily' or 'next_event' (see Machine).
+        """
+        if failure_model not in ("daily", "next_event"):
+            raise ValueError(f"Unknown failure model: {failure_model}")
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.failure_model = failure_model
+        self.types = {} # Type -> slice of its machines
+        # Per type, since creation or reset_counters() (see Machine)
+        self.failures = {} # Breakdowns
+        self.checks_at_risk = {} # Checks of working machines
+        self.repair_days = {} # Sum of the sampled repair times
+
+        self.production_rate = np.zeros(0)
+        self.power_cost = np.zeros(0)
+        self.mtbf = np.zeros(0)
+        self.fail_prob = np.zeros(0)
+        self.is_broken = np.zeros(0, dtype=bool)
+        self.days_to_repair = np.zeros(0, dtype=np.int64)
+        self.checks_to_failure = np.zeros(0, dtype=np.int64)
+
+    def add(self, kind, count, production_rate, mtbf_days, power_cost):
+        """
+        Adds `count` machines of a new type. Scalars apply to every machine, arrays give
+        one value per machine.
+        """
+        if kind in self.types:
+            raise ValueError(f"Machine type already in the bank: {kind}")
+        start = len(self.production_rate)
+        self.types[kind] = slice(start, start + count)
+        self.failures[kind] = 0
+        self.checks_at_risk[kind] = 0
+        self.repair_days[kind] = 0
+
+        def column(values):
+            return np.broadcast_to(np.asarray(values, dtype=np.float64), (count,))
+
+        mtbf = column(mtbf_days)
+        self.production_rate = np.concatenate([self.production_rate, column(production_rate)])
+        self.power_cost = np.concatenate([self.power_cost, column(power_cost)])
+        self.mtbf = np.concatenate([self.mtbf, mtbf])
+        self.fail_prob = np.concatenate([self.fail_prob, 1 - np.exp(-1 / mtbf)])
+        self.is_broken = np.concatenate([self.is_broken, np.zeros(count, dtype=bool)])
+        self.days_to_repair = np.concatenate([self.days_to_repair, np.zeros(count, dtype=np.int64)])
+        self.checks_to_failure = np.concatenate([self.checks_to_failure, np.zeros(count, dtype=np.int64)])
+        if self.failure_model == "next_event":
+            self.checks_to_failure[self.types[kind]] = self._sample_checks_to_failure(mtbf)
+
+    def reset_counters(self):
+        for kind in self.types:
+            self.failures[kind] = 0
+            self.checks_at_risk[kind] = 0
+            self.repair_days[kind] = 0
+
+    def count(self, kind):
+        return self.types[kind].stop - self.types[kind].start
+
+    def n_broken(self, kind):
+        return int(np.count_nonzero(self.is_broken[self.types[kind]]))
+
+    def _sample_checks_to_failure(self, mtbf):
+        # Geometric (checks until failure, >= 1), same inverse transform as Machine
+        u = 1.0 - self.rng.random(len(mtbf))
+        return np.maximum(1, np.ceil(-mtbf * np.log(u))).astype(np.int64)
+
+    def _sample_repair_days(self, n):
+        # Repair Time (Log-Normal), Mean ~2.7 days, Sigma=0.8
+        return np.ceil(self.rng.lognormal(REPAIR_LOG_MEAN, REPAIR_LOG_SIGMA, n)).astype(np.int64)
+
+    def redraw(self):
+        """Resamples the pending failure time of every working machine ('next_event')."""
+        if self.failure_model == "next_event":
+            working = ~self.is_broken
+            self.checks_to_failure[working] = self._sample_checks_to_failure(self.mtbf[working])
+
+    # --- Daily operation ---
+
+    def run(self, kind, available_power, current_storage, max_storage, input_resource_limit=None, on_skip=None):
+        """
+        Runs the machines of one type for a day (same contract as MarsColony._run_machines).
+
+        Args:
+            kind (str): Machine type.
+            available_power (float): Available power for the day.
+            current_storage (float): Current amount of the output resource.
+            max_storage (float): Maximum capacity for the output resource.
+            input_resource_limit (float, optional): Limit on input resource consumption.
+            on_skip (callable, optional): on_skip(count, has_power, needs_output) when the group
+                stops before its last machine (profiling hook).
+
+        Returns:
+            tuple: (produced amount, input consumed, power used)
+        """
+        group = self.types[kind]
+        n = group.stop - group.start
+        if n == 0:
+            return 0.0, 0.0, 0.0
+        broken = self.is_broken[group]
+        cost = self.power_cost[group]
+
+        # Outcome of every machine's check, as if it were checked today
+        repaired = broken & (self.days_to_repair[group] <= 1)
+        if self.failure_model == "next_event":
+            fails = ~broken & (self.checks_to_failure[group] <= 1)
+        else:
+            fails = ~broken & (self.rng.random(n) < self.fail_prob[group])
+        down = broken | fails
+        actual = self.production_rate[group] * ~down
+        produced_before = np.cumsum(actual)
+
+        # Input limit: machines take what is left in order
+        if input_resource_limit is not None and produced_before[-1] > input_resource_limit:
+            np.minimum(produced_before, max(input_resource_limit, 0.0), out=produced_before)
+            actual = produced_before.copy()
+            actual[1:] -= produced_before[:-1]
+        produced_before -= actual
+
+        # A machine consumes power if it produced something or is (still / newly) broken
+        used = cost * ((actual > 0) | (down & ~repaired))
+        power_before = np.cumsum(used)
+        power_before -= used
+
+        # Power left and storage reached when each machine's turn comes
+        runs = (available_power - power_before >= cost) & (current_storage + produced_before < max_storage)
+        checked = n if runs.all() else int(runs.argmin())
+        if checked < n and on_skip is not None:
+            on_skip(n - checked, bool(available_power - power_before[checked] >= cost[checked]),
+                    bool(current_storage + produced_before[checked] < max_storage))
+        if checked == 0:
+            return 0.0, 0.0, 0.0
+
+        self._commit(kind, checked, broken, repaired, fails)
+        produced = float(produced_before[checked - 1] + actual[checked - 1])
+        return produced, produced, float(power_before[checked - 1] + used[checked - 1])
+
+    def _commit(self, kind, checked, broken, repaired, fails):
+        """Applies the state changes of the first `checked` machines of a group."""
+        start = self.types[kind].start
+        index = slice(start, start + checked)
+        was_broken = broken[:checked]
+        repaired = repaired[:checked]
+        fails = fails[:checked]
+
+        # Working machines move one check closer to their failure
+        if self.failure_model == "next_event":
+            self.checks_to_failure[index] -= ~was_broken
+
+        n_broken = int(np.count_nonzero(was_broken))
+        n_fails = int(np.count_nonzero(fails))
+        self.checks_at_risk[kind] += checked - n_broken
+        if n_broken == 0 and n_fails == 0:
+            return
+        is_broken = self.is_broken[index]
+        days_to_repair = self.days_to_repair[index]
+
+        # Repairs in progress
+        if n_broken:
+            days_to_repair -= was_broken
+            if repaired.any():
+                is_broken[repaired] = False
+                days_to_repair[repaired] = 0
+                if self.failure_model == "next_event":
+                    self.checks_to_failure[index][repaired] = self._sample_checks_to_failure(self.mtbf[index][repaired])
+
+        if n_fails:
+            is_broken[fails] = True
+            repair_days = self._sample_repair_days(n_fails)
+            days_to_repair[fails] = repair_days
+            self.failures[kind] += n_fails
+            self.repair_days[kind] += int(repair_days.sum())
+
+    # --- State ---
+
+    def get_state(self):
+        """Breakdown state of every type: kind -> (is_broken, days_to_repair, checks_to_failure) copies."""
+        return {
+            kind: (self.is_broken[group].copy(), self.days_to_repair[group].copy(), self.checks_to_failure[group].copy())
+            for kind, group in self.types.items()
+        }
+
+    def set_state(self, state):
+        """
+        Restores get_state(). Types with more machines than in the state keep the extra
+        machines as they are, machines beyond this bank's count are ignored.
+        """
+        for kind, (broken, days_to_repair, checks_to_failure) in state.items():
+            if kind not in self.types:
+                continue
+            group = self.types[kind]
+            n = min(group.stop - group.start, len(broken))
+            index = slice(group.start, group.start + n)
+            self.is_broken[index] = broken[:n]
+            self.days_to_repair[index] = days_to_repair[:n]
+            self.checks_to_failure[index] = checks_to_failure[:n]
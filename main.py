@@ -1,94 +1,263 @@
-from config import MCSimConfig
-from simulation import MarsColony
-import pandas as pd
-import visualization
+import argparse
+import os
+import signal
+import sys
+
+from experiment import run_experiment
 
 # ==========================================
-# MONTE CARLO SIMULATION
+# COMMAND LINE
 # ==========================================
+# python main.py run     simulate experiments (results go to the result cache)
+# python main.py sweep   parameter sweep over MCSimConfig fields
+# python main.py report  experiments + figures (loads what `run` cached)
+# `python main.py [--resume]` is `python main.py report [--resume]` with the defaults.
+#
+# Only the core model is imported up front: pandas and matplotlib are loaded by the
+# commands that build tables and figures, so short invocations and spawned worker
+# processes (which re-import this module) start fast.
 
-def run_experiment(experiment_mode, n_simulations=1000):
-    print(f"\n--- Starting Experiment: {experiment_mode} ---")
-
-    summary_results = []
-    all_histories = []
-    success_count = 0
-    death_causes = {}
-    
-    cfg = MCSimConfig(experiment_mode)
-    
-    for i in range(n_simulations):
-        colony = MarsColony(cfg)
-        alive, cause, history = colony.run_mission()
-
-        if alive: success_count += 1
-        else: death_causes[cause] = death_causes.get(cause, 0) + 1
-        
-        # Save summary of this specific run
-        summary_results.append({
-            "Experiment": experiment_mode,
-            "Run_ID": i,
-            "Survived": alive,
-            "Cause": cause,
-            "Day_Ended": len(history)
-        })
-        
-        # Save the daily trace (Resources over time)
-        # We convert to DataFrame immediately for easier plotting later
-        df_history = pd.DataFrame(history)
-        df_history['Run_ID'] = i
-        all_histories.append(df_history)
-
-    # Sort death causes by index descending
-    death_causes = dict(sorted(death_causes.items(), key=lambda item: item[0], reverse=True)) 
-    
-    # Summarize Results
-    success_rate = (success_count / n_simulations) * 100
-    print(f"Simulations: {n_simulations}")
-    print(f"Success Rate: {success_rate:.2f}%")
-    print(f"Failure Causes: {death_causes}")
-
-    return pd.DataFrame(summary_results), all_histories
+# Experiments of the standard campaign, in report order
+EXPERIMENT_MODES = ("CONTROL", "OXYGENATOR_REDUNDANCY_TEST", "BATTERY_TEST", "CROP_SUBSTRATE_TEST", "COMBINED_TEST")
 
+# Experiments whose traces the report draws
+TRACE_MODES = ("CONTROL", "OXYGENATOR_REDUNDANCY_TEST", "BATTERY_TEST")
 
-# ==========================================
-# MAIN
-# ==========================================
+COMMANDS = ('run', 'sweep', 'report')
+
+
+def _parse_value(text):
+    """Sweep value: int, float or string."""
+    for parse in (int, float):
+        try:
+            return parse(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _parse_axis(text):
+    """'num_oxygenators=1,2,3' -> ('num_oxygenators', [1, 2, 3])."""
+    name, sep, values = text.partition('=')
+    if not sep or not name or not values:
+        raise argparse.ArgumentTypeError(f"Expected NAME=V1,V2,...: {text}")
+    return name, [_parse_value(value) for value in values.split(',')]
+
+
+def _parse_override(text):
+    """'failure_model=next_event' -> ('failure_model', 'next_event')."""
+    name, sep, value = text.partition('=')
+    if not sep or not name or not value:
+        raise argparse.ArgumentTypeError(f"Expected NAME=VALUE: {text}")
+    return name, _parse_value(value)
+
+
+def build_parser():
+    # Options shared by the commands that run experiments
+    experiments = argparse.ArgumentParser(add_help=False)
+    experiments.add_argument('--modes', nargs='+', default=list(EXPERIMENT_MODES), metavar='MODE',
+                             help="Experiment modes (default: the standard campaign)")
+    experiments.add_argument('--runs', type=int, default=2000, help="Runs per experiment")
+    experiments.add_argument('--engine', choices=('scalar', 'batch'), default='batch', help="Simulation engine")
+    experiments.add_argument('--seed', type=int, default=2025, help="Master seed")
+    experiments.add_argument('--workers', type=int, default=1, help="Worker processes (scalar engine)")
+    experiments.add_argument('--cache', default=None, metavar='DIR', help="Result cache directory (default: cache/)")
+    experiments.add_argument('--no-cache', action='store_true', help="Always simulate, do not read or write the cache")
+    experiments.add_argument('--checkpoint', default=None, metavar='DIR',
+                             help="Checkpoint directory of the campaign (default: checkpoints/)")
+    experiments.add_argument('--resume', action='store_true', help="Continue an interrupted campaign from its checkpoint")
+    experiments.add_argument('--set', type=_parse_override, action='append', default=[], dest='overrides',
+                             metavar='NAME=VALUE',
+                             help="MCSimConfig field for every mode, e.g. failure_model=next_event (repeatable)")
+
+    parser = argparse.ArgumentParser(description="Mars colony Monte Carlo experiments")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', parents=[experiments], help="Simulate experiments")
+    run.add_argument('--output', default=None, metavar='CSV', help="Write the run summaries to this CSV file")
+    run.add_argument('--live', type=int, default=None, metavar='PORT',
+                     help="Publish live progress on this localhost port (0 = any free port; see progress.py)")
+    run.add_argument('--concurrency', type=int, default=1, help="Experiments running at the same time with --live")
+
+    report = subparsers.add_parser('report', parents=[experiments], help="Simulate (or load) experiments and plot them")
+    report.add_argument('--output-dir', default=None, metavar='DIR', help="Figure directory (default: results/)")
+    report.add_argument('--render-workers', type=int, default=min(4, os.cpu_count() or 1),
+                        help="Processes rendering the figures")
+    report.add_argument('--density', action='store_true', help="Add trace density heatmaps")
+
+    sweep = subparsers.add_parser('sweep', help="Parameter sweep over MCSimConfig fields")
+    sweep.add_argument('--axis', type=_parse_axis, action='append', required=True, metavar='NAME=V1,V2,...',
+                       help="Swept field and its values (repeat for a grid)")
+    sweep.add_argument('--base-mode', default="CONTROL", help="Mode the overrides are applied to")
+    sweep.add_argument('--runs', type=int, default=1000, help="Runs per point")
+    sweep.add_argument('--engine', choices=('scalar', 'batch'), default='batch', help="Simulation engine")
+    sweep.add_argument('--seed', type=int, default=2025, help="Master seed")
+    sweep.add_argument('--workers', type=int, default=1, help="Worker processes")
+    sweep.add_argument('--chunk-size', type=int, default=None, help="Runs per work unit")
+    sweep.add_argument('--output', default=None, metavar='CSV', help="Write the result table to this CSV file")
+    return parser
+
+
+def run_campaign(args, record_policy=None):
+    """
+    Runs (or loads from the cache) every experiment of args.modes.
+
+    Args:
+        args (argparse.Namespace): Options of the run / report commands.
+        record_policy (callable, optional): mode -> RecordingPolicy of its runs.
+
+    Returns:
+        dict: mode -> (summary DataFrame, TraceRecorder)
+    """
+    from checkpoint import Checkpoint, default_checkpoint_dir
+    from result_store import ResultStore, default_cache_dir
+
+    print("Gathering Data...")
+    # Unchanged experiments are loaded from the cache instead of re-simulated
+    store = None if args.no_cache else ResultStore(args.cache or default_cache_dir)
+
+    # Completed runs are checkpointed; --resume continues an interrupted campaign
+    checkpoint = Checkpoint(args.checkpoint or default_checkpoint_dir)
+    if not args.resume:
+        checkpoint.clear()
+    # Preemption sends SIGTERM: exit through the normal exception path so completed runs are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+
+    results = {}
+    for mode in args.modes:
+        record = record_policy(mode) if record_policy is not None else None
+        results[mode] = run_experiment(mode, n_simulations=args.runs, engine=args.engine, seed=args.seed,
+                                       n_workers=args.workers, store=store, checkpoint=checkpoint, record=record,
+                                       overrides=dict(args.overrides))
+    return results
+
+
+def run_live_campaign(args, record_policy=None):
+    """
+    run_campaign() with a live progress feed: experiments publish their progress on
+    localhost:args.live and clients can stop them (python progress.py watch / cancel).
+
+    Returns:
+        dict: mode -> (summary DataFrame, TraceRecorder) of the experiments with runs
+            (cancelled ones keep the runs completed before the cancel)
+    """
+    import asyncio
+    from progress import ProgressServer, run_live
+    from result_store import ResultStore, default_cache_dir
+
+    if args.resume:
+        raise SystemExit("--live cannot resume a checkpointed campaign")
+    store = None if args.no_cache else ResultStore(args.cache or default_cache_dir)
+
+    # Same recording policy per mode as run_campaign
+    mode_options = {mode: {'record': record_policy(mode) if record_policy is not None else None}
+                    for mode in args.modes}
+
+    async def campaign():
+        async with ProgressServer(port=args.live) as server:
+            print(f"Live progress on 127.0.0.1:{server.port} (python progress.py watch --port {server.port})")
+            return await run_live(args.modes, args.runs, server=server, concurrency=args.concurrency,
+                                  mode_options=mode_options, engine=args.engine, seed=args.seed,
+                                  n_workers=args.workers, store=store, overrides=dict(args.overrides))
+
+    results = {}
+    for mode, (result, status) in asyncio.run(campaign()).items():
+        if result is None:
+            print(f"{mode}: {status} before any run")
+            continue
+        summary = result[0]
+        print(f"{mode}: {status}, {len(summary)} runs, success rate {summary['Survived'].mean() * 100:.2f}%")
+        results[mode] = result
+    return results
+
+
+def _combine(results):
+    """Summaries of every experiment in one DataFrame, experiments in campaign order."""
+    import pandas as pd
+
+    df_all = pd.concat([summary for summary, _ in results.values()], ignore_index=True)
+    order = [mode for mode in EXPERIMENT_MODES if mode in results]
+    order += [mode for mode in results if mode not in order]
+    df_all['Experiment'] = pd.Categorical(df_all['Experiment'], categories=order, ordered=True)
+    return df_all
+
+
+def command_run(args):
+    import visualization
+
+    # Same recording policy as the report, so `report` finds these runs in the cache
+    if args.live is not None:
+        results = run_live_campaign(args, visualization.trace_policy)
+    else:
+        results = run_campaign(args, visualization.trace_policy)
+    if args.output and results:
+        _combine(results).to_csv(args.output, index=False)
+        print(f"Saved: {args.output}")
+
+
+def command_report(args):
+    import visualization
+
+    missing = [mode for mode in TRACE_MODES if mode not in args.modes]
+    if missing:
+        raise SystemExit(f"The report draws the traces of {', '.join(missing)}: add them to --modes")
+
+    # Runs only keep what the plots draw (visualization.trace_policy): the plotted fields of the sample runs
+    results = run_campaign(args, lambda mode: visualization.trace_policy(mode, density=args.density))
+    df_all = _combine(results)
+
+    print("\n\nGenerating Visualizations...")
+    # The four figures are independent: render them on several worker processes
+    visualization.plot_report(df_all, *(results[mode][1] for mode in TRACE_MODES),
+                              n_workers=args.render_workers, density=args.density, directory=args.output_dir)
+
+
+def command_sweep(args):
+    from sweep import run_sweep
+
+    points = [{}]
+    for name, values in args.axis:
+        points = [dict(point, **{name: value}) for point in points for value in values]
+    df = run_sweep(points, n_simulations=args.runs, base_mode=args.base_mode, seed=args.seed, engine=args.engine,
+                   n_workers=args.workers, chunk_size=args.chunk_size)
+    print(df.to_string())
+    if args.output:
+        df.to_csv(args.output)
+        print(f"Saved: {args.output}")
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        # Bare `python main.py [--resume]`: the standard campaign report
+        argv = ['report'] + argv
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'overrides', None):
+        from config import MCSimConfig
+        from simulation import scalar_model_changes
+        try:
+            cfg = MCSimConfig(**dict(args.overrides))
+        except ValueError as error:
+            parser.error(str(error))
+        changed = scalar_model_changes(cfg)
+        if changed and args.engine == 'batch':
+            parser.error(f"{', '.join(changed)}: only supported by the scalar engine (--engine scalar)")
+    if args.command == 'sweep' and args.engine == 'batch':
+        from simulation import SCALAR_MODEL_FIELDS
+        scalar_axes = [name for name, _ in args.axis if name in SCALAR_MODEL_FIELDS]
+        if scalar_axes:
+            parser.error(f"{', '.join(scalar_axes)}: only supported by the scalar engine (--engine scalar)")
 
-if __name__ == "__main__":
     print("==============================")
     print("=== Mars Colony Simulation ===")
     print("==============================")
+    {'run': command_run, 'sweep': command_sweep, 'report': command_report}[args.command](args)
 
-    # --- 1. Run Simulations ---
-    print("Gathering Data...")
-    
-    # Number of simulations per experiment
-    n_simulations = 2000
-    
-    # Run Control
-    control_summary, control_histories = run_experiment("CONTROL", n_simulations=n_simulations)
-    
-    # Run Hypothesis 1 (Oxygenator Redundancy)
-    oxy_summary, oxy_histories = run_experiment("OXYGENATOR_REDUNDANCY_TEST", n_simulations=n_simulations)
-    
-    # Run Hypothesis 2 (Battery Buffer)
-    battery_summary, battery_histories = run_experiment("BATTERY_TEST", n_simulations=n_simulations)
-
-    # Run Hypothesis 3 (Crop Substrate)
-    substrate_summary, substrate_histories = run_experiment("CROP_SUBSTRATE_TEST", n_simulations=n_simulations)
-
-    # Run Combined Test
-    combined_summary, combined_histories = run_experiment("COMBINED_TEST", n_simulations=n_simulations)
-
-    # --- 2. Combine Results ---
-    df_all = pd.concat([control_summary, oxy_summary, battery_summary, substrate_summary, combined_summary], ignore_index=True)
-    # Order by "Control", "Oxygenator Redundancy", "Battery Test", "Crop Substrate Test", "Combined Test"
-    df_all['Experiment'] = pd.Categorical(df_all['Experiment'], categories=["CONTROL", "OXYGENATOR_REDUNDANCY_TEST", "BATTERY_TEST", "CROP_SUBSTRATE_TEST", "COMBINED_TEST"], ordered=True)
-
-    # --- 3. Visualizations ---
-    print("\n\nGenerating Visualizations...")
-    visualization.plot_survival_curves(df_all)
-    visualization.plot_failure_analysis(df_all)
-    visualization.plot_redundancy_validation(control_histories, oxy_histories)
-    visualization.plot_battery_stability(control_histories, battery_histories)
\ No newline at end of file
+
+# ==========================================
+# MAIN
+# ==========================================
+
+if __name__ == "__main__":
+    main()
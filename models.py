@@ -5,21 +5,76 @@ import math
 # RANDOM VARIABLE MODELS
 # ==========================================
 
+# Repair time of a machine: ceil(LogNormal(mu, sigma)) days, mean ~2.7 days before rounding
+REPAIR_LOG_MEAN = 1.0
+REPAIR_LOG_SIGMA = 0.8
+
+# Failure/repair counters kept by every machine (see Machine)
+MACHINE_COUNTERS = ('failures', 'checks_at_risk', 'repair_days')
+
 class Machine:
     """
     Represents a machine (Oxygenator, Water Reclaimer).
     Includes Random Variables:
     - Failure (Exponential Distribution)
     - Repair Time (Log-Normal Distribution)
+
+    Failure models:
+    - 'daily': roll a Bernoulli(1 - e^(-1/MTBF)) on every check.
+    - 'next_event': sample the number of checks until the next failure up front
+      (Geometric with the same per-check probability) and just count it down.
+      Same distribution, but one draw per failure instead of one per day.
+
+    Counters (since creation or reset_counters()): failures, checks_at_risk (checks of a
+    working machine, each of which fails with fail_prob) and repair_days (sum of the sampled
+    repair times). They give zero-mean martingales for control variates (see surrogate.py).
     """
-    def __init__(self, name, production_rate, mtbf_days):
+    # No per-instance __dict__: smaller objects and faster attribute access in daily_check()
+    __slots__ = ('rng', 'repair_rng', 'name', 'production_rate', 'mtbf', 'fail_prob', 'is_broken', 'days_to_repair',
+                 'failures', 'checks_at_risk', 'repair_days', 'failure_model', 'checks_to_failure')
+
+    def __init__(self, name, production_rate, mtbf_days, rng=None, repair_rng=None, failure_model="daily"):
+        self.rng = rng if rng is not None else random # Random stream (defaults to the global one)
+        self.repair_rng = repair_rng if repair_rng is not None else self.rng
         self.name = name
         self.production_rate = production_rate
         self.mtbf = mtbf_days # Mean Time Between Failures
+        # Math: Probability of failing on a given day = 1 - e^(-1/MTBF)
+        self.fail_prob = 1 - math.exp(-1 / mtbf_days)
         self.is_broken = False
         self.days_to_repair = 0
+        self.reset_counters()
+
+        if failure_model not in ("daily", "next_event"):
+            raise ValueError(f"Unknown failure model: {failure_model}")
+        self.failure_model = failure_model
+        self.checks_to_failure = None
+        if failure_model == "next_event":
+            self.checks_to_failure = self.sample_checks_to_failure()
+
+    def sample_checks_to_failure(self):
+        # Geometric (checks until failure, >= 1): P(k) = (1-p)^(k-1) * p with p = fail_prob
+        # Inverse transform: k = ceil(ln(U) / ln(1-p)) = ceil(-MTBF * ln(U)), U in (0, 1]
+        u = 1.0 - self.rng.random()
+        return max(1, math.ceil(-self.mtbf * math.log(u)))
+
+    def reset_counters(self):
+        self.failures = 0
+        self.checks_at_risk = 0
+        self.repair_days = 0
+
+    def _fail(self):
+        self.is_broken = True
+        # Repair Time (Log-Normal)
+        repair_time = self.repair_rng.lognormvariate(REPAIR_LOG_MEAN, REPAIR_LOG_SIGMA) # Mean ~2.7 days, Sigma=0.8
+        self.days_to_repair = math.ceil(repair_time)
+        self.failures += 1
+        self.repair_days += self.days_to_repair
 
     def daily_check(self):
+        if self.checks_to_failure is not None:
+            return self._next_event_check()
+
         # If already broken, decrement repair timer
         if self.is_broken:
             self.days_to_repair -= 1
@@ -29,16 +84,37 @@ class Machine:
             return 0.0 # No production if broken
 
         # Check for random failure
-        # Math: Probability of failing today = 1 - e^(-1/MTBF)
-        fail_prob = 1 - math.exp(-1 / self.mtbf)
-        if random.random() < fail_prob:
-            self.is_broken = True
-            # Repair Time (Log-Normal)
-            repair_time = random.lognormvariate(1.0, 0.8) # Mean ~2.7 days, Sigma=0.8
-            self.days_to_repair = math.ceil(repair_time)
+        self.checks_at_risk += 1
+        if self.rng.random() < self.fail_prob:
+            self._fail()
             return 0.0
         
         return self.production_rate
+
+    def _next_event_check(self):
+        """daily_check() for the 'next_event' failure model (no draw unless something happens)."""
+        if self.is_broken:
+            self.days_to_repair -= 1
+            if self.days_to_repair <= 0:
+                self.is_broken = False
+                self.days_to_repair = 0
+                self.checks_to_failure = self.sample_checks_to_failure()
+            return 0.0
+
+        self.checks_at_risk += 1
+        self.checks_to_failure -= 1
+        if self.checks_to_failure <= 0:
+            self._fail()
+            return 0.0
+
+        return self.production_rate
+
+    def get_state(self):
+        """Breakdown state: (is_broken, days_to_repair, checks_to_failure)."""
+        return self.is_broken, self.days_to_repair, self.checks_to_failure
+
+    def set_state(self, state):
+        self.is_broken, self.days_to_repair, self.checks_to_failure = state
     
 class CropModule:
     """
@@ -48,7 +124,10 @@ class CropModule:
     Includes Random Variables:
     - Biological Variability (Normal Distribution)
     """
-    def __init__(self, base_food, base_o2, decay_rate):
+    __slots__ = ('rng', 'base_food', 'base_o2', 'health', 'decay_rate')
+
+    def __init__(self, base_food, base_o2, decay_rate, rng=None):
+        self.rng = rng if rng is not None else random
         self.base_food = base_food
         self.base_o2 = base_o2
         self.health = 1.0 # Health factor
@@ -64,19 +143,23 @@ class CropModule:
         # Clamp health between 0 and 1
         self.health = max(0.0, min(1.0, self.health))
 
+        # Biological Variability (Normal Distribution)
+        # Plants vary by +/- 10% naturally (Mean=1.0, Sigma=0.1)
+        # Drawn every day (even for dead crops) so draw k always belongs to day k
+        bio_factor = self.rng.normalvariate(1.0, 0.1)
+
         # If dead, no production
         if self.health <= 0.0:
             return 0.0, 0.0
         
-        # Biological Variability (Normal Distribution)
-        # Plants vary by +/- 10% naturally (Mean=1.0, Sigma=0.1)
-        bio_factor = random.normalvariate(1.0, 0.1)
-        
         # Production
         return (self.base_food * self.health * bio_factor, self.base_o2 * self.health * bio_factor)
 
 class MarsEnvironment:
-    def __init__(self):
+    __slots__ = ('rng', 'is_storming', 'storm_counter')
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random
         self.is_storming = False
         self.storm_counter = 0
 
@@ -119,9 +202,9 @@ class MarsEnvironment:
             daily_storm_prob = peak_prob * math.exp( - ((Ls_degrees - mu) ** 2) / (2 * sigma ** 2) )
             
             # Only roll for storm if probability is significant (> 0.0001)
-            if daily_storm_prob > 0.0001 and random.random() < daily_storm_prob:
+            if daily_storm_prob > 0.0001 and self.rng.random() < daily_storm_prob:
                 self.is_storming = True
-                self.storm_counter = random.randint(5, 15) # Storm lasts 5-15 days (arbitrary)
+                self.storm_counter = self.rng.randint(5, 15) # Storm lasts 5-15 days (arbitrary)
 
         # --- 3. TOTAL OPACITY ---
         total_tau = tau_base + storm_opacity
@@ -131,3 +214,10 @@ class MarsEnvironment:
         efficiency = math.exp(-total_tau)
         
         return max(0.02, efficiency) # Never goes below 2% (ambient light)
+
+    def get_state(self):
+        """Storm state: (is_storming, storm_counter)."""
+        return self.is_storming, self.storm_counter
+
+    def set_state(self, state):
+        self.is_storming, self.storm_counter = state
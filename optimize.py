@@ -0,0 +1,170 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sweep import make_config, evaluate_units
+from stats import binomial_interval
+
+# ==========================================
+# RACING OPTIMIZER (CHEAPEST CONFIG MEETING A SURVIVAL TARGET)
+# ==========================================
+
+# Status of a candidate during the race
+CONTENDER = "contender"   # Interval still contains the target
+FEASIBLE = "feasible"     # Interval entirely above the target
+REJECTED = "rejected"     # Interval entirely below the target
+TOO_COSTLY = "too costly" # Not feasible (yet) and costs at least as much as a feasible candidate
+UNDECIDED = "undecided"   # Ran out of runs with the target still inside the interval
+SCREENED = "screened"     # Discarded by the screen before any run
+
+
+def find_cheapest_config(candidates, cost, target=0.99, base_mode="CONTROL", confidence=0.95,
+                         interval="wilson", initial_runs=200, growth=2.0, max_runs=20000,
+                         max_total_runs=None, seed=2025, engine="batch", n_workers=1, chunk_size=5000,
+                         screen=None, executor=None):
+    """
+    Finds the cheapest configuration whose survival rate reaches `target`, racing the
+    candidates against each other instead of giving every one the same number of runs.
+
+    Every round tops up the remaining candidates to the round's run count (initial_runs,
+    then x growth each round, up to max_runs) and classifies them with a confidence interval
+    of the survival rate:
+    - upper bound below the target: rejected, no more runs;
+    - lower bound above the target: feasible, no more runs;
+    - otherwise still a contender, unless it costs at least as much as the cheapest feasible
+      candidate (it can no longer be the answer).
+    The race ends when no contender is left, max_runs is reached or max_total_runs are spent.
+
+    Args:
+        candidates (list): MCSimConfig overrides per candidate (e.g. sweep.grid(...)).
+        cost (callable): cost(cfg) -> float for an MCSimConfig (mass, price...). Lower is better.
+        target (float): Required survival probability.
+        base_mode (str): MCSimConfig mode the overrides are applied to.
+        confidence (float): Confidence level of the intervals.
+        interval (str): 'wilson' or 'clopper-pearson'.
+        initial_runs (int): Runs per candidate in the first round.
+        growth (float): Run count multiplier between rounds.
+        max_runs (int): Maximum runs per candidate.
+        max_total_runs (int, optional): Budget of the whole race.
+        seed (int): Master seed (candidates share Run_IDs, see sweep.run_sweep).
+        engine (str): 'batch' or 'scalar'.
+        n_workers (int): Worker processes (1 = run in this process).
+        chunk_size (int): Maximum runs per work unit.
+        screen (callable, optional): screen(cfg) -> bool, False discards a candidate before any
+            run (e.g. surrogate.deficit_screen(), instant). Only screen out candidates that
+            clearly cannot reach the target: the screen is not checked against the runs.
+        executor (concurrent.futures.Executor, optional): Runs the units instead of n_workers
+            local processes (e.g. distributed.ClusterExecutor); it is not shut down here.
+
+    Returns:
+        dict:
+            best: row of the cheapest feasible candidate (None if there is none)
+            table: DataFrame with one row per candidate (overrides, Cost, Runs, Survived,
+                Success_Rate, CI_Low, CI_High, Status, Pareto)
+            pareto: rows of the cost vs survival Pareto front, sorted by cost
+            runs_spent: total Monte Carlo runs
+            rounds: number of rounds
+    """
+    import pandas as pd
+
+    configs = [make_config(point, base_mode) for point in candidates]
+    costs = np.array([float(cost(cfg)) for cfg in configs])
+    n = len(configs)
+    runs = np.zeros(n, dtype=np.int64)
+    survived = np.zeros(n, dtype=np.int64)
+    status = np.full(n, CONTENDER, dtype=object)
+    if screen is not None:
+        status[np.array([not screen(cfg) for cfg in configs], dtype=bool)] = SCREENED
+    bounds = np.zeros((n, 2))
+    bounds[:, 1] = 1.0
+
+    pool = executor
+    if pool is None and n_workers > 1:
+        pool = ProcessPoolExecutor(max_workers=n_workers)
+    runs_spent = 0
+    rounds = 0
+    round_runs = initial_runs
+    try:
+        while True:
+            active = np.flatnonzero(status == CONTENDER)
+            if active.size == 0:
+                break
+            round_runs = min(round_runs, max_runs)
+            if max_total_runs is not None:
+                # Share what is left of the budget between the contenders
+                left = max_total_runs - runs_spent
+                round_runs = min(round_runs, int(runs[active].min()) + left // active.size)
+            if round_runs <= runs[active].min():
+                break
+
+            # Top up every contender to round_runs (cheapest first, they matter most)
+            active = active[np.argsort(costs[active], kind="stable")]
+            tasks, owners = [], []
+            for index in active:
+                for start in range(int(runs[index]), round_runs, chunk_size):
+                    tasks.append((configs[index], range(start, min(start + chunk_size, round_runs))))
+                    owners.append(index)
+            for task, (unit_survived, _, _) in evaluate_units(tasks, seed, engine, pool=pool):
+                survived[owners[task]] += unit_survived
+            runs_spent += round_runs * active.size - int(runs[active].sum())
+            runs[active] = round_runs
+            rounds += 1
+
+            for index in active:
+                low, high = binomial_interval(int(survived[index]), int(runs[index]), confidence, interval)
+                bounds[index] = low, high
+                if high < target:
+                    status[index] = REJECTED
+                elif low >= target:
+                    status[index] = FEASIBLE
+
+            feasible = status == FEASIBLE
+            if feasible.any():
+                best_cost = costs[feasible].min()
+                status[(status == CONTENDER) & (costs >= best_cost)] = TOO_COSTLY
+
+            if round_runs >= max_runs:
+                break
+            round_runs = int(np.ceil(round_runs * growth))
+    finally:
+        if pool is not None and pool is not executor:
+            pool.shutdown()
+
+    status[status == CONTENDER] = UNDECIDED
+
+    axes = list(dict.fromkeys(name for point in candidates for name in point))
+    table = pd.DataFrame([
+        {name: point.get(name, getattr(configs[index], name)) for name in axes}
+        for index, point in enumerate(candidates)
+    ])
+    table["Cost"] = costs
+    table["Runs"] = runs
+    table["Survived"] = survived
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table["Success_Rate"] = survived / runs
+    table["CI_Low"] = bounds[:, 0]
+    table["CI_High"] = bounds[:, 1]
+    table["Status"] = status
+    table["Pareto"] = _pareto_mask(costs, table["Success_Rate"].to_numpy())
+
+    feasible = table[table["Status"] == FEASIBLE]
+    best = feasible.loc[feasible["Cost"].idxmin()] if len(feasible) else None
+    return {
+        'best': best,
+        'table': table,
+        'pareto': table[table["Pareto"]].sort_values("Cost"),
+        'runs_spent': runs_spent,
+        'rounds': rounds,
+    }
+
+
+def _pareto_mask(costs, rates):
+    """Candidates not dominated by a cheaper-or-equal one with a higher-or-equal survival rate."""
+    order = np.lexsort((-rates, costs)) # By cost, best rate first among equal costs
+    mask = np.zeros(len(costs), dtype=bool)
+    best_rate = -np.inf
+    for index in order:
+        if rates[index] > best_rate:
+            mask[index] = True
+            best_rate = rates[index]
+    return mask
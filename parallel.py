@@ -0,0 +1,175 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from simulation import MarsColony, MACHINE_COUNTER_COLUMNS
+from batch_simulation import BatchMarsColony, CAUSES
+from seeding import make_run_rng, make_run_streams, run_seed_sequence
+from traces import TraceRecorder, RECORD_ALL
+from aggregation import ExperimentAccumulator
+from profiler import StepProfiler
+
+# ==========================================
+# PARALLEL EXECUTION
+# ==========================================
+
+def run_single(cfg, run_id, master_seed):
+    """
+    Runs (or re-runs) one mission in isolation.
+    Gives exactly the same result as run `run_id` of a seeded experiment, whatever the worker count.
+
+    Args:
+        cfg (MCSimConfig): Simulation parameters.
+        run_id (int): Index of the run within the experiment.
+        master_seed (int): Seed of the whole experiment.
+
+    Returns:
+        tuple: (survived, cause of death, history as list of dicts)
+    """
+    colony = MarsColony(cfg, rng=make_run_rng(master_seed, run_id))
+    return colony.run_mission()
+
+
+def simulate_runs(cfg, run_ids, master_seed, aggregate=False, crn=False, antithetic=False, profile=False, record=None,
+                  counters=False):
+    """
+    Worker task: simulates a chunk of runs.
+
+    Args:
+        cfg (MCSimConfig): Simulation parameters.
+        run_ids (range): Runs of this chunk.
+        master_seed (int): Seed of the whole experiment (None = global `random` state, in-process only).
+        aggregate (bool): Return an ExperimentAccumulator of the chunk instead of its traces.
+        crn (bool): Common random numbers: one stream per model (see seeding.RunStreams).
+        antithetic (bool): With crn, runs 2k/2k+1 form an antithetic pair.
+        profile (bool): Instrument every step with a StepProfiler shared by the chunk.
+        record (RecordingPolicy, optional): What the runs record (default: RECORD_ALL).
+        counters (bool): Also return the machine failure/repair counters of every run
+            (MarsColony.machine_counters(), for surrogate.machine_controls()).
+
+    Returns:
+        tuple: (list of (run_id, survived, cause, day_ended) in the order of run_ids,
+                TraceRecorder with the daily traces of the chunk, or its ExperimentAccumulator)
+            With profile=True the chunk's StepProfiler is appended to the tuple, then with
+            counters=True a dict of counter name -> array (one value per run).
+    """
+    recorder = TraceRecorder(len(run_ids), policy=record, first_run=run_ids.start)
+    profiler = StepProfiler() if profile else None
+    summaries = []
+    run_counters = []
+    for run_id in run_ids:
+        if crn:
+            colony = MarsColony(cfg, run_id=run_id, streams=make_run_streams(master_seed, run_id, antithetic),
+                                profiler=profiler)
+        else:
+            rng = make_run_rng(master_seed, run_id) if master_seed is not None else None
+            colony = MarsColony(cfg, rng=rng, run_id=run_id, profiler=profiler)
+        alive, cause, _ = colony.run_mission(recorder=recorder)
+        summaries.append((run_id, alive, cause, colony.day))
+        if counters:
+            run_counters.append(colony.machine_counters())
+
+    if aggregate:
+        result = ExperimentAccumulator(cfg)
+        result.update_traces(recorder, summaries)
+    else:
+        result = recorder.trim()
+    extras = (profiler,) if profile else ()
+    if counters:
+        extras += ({name: np.array([run[name] for run in run_counters], dtype=np.int64) for name in MACHINE_COUNTER_COLUMNS},)
+    return (summaries, result) + extras
+
+
+def simulate_batch(cfg, run_ids, master_seed, aggregate=False, record=None):
+    """
+    Worker task: steps the colonies of runs `run_ids` in lockstep with BatchMarsColony.
+    Only the fields of the recording policy are kept, and none for batches without a traced run.
+
+    Args:
+        cfg (MCSimConfig): Simulation parameters.
+        run_ids (range): Runs of this batch.
+        master_seed (int): Seed of the whole experiment (the batch stream is keyed by its first Run_ID).
+        aggregate (bool): Return an ExperimentAccumulator of the batch instead of its traces.
+        record (RecordingPolicy, optional): What the runs record (default: RECORD_ALL).
+
+    Returns:
+        tuple: (summary arrays {'survived', 'cause', 'day_ended'}, TraceRecorder)
+        ExperimentAccumulator: when aggregate=True.
+    """
+    start, n = run_ids.start, len(run_ids)
+    record = record if record is not None else RECORD_ALL
+    # Each batch has its own stream, keyed by its first Run_ID
+    rng = np.random.default_rng(run_seed_sequence(master_seed, start))
+    colonies = BatchMarsColony(cfg, n, rng=rng)
+    fields = record.fields if aggregate or record.traced_runs(start, n) else ()
+    alive, cause, day_ended, history = colonies.run_mission(record_history=fields)
+
+    if aggregate:
+        accumulator = ExperimentAccumulator(cfg)
+        accumulator.update_history(alive, np.asarray(CAUSES, dtype=object)[cause], day_ended, history)
+        return accumulator
+
+    # Copy the lockstep arrays into the columnar store (trimmed at the day each run ended)
+    traces = TraceRecorder(n, policy=record, first_run=start)
+    traces.add_batch(np.arange(start, start + n), day_ended, history)
+    return {'survived': alive.copy(), 'cause': cause.copy(), 'day_ended': day_ended.copy()}, traces
+
+
+def iter_runs(cfg, n_simulations, master_seed, n_workers=1, chunk_size=None, aggregate=False, first_run=0,
+              crn=False, antithetic=False, profile=False, record=None, counters=False, executor=None):
+    """
+    Simulates runs first_run..first_run+n_simulations-1, sharded across a process pool
+    (or any executor, e.g. distributed.ClusterExecutor for several nodes).
+    Chunk results are yielded in Run_ID order, so the merged output is identical
+    for any n_workers / chunk_size / executor.
+
+    Args:
+        cfg (MCSimConfig): Simulation parameters.
+        n_simulations (int): Number of runs.
+        master_seed (int): Seed of the whole experiment (None only with n_workers=1).
+        n_workers (int): Number of worker processes (1 = run in this process).
+        chunk_size (int, optional): Runs per work unit. Defaults to ~4 chunks per worker
+            (1000 runs when running in this process).
+        aggregate (bool): Chunks return accumulators instead of traces (see simulate_runs).
+        first_run (int): Run_ID of the first run (e.g. to top up an existing set of runs).
+        crn, antithetic (bool): Common random numbers options (see simulate_runs).
+        profile (bool): Chunks also return a StepProfiler (see simulate_runs).
+        record (RecordingPolicy, optional): What the runs record (see simulate_runs).
+        counters (bool): Chunks also return the machine counters of their runs (see simulate_runs).
+        executor (concurrent.futures.Executor, optional): Runs the chunks instead of n_workers
+            local processes (chunk_size defaults to 1000 runs).
+
+    Yields:
+        tuple: (chunk summaries, chunk TraceRecorder or ExperimentAccumulator) as returned by simulate_runs()
+    """
+    if crn and master_seed is None:
+        raise ValueError("Common random numbers need a master seed")
+
+    if chunk_size is None:
+        if n_workers <= 1 or executor is not None:
+            chunk_size = 1000
+        else:
+            chunk_size = max(1, math.ceil(n_simulations / (n_workers * 4)))
+    end = first_run + n_simulations
+    chunks = [range(start, min(start + chunk_size, end)) for start in range(first_run, end, chunk_size)]
+
+    if executor is not None:
+        if master_seed is None:
+            raise ValueError("Distributed runs need a master seed")
+        yield from executor.map(simulate_runs, repeat(cfg), chunks, repeat(master_seed), repeat(aggregate),
+                                repeat(crn), repeat(antithetic), repeat(profile), repeat(record), repeat(counters))
+        return
+
+    if n_workers <= 1:
+        for chunk in chunks:
+            yield simulate_runs(cfg, chunk, master_seed, aggregate, crn, antithetic, profile, record, counters)
+        return
+
+    if master_seed is None:
+        raise ValueError("Parallel runs need a master seed")
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        yield from pool.map(simulate_runs, repeat(cfg), chunks, repeat(master_seed), repeat(aggregate),
+                            repeat(crn), repeat(antithetic), repeat(profile), repeat(record), repeat(counters))
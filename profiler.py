@@ -0,0 +1,116 @@
+import time
+
+# ==========================================
+# STEP INSTRUMENTATION
+# ==========================================
+
+# Phases of MarsColony.step(), in order
+PHASES = ('environment', 'crops', 'oxygenators', 'water_reclaimers', 'resources', 'survival')
+
+# Events counted per machine group ('oxygenator_failures', 'water_reclaimer_repair_days'...)
+MACHINE_GROUPS = ('oxygenator', 'water_reclaimer')
+MACHINE_EVENTS = ('failures', 'repair_days', 'power_starved_attempts', 'storage_capped_days')
+EVENTS = ('steps', 'storm_days') + tuple(f"{group}_{event}" for group in MACHINE_GROUPS for event in MACHINE_EVENTS)
+
+
+class StepProfiler:
+    """
+    Opt-in instrumentation of MarsColony.step(): wall time per phase and event counts.
+
+    Pass one to MarsColony(cfg, profiler=...) (or run_experiment(profile=True)). Without a
+    profiler step() only pays a few `is None` checks.
+
+    Events:
+    - steps, storm_days: simulated days, days ending with a storm in progress
+    - <group>_failures: machines that broke down
+    - <group>_repair_days: machine-days spent broken (downtime)
+    - <group>_power_starved_attempts: machines not run for lack of power
+    - <group>_storage_capped_days: days the group stopped because the output tank was full
+
+    Profilers of different runs or workers add up with merge().
+    """
+    def __init__(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(EVENTS, 0)
+        self._broken = ()
+
+    # --- Hooks called by MarsColony ---
+
+    def start_step(self, colony):
+        """Counts the downtime of the day and returns the phase start time."""
+        counts = self.counts
+        counts['steps'] += 1
+        bank = colony.bank
+        if bank is not None:
+            # MachineBank: downtime and breakdowns come from its per-type counts
+            self._broken = dict(bank.failures)
+            for group in MACHINE_GROUPS:
+                counts[f"{group}_repair_days"] += bank.n_broken(group)
+            return time.perf_counter()
+        self._broken = [machine.is_broken for machine in colony.oxygenators + colony.water_reclaimers]
+        counts['oxygenator_repair_days'] += sum(machine.is_broken for machine in colony.oxygenators)
+        counts['water_reclaimer_repair_days'] += sum(machine.is_broken for machine in colony.water_reclaimers)
+        return time.perf_counter()
+
+    def lap(self, phase, start):
+        """Adds the time since `start` to `phase` and returns the start of the next phase."""
+        now = time.perf_counter()
+        self.times[phase] += now - start
+        return now
+
+    def machines_skipped(self, group, count, has_power, needs_output):
+        """`count` machines of `group` were not run today (see MarsColony._run_machines)."""
+        if not needs_output:
+            self.counts[f"{group}_storage_capped_days"] += 1
+        elif not has_power:
+            self.counts[f"{group}_power_starved_attempts"] += count
+
+    def end_step(self, colony, start):
+        self.lap('survival', start)
+        counts = self.counts
+        counts['storm_days'] += colony.env.is_storming
+        if colony.bank is not None:
+            for group in MACHINE_GROUPS:
+                counts[f"{group}_failures"] += colony.bank.failures[group] - self._broken[group]
+            return
+        n_oxygenators = len(colony.oxygenators)
+        for index, machine in enumerate(colony.oxygenators + colony.water_reclaimers):
+            if machine.is_broken and not self._broken[index]:
+                group = 'oxygenator' if index < n_oxygenators else 'water_reclaimer'
+                counts[f"{group}_failures"] += 1
+
+    # --- Aggregation ---
+
+    def merge(self, other):
+        """Adds the times and counts of another profiler (e.g. from another worker)."""
+        for phase, seconds in other.times.items():
+            self.times[phase] = self.times.get(phase, 0.0) + seconds
+        for event, count in other.counts.items():
+            self.counts[event] = self.counts.get(event, 0) + count
+        return self
+
+    @property
+    def total_time(self):
+        return sum(self.times.values())
+
+    def to_frame(self):
+        """
+        One row per phase and per event.
+        Columns: Type ('time' in seconds or 'count'), Total, Per_Step, Share (of the step time).
+        """
+        import pandas as pd
+
+        steps = max(self.counts['steps'], 1)
+        total_time = self.total_time
+        rows = []
+        for phase, seconds in self.times.items():
+            rows.append({
+                "Name": phase,
+                "Type": "time",
+                "Total": seconds,
+                "Per_Step": seconds / steps,
+                "Share": seconds / total_time if total_time > 0 else float('nan'),
+            })
+        for event, count in self.counts.items():
+            rows.append({"Name": event, "Type": "count", "Total": count, "Per_Step": count / steps, "Share": float('nan')})
+        return pd.DataFrame(rows).set_index("Name")
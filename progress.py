@@ -0,0 +1,359 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from batch_simulation import CAUSES
+from aggregation import ExperimentAccumulator
+from experiment import iter_experiment, merge_parts, summary_frame
+from stats import wilson_interval
+
+# ==========================================
+# ASYNC RESULTS
+# ==========================================
+
+_DONE = object()
+
+
+async def aiter_experiment(experiment_mode, n_simulations=1000, **kwargs):
+    """
+    Async iterator over the (part, cached) work units of an experiment (see experiment.iter_experiment()).
+
+    The simulation runs in a worker thread (its own process pool / executor when configured),
+    so the event loop stays free between units. Leaving the loop (break, cancellation of the
+    task) stops the experiment once the unit in progress is done.
+
+    Example:
+        async for (summary, traces), cached in aiter_experiment("CONTROL", 10000, seed=1):
+            ...
+    """
+    units = iter_experiment(experiment_mode, n_simulations, **kwargs)
+    loop = asyncio.get_running_loop()
+    # One thread: next() and close() of the generator never overlap
+    thread = ThreadPoolExecutor(max_workers=1)
+    try:
+        while True:
+            part = await loop.run_in_executor(thread, next, units, _DONE)
+            if part is _DONE:
+                return
+            yield part
+    finally:
+        await asyncio.shield(loop.run_in_executor(thread, units.close))
+        thread.shutdown(wait=False)
+
+
+# ==========================================
+# PROGRESS
+# ==========================================
+
+class ExperimentProgress:
+    """
+    Running statistics of an experiment, updated with each unit: survival rate and its
+    interval, cause counts, throughput (over the last RATE_WINDOW units) and ETA.
+    """
+    RATE_WINDOW = 10
+
+    def __init__(self, name, n_total, confidence=0.95):
+        self.name = name
+        self.n_total = n_total
+        self.confidence = confidence
+        self.status = "queued" # queued -> running -> done / cancelled / failed
+        self.n_runs = 0
+        self.n_survived = 0
+        self.cause_counts = {}
+        self.started = None
+        self.finished = None
+        self._history = deque(maxlen=self.RATE_WINDOW + 1) # (time, simulated runs)
+        self._simulated = 0
+
+    def start(self):
+        self.status = "running"
+        self.started = time.monotonic()
+        self._history.append((self.started, 0))
+
+    def update(self, part, cached=False):
+        """
+        Adds a unit of iter_experiment().
+
+        Args:
+            part: (summary arrays, TraceRecorder) or ExperimentAccumulator.
+            cached (bool): The unit was loaded, not simulated (not counted in the throughput).
+        """
+        if isinstance(part, ExperimentAccumulator):
+            n, survived, causes = part.n_runs, part.n_survived, part.cause_counts
+        else:
+            summary = part[0]
+            n, survived = len(summary['survived']), int(np.sum(summary['survived']))
+            codes = np.bincount(np.asarray(summary['cause']), minlength=len(CAUSES))
+            causes = {CAUSES[code]: int(count) for code, count in enumerate(codes) if code and count}
+        self.n_runs += n
+        self.n_survived += survived
+        for cause, count in causes.items():
+            self.cause_counts[cause] = self.cause_counts.get(cause, 0) + count
+        if cached:
+            # Loading time is not simulation time: measure from here
+            self._history.clear()
+        else:
+            self._simulated += n
+        self._history.append((time.monotonic(), self._simulated))
+
+    def finish(self, status):
+        self.status = status
+        self.finished = time.monotonic()
+
+    @property
+    def runs_per_sec(self):
+        if len(self._history) < 2:
+            return 0.0
+        (t0, n0), (t1, n1) = self._history[0], self._history[-1]
+        if self.status == "running":
+            # Includes the time spent on the unit in progress
+            t1 = time.monotonic()
+        return (n1 - n0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def snapshot(self):
+        """JSON-ready state (what the progress server publishes)."""
+        low, high = wilson_interval(self.n_survived, self.n_runs, self.confidence)
+        rate = self.runs_per_sec
+        remaining = self.n_total - self.n_runs
+        end = self.finished if self.finished is not None else time.monotonic()
+        return {
+            "experiment": self.name,
+            "status": self.status,
+            "runs": self.n_runs,
+            "total": self.n_total,
+            "survival": self.n_survived / self.n_runs if self.n_runs else None,
+            "ci_low": low,
+            "ci_high": high,
+            "causes": dict(self.cause_counts),
+            "runs_per_sec": rate,
+            "elapsed": end - self.started if self.started is not None else 0.0,
+            "eta": remaining / rate if self.status == "running" and rate > 0 else None,
+        }
+
+
+# ==========================================
+# LIVE PROGRESS SERVER
+# ==========================================
+# Newline-delimited JSON over TCP (localhost by default).
+# Server -> client: one snapshot per line (ExperimentProgress.snapshot()), on every completed
+#   unit and every `interval` seconds; the current state of every experiment on connection.
+# Client -> server: {"cancel": "<experiment>"} ("*" = all), answered with {"cancelled": [...]}.
+
+class ProgressServer:
+    """
+    Publishes the progress of running experiments to connected clients and collects cancel
+    requests (see run_live()).
+    """
+    def __init__(self, host="127.0.0.1", port=0, interval=1.0):
+        """
+        Args:
+            host (str): Interface to listen on (keep localhost unless the network is trusted:
+                any client can cancel experiments).
+            port (int): TCP port (0 = any free port, see .port once started).
+            interval (float): Seconds between two periodic snapshots.
+        """
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.progress = {} # Experiment -> ExperimentProgress
+        self.cancelled = set()
+        self._clients = set()
+        self._server = None
+        self._ticker = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ticker = asyncio.create_task(self._tick())
+        return self
+
+    async def close(self):
+        if self._ticker is not None:
+            self._ticker.cancel()
+        # Last state of every experiment before disconnecting
+        for progress in self.progress.values():
+            self.publish(progress)
+        for queue in self._clients:
+            queue.put_nowait(None)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def publish(self, progress):
+        """Sends the snapshot of an experiment to every client."""
+        self.progress[progress.name] = progress
+        line = json.dumps(progress.snapshot()).encode() + b"\n"
+        for queue in self._clients:
+            queue.put_nowait(line)
+
+    def is_cancelled(self, name):
+        return name in self.cancelled or "*" in self.cancelled
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for progress in self.progress.values():
+                if progress.status == "running":
+                    self.publish(progress)
+
+    async def _handle(self, reader, writer):
+        queue = asyncio.Queue()
+        for progress in self.progress.values():
+            queue.put_nowait(json.dumps(progress.snapshot()).encode() + b"\n")
+        self._clients.add(queue)
+
+        async def send():
+            try:
+                while (line := await queue.get()) is not None:
+                    writer.write(line)
+                    await writer.drain()
+            finally:
+                # Server closing: the client (and the read loop below) get EOF
+                writer.close()
+
+        sender = asyncio.create_task(send())
+        try:
+            while line := await reader.readline():
+                try:
+                    name = json.loads(line)["cancel"]
+                except (ValueError, KeyError, TypeError):
+                    queue.put_nowait(json.dumps({"error": f"Unknown command: {line.decode().strip()}"}).encode() + b"\n")
+                    continue
+                self.cancelled.add(name)
+                names = sorted(self.progress) if name == "*" else [name]
+                queue.put_nowait(json.dumps({"cancelled": names}).encode() + b"\n")
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(queue)
+            queue.put_nowait(None)
+            await asyncio.gather(sender, return_exceptions=True)
+
+
+async def run_live(experiment_modes, n_simulations=1000, server=None, concurrency=1, confidence=0.95,
+                   mode_options=None, **kwargs):
+    """
+    Runs experiments while publishing their progress, stopping any experiment a client cancels.
+
+    Args:
+        experiment_modes (list): MCSimConfig modes.
+        n_simulations (int): Runs per experiment.
+        server (ProgressServer, optional): Started server to publish to and take cancel
+            requests from (default: an unstarted one, i.e. no live feed).
+        concurrency (int): Experiments running at the same time (the others wait, and can be
+            cancelled before they start).
+        confidence (float): Confidence level of the published survival intervals.
+        mode_options (dict, optional): mode -> iter_experiment() options of that experiment
+            only (e.g. {'CONTROL': {'record': policy}}).
+        **kwargs: iter_experiment() options of every experiment (seed, engine, n_workers, store...).
+
+    Returns:
+        dict: mode -> (result, status), result as run_experiment() (summary DataFrame +
+            TraceRecorder, or ExperimentAccumulator) of the runs completed, None if none;
+            status 'done' or 'cancelled'
+    """
+    server = server if server is not None else ProgressServer()
+    mode_options = mode_options or {}
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run_one(mode):
+        progress = ExperimentProgress(mode, n_simulations, confidence)
+        server.publish(progress)
+        parts = []
+        async with slots:
+            if server.is_cancelled(mode):
+                progress.finish("cancelled")
+                server.publish(progress)
+                return mode, None, "cancelled"
+            progress.start()
+            server.publish(progress)
+            options = dict(kwargs, **mode_options.get(mode, {}))
+            units = aiter_experiment(mode, n_simulations, **options)
+            status = "done"
+            try:
+                async for part, cached in units:
+                    parts.append(part)
+                    progress.update(part, cached=cached)
+                    server.publish(progress)
+                    if server.is_cancelled(mode):
+                        status = "cancelled"
+                        break
+            except BaseException:
+                progress.finish("failed")
+                server.publish(progress)
+                raise
+            finally:
+                await units.aclose()
+            progress.finish(status)
+            server.publish(progress)
+
+        result = merge_parts(parts)
+        if result is not None and not isinstance(result, ExperimentAccumulator):
+            result = (summary_frame(mode, result[0]), result[1])
+        return mode, result, status
+
+    results = await asyncio.gather(*(run_one(mode) for mode in experiment_modes))
+    return {mode: (result, status) for mode, result, status in results}
+
+
+# ==========================================
+# MAIN
+# ==========================================
+# python progress.py watch --port PORT          print the snapshots of a live run
+# python progress.py cancel MODE --port PORT    stop an experiment ('*' = all)
+
+def _format(snapshot):
+    if "experiment" not in snapshot:
+        return json.dumps(snapshot)
+    line = f"{snapshot['experiment']:<28} {snapshot['status']:<9} {snapshot['runs']:>7}/{snapshot['total']:<7}"
+    if snapshot['survival'] is not None:
+        line += f" survival {snapshot['survival']:.1%} [{snapshot['ci_low']:.1%}, {snapshot['ci_high']:.1%}]"
+    if snapshot['runs_per_sec']:
+        line += f" {snapshot['runs_per_sec']:.0f} runs/s"
+    if snapshot['eta'] is not None:
+        line += f" ETA {snapshot['eta']:.0f}s"
+    causes = ", ".join(f"{cause}: {count}" for cause, count in sorted(snapshot['causes'].items()))
+    return line + (f" ({causes})" if causes else "")
+
+
+async def _client(host, port, cancel=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    if cancel is not None:
+        writer.write(json.dumps({"cancel": cancel}).encode() + b"\n")
+        await writer.drain()
+    while line := await reader.readline():
+        message = json.loads(line)
+        if cancel is not None and "cancelled" in message:
+            print(f"Cancelled: {', '.join(message['cancelled'])}")
+            break
+        if cancel is None:
+            print(_format(message), flush=True)
+    writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Client of the live progress feed (python main.py run --live PORT)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('watch', "Print the progress of the running experiments"),
+                            ('cancel', "Stop an experiment")):
+        command = subparsers.add_parser(name, help=help_text)
+        if name == 'cancel':
+            command.add_argument('mode', help="Experiment to stop ('*' = all)")
+        command.add_argument('--port', type=int, required=True, help="Port of the progress server")
+        command.add_argument('--host', default="127.0.0.1", help="Host of the progress server")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_client(args.host, args.port, args.mode if args.command == 'cancel' else None))
+    except KeyboardInterrupt:
+        pass
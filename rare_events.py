@@ -0,0 +1,111 @@
+import math
+import random
+
+import numpy as np
+
+from config import MISSION_DURATION
+from simulation import MarsColony
+from seeding import run_seed_sequence
+
+# ==========================================
+# RARE-EVENT ESTIMATION (MULTILEVEL SPLITTING)
+# ==========================================
+
+# Resource whose margin measures how close a colony is to each cause of death
+DANGER_FIELDS = {
+    'Suffocation': 'o2',
+    'Power Failure': 'battery',
+    'Dehydration': 'water',
+    'Starvation': 'food',
+}
+
+
+def _reseed(colony, seed_sequence):
+    """Gives a (cloned) colony a fresh random stream. All its models share colony.rng."""
+    state = seed_sequence.generate_state(4)
+    colony.rng.seed(int.from_bytes(state.tobytes(), "little"))
+    # Failure times and storms sampled ahead of time: draw new ones from the new stream
+    colony.redraw_future_events()
+
+
+def estimate_failure_probability(cfg, cause, levels, n_roots=1000, splits=4, seed=0, warmup_days=30):
+    """
+    Estimates P(colony dies of `cause` during the mission) with fixed-effort multilevel splitting.
+
+    Each root trajectory is a normal MarsColony run. The danger score is the margin of the
+    resource behind the cause (e.g. o2 for Suffocation). The first time a trajectory's margin
+    drops to levels[k] (after warmup_days), it is cloned into `splits` branches that continue
+    with independent random streams, each carrying 1/splits of the weight. The weighted count of
+    branches that die of `cause` is an unbiased estimate of the probability, and the root
+    trajectories are i.i.d., so the variance follows from the spread of the per-root totals.
+
+    Args:
+        cfg (MCSimConfig): Simulation parameters.
+        cause (str): Cause of death to estimate (key of DANGER_FIELDS).
+        levels (list): Decreasing resource margins at which trajectories are split.
+        n_roots (int): Number of independent root trajectories.
+        splits (int): Branches created at each level crossing.
+        seed (int): Master seed (root i uses the stream of Run_ID i).
+        warmup_days (int): Days before splitting starts (resources start low and ramp up).
+
+    Returns:
+        dict: probability, variance, std_error, relative_error, n_roots, n_hits (branches that
+            reached the event), simulated_days (cost, comparable to crude Monte Carlo)
+    """
+    field = DANGER_FIELDS[cause]
+    levels = sorted(levels, reverse=True)
+    root_totals = np.zeros(n_roots)
+    n_hits = 0
+    simulated_days = 0
+
+    for root_id in range(n_roots):
+        seq = run_seed_sequence(seed, root_id)
+        root = MarsColony(cfg, rng=random.Random(), run_id=root_id)
+        _reseed(root, seq)
+
+        # Depth-first over the branches of this root: (colony, weight, levels crossed, seed sequence)
+        stack = [(root, 1.0, 0, seq)]
+        while stack:
+            colony, weight, level, seq = stack.pop()
+            while colony.alive and colony.day < MISSION_DURATION:
+                colony.step()
+                simulated_days += 1
+                if not colony.alive or colony.day <= warmup_days or level == len(levels):
+                    continue
+
+                margin = getattr(colony, field)
+                if margin > levels[level]:
+                    continue
+
+                # Crossed one or more levels: split into splits ** crossed branches
+                new_level = level
+                while new_level < len(levels) and margin <= levels[new_level]:
+                    new_level += 1
+                n_branches = splits ** (new_level - level)
+                children = seq.spawn(n_branches)
+                weight /= n_branches
+                snapshot = colony.snapshot()
+                for child in children[1:]:
+                    # The clone's stream is replaced by _reseed()
+                    clone = MarsColony.from_snapshot(snapshot, rng=random.Random(0), profiler=colony.profiler)
+                    _reseed(clone, child)
+                    stack.append((clone, weight, new_level, child))
+                _reseed(colony, children[0])
+                level, seq = new_level, children[0]
+
+            if not colony.alive and colony.cause_of_death == cause:
+                root_totals[root_id] += weight
+                n_hits += 1
+
+    probability = root_totals.mean()
+    variance = root_totals.var(ddof=1) / n_roots if n_roots > 1 else float('nan')
+    std_error = math.sqrt(variance)
+    return {
+        'probability': probability,
+        'variance': variance,
+        'std_error': std_error,
+        'relative_error': std_error / probability if probability > 0 else float('inf'),
+        'n_roots': n_roots,
+        'n_hits': n_hits,
+        'simulated_days': simulated_days,
+    }
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from config import MISSION_DURATION, CREW_SIZE, MODEL_VERSION
+from traces import TraceRecorder, EventLog
+
+# ==========================================
+# ON-DISK RESULT CACHE
+# ==========================================
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+default_cache_dir = os.path.join(script_dir, 'cache')
+
+
+class ResultStore:
+    """
+    Content-addressed cache of experiment results.
+
+    An entry is keyed by a hash of everything that determines the results: every
+    MCSimConfig attribute, MISSION_DURATION, CREW_SIZE, MODEL_VERSION, the master
+    seed and the engine settings. Each entry is a directory of .npy columns
+    (summary + traces, or the arrays of an ExperimentAccumulator) that is
+    memory-mapped on load.
+
+    Entries hold runs 0..n-1, so a request for more runs only simulates the
+    missing ones. Least recently used entries are evicted beyond max_bytes.
+    """
+    def __init__(self, root=default_cache_dir, max_bytes=2 * 1024 ** 3):
+        """
+        Args:
+            root (str): Cache directory.
+            max_bytes (int): Size bound of the whole cache.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(cfg, seed, **params):
+        """
+        Hash of the resolved config, global constants, model version, seed and any
+        extra parameters that change the results (engine, batch_size, kind...).
+        """
+        content = {
+            'config': vars(cfg),
+            'mission_duration': MISSION_DURATION,
+            'crew_size': CREW_SIZE,
+            'model_version': MODEL_VERSION,
+            'seed': seed,
+            'params': params,
+        }
+        encoded = json.dumps(content, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    # --- Generic entries ---
+
+    def load(self, key):
+        """
+        Returns (meta dict, dict of memory-mapped arrays), or None on a miss.
+        """
+        path = self._path(key)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+            for name in meta['arrays']
+        }
+        os.utime(meta_path) # Mark as recently used
+        return meta, arrays
+
+    def save(self, key, arrays, **meta):
+        """
+        Writes (or replaces) an entry atomically, then evicts old entries if needed.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(values))
+        meta = dict(meta, arrays=list(arrays), created=time.time())
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        # Swap the new entry in (readers never see a half-written directory)
+        old_path = None
+        if os.path.exists(path):
+            old_path = f"{path}.old-{os.getpid()}"
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        if old_path is not None:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+        self.evict(keep=key)
+
+    def entries(self):
+        """List of (key, size in bytes, last used time)."""
+        entries = []
+        for key in os.listdir(self.root):
+            path = self._path(key)
+            meta_path = os.path.join(path, 'meta.json')
+            if not os.path.exists(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            entries.append((key, size, os.path.getmtime(meta_path)))
+        return entries
+
+    def evict(self, keep=None):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            shutil.rmtree(self._path(key), ignore_errors=True)
+
+    # --- Experiment results ---
+
+    def load_runs(self, key):
+        """
+        Returns (n_runs, summary arrays, TraceRecorder) for a cached run set, or None.
+        Summary arrays: 'survived' (bool), 'cause' (codes into batch_simulation.CAUSES), 'day_ended'.
+        """
+        entry = self.load(key)
+        if entry is None:
+            return None
+        meta, arrays = entry
+        summary, traces = runs_from_arrays(arrays)
+        return meta['n_runs'], summary, traces
+
+    def save_runs(self, key, summary, traces):
+        """Caches a run set (summary arrays as in load_runs() + TraceRecorder of the same runs)."""
+        self.save(key, runs_to_arrays(summary, traces), n_runs=int(len(summary['survived'])))
+
+    def load_accumulator(self, key):
+        """Returns (n_runs, arrays of ExperimentAccumulator.to_arrays()) or None."""
+        entry = self.load(key)
+        if entry is None:
+            return None
+        meta, arrays = entry
+        return meta['n_runs'], arrays
+
+    def save_accumulator(self, key, accumulator):
+        self.save(key, accumulator.to_arrays(), n_runs=accumulator.n_runs)
+
+
+def runs_to_arrays(summary, traces):
+    """Flat dict of arrays of a run set (summary arrays + TraceRecorder); inverse of runs_from_arrays()."""
+    arrays = dict(summary)
+    rows = int(traces.offsets[traces.n_runs])
+    for field, column in traces.columns.items():
+        arrays[f'trace_{field}'] = column[:rows]
+    arrays['offsets'] = traces.offsets[:traces.n_runs + 1]
+    arrays['run_ids'] = traces.run_ids[:traces.n_runs]
+    if traces.events is not None:
+        for name, values in traces.events.to_arrays().items():
+            arrays[f'event_{name}'] = values
+    return arrays
+
+
+def runs_from_arrays(arrays):
+    """Rebuilds (summary arrays, TraceRecorder) without copying the arrays."""
+    # Summary: every per-run column (survived, cause, day_ended + machine counters if recorded)
+    summary = {
+        name: values for name, values in arrays.items()
+        if not name.startswith(('trace_', 'event_')) and name not in ('offsets', 'run_ids')
+    }
+    events = None
+    if 'event_run_id' in arrays:
+        events = EventLog.from_arrays({name[len('event_'):]: values for name, values in arrays.items() if name.startswith('event_')})
+    traces = TraceRecorder.from_arrays(
+        {name[len('trace_'):]: values for name, values in arrays.items() if name.startswith('trace_')},
+        arrays['offsets'], arrays['run_ids'], events
+    )
+    return summary, traces
@@ -0,0 +1,254 @@
+import itertools
+import math
+import random
+import numpy as np
+
+# ==========================================
+# REPRODUCIBLE RANDOM STREAMS
+# ==========================================
+# Every run gets its own random stream derived from (master_seed, run_id) only.
+# This is the same scheme as np.random.SeedSequence(master_seed).spawn(n)[run_id],
+# but any single run can be recreated without spawning the ones before it.
+# Results therefore do not depend on how runs are split across workers.
+
+def new_master_seed():
+    """Draws a fresh master seed from OS entropy (print/store it to reproduce the experiment)."""
+    return np.random.SeedSequence().entropy
+
+
+def run_seed_sequence(master_seed, run_id):
+    """
+    Returns the SeedSequence of a single run.
+
+    Args:
+        master_seed (int): Seed of the whole experiment.
+        run_id (int): Index of the run within the experiment.
+
+    Returns:
+        np.random.SeedSequence: Independent child sequence for this run.
+    """
+    return np.random.SeedSequence(master_seed, spawn_key=(run_id,))
+
+
+def _seeded_random(seed_sequence):
+    state = seed_sequence.generate_state(4)
+    return random.Random(int.from_bytes(state.tobytes(), "little"))
+
+
+def make_run_rng(master_seed, run_id):
+    """
+    Builds the random.Random stream used by the scalar engine for one run.
+
+    Args:
+        master_seed (int): Seed of the whole experiment.
+        run_id (int): Index of the run within the experiment.
+
+    Returns:
+        random.Random: Seeded random stream.
+    """
+    return _seeded_random(run_seed_sequence(master_seed, run_id))
+
+
+# ==========================================
+# COMMON RANDOM NUMBERS
+# ==========================================
+# With common random numbers (CRN) every stochastic model of a run draws from its own
+# stream, keyed by what it is rather than by the order of the draws. Run i of every
+# experiment mode then sees the same storm schedule, the same crop variability and the
+# same failure/repair streams for "oxygenator 0", "oxygenator 1"... Modes with more
+# machines simply use extra streams, so the mapping stays consistent across modes.
+
+ENVIRONMENT_STREAM = 0
+CROP_STREAM = 1
+MACHINE_STREAM = 2
+
+MACHINE_KINDS = ('oxygenator', 'water_reclaimer')
+
+
+class AntitheticRandom:
+    """
+    Antithetic view of a random.Random stream: u -> 1 - u, z -> -z.
+    Implements the draws used by the models (random, normalvariate, lognormvariate, randint).
+    """
+    def __init__(self, rng):
+        self.rng = rng
+
+    def random(self):
+        return 1.0 - self.rng.random()
+
+    def normalvariate(self, mu=0.0, sigma=1.0):
+        return 2 * mu - self.rng.normalvariate(mu, sigma)
+
+    def lognormvariate(self, mu, sigma):
+        return math.exp(2 * mu - math.log(self.rng.lognormvariate(mu, sigma)))
+
+    def randint(self, a, b):
+        return a + b - self.rng.randint(a, b)
+
+    def getstate(self):
+        return self.rng.getstate()
+
+    def setstate(self, state):
+        self.rng.setstate(state)
+
+
+class RunStreams:
+    """
+    Independent random streams for each model of one run (common random numbers).
+    Stream k of run i is the child SeedSequence(master_seed, spawn_key=(i, k, ...)).
+    """
+    def __init__(self, master_seed, run_id, antithetic=False):
+        """
+        Args:
+            master_seed (int): Seed of the whole experiment.
+            run_id (int): Index of the run (the same index gives the same streams in every mode).
+            antithetic (bool): Wrap every stream in AntitheticRandom.
+        """
+        self.master_seed = master_seed
+        self.run_id = run_id
+        self.antithetic = antithetic
+
+    def _stream(self, *key):
+        rng = _seeded_random(np.random.SeedSequence(self.master_seed, spawn_key=(self.run_id,) + key))
+        return AntitheticRandom(rng) if self.antithetic else rng
+
+    def environment(self):
+        return self._stream(ENVIRONMENT_STREAM)
+
+    def crops(self):
+        return self._stream(CROP_STREAM)
+
+    def machine(self, kind, index):
+        """
+        Returns:
+            tuple: (failure stream, repair-time stream) of machine `index` of `kind`
+        """
+        kind_id = MACHINE_KINDS.index(kind)
+        return self._stream(MACHINE_STREAM, kind_id, index, 0), self._stream(MACHINE_STREAM, kind_id, index, 1)
+
+    def machine_bank(self):
+        """
+        NumPy stream of a machine_bank.MachineBank (one stream for every machine, so CRN only
+        holds per run, not per machine, and antithetic=True does not apply to it).
+        """
+        return np.random.default_rng(np.random.SeedSequence(self.master_seed, spawn_key=(self.run_id, MACHINE_STREAM, len(MACHINE_KINDS))))
+
+
+def make_run_streams(master_seed, run_id, antithetic=False):
+    """
+    CRN streams of one run. With antithetic=True runs come in pairs: run 2k uses the
+    streams of pair k and run 2k+1 their antithetic counterpart.
+    """
+    if antithetic:
+        return RunStreams(master_seed, run_id // 2, antithetic=(run_id % 2 == 1))
+    return RunStreams(master_seed, run_id)
+
+
+# ==========================================
+# BLOCK-BUFFERED STREAMS
+# ==========================================
+# random.Random computes normalvariate/lognormvariate/randint in Python, one call at a time
+# (several uniform draws, logs and square roots each). BlockRandom is a random.Random whose
+# normal variates are drawn by NumPy in blocks and handed out one by one, and whose randint
+# is a single uniform draw. Uniform draws stay on the C Mersenne Twister: random() is already
+# faster than handing out pre-drawn floats from Python.
+#
+# Draw order: a BlockRandom has two streams, both children of its seed. Uniform draws
+# (random, randint, getrandbits) come from the Mersenne Twister of child 0, normal draws
+# (normalvariate, lognormvariate) from the NumPy stream of child 1. The k-th normal draw is
+# always value k of the normal stream, whatever the uniform draws in between and whatever
+# block_size (NumPy blocks concatenate to the same sequence), and vice versa. Same
+# distributions as random.Random, different numbers.
+
+UNIFORM_BLOCK_STREAM = 0
+NORMAL_BLOCK_STREAM = 1
+
+DEFAULT_BLOCK_SIZE = 1024
+
+
+class BlockRandom(random.Random):
+    """
+    random.Random with block-buffered normal variates (see the draw order above). Uniform
+    draws are not buffered, so only the normal-heavy models gain (colony.step: ~10% in
+    benchmark.py).
+    """
+    def __init__(self, seed=None, *, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            seed (int or np.random.SeedSequence, optional): Seed of both streams (None = OS entropy).
+            block_size (int): Normal values drawn per refill (does not change the values).
+        """
+        self.block_size = block_size
+        super().__init__(seed)
+
+    def seed(self, a=None, version=2):
+        seed_sequence = a if isinstance(a, np.random.SeedSequence) else np.random.SeedSequence(a)
+        uniform_seed, normal_seed = (
+            np.random.SeedSequence(seed_sequence.entropy, spawn_key=tuple(seed_sequence.spawn_key) + (stream,))
+            for stream in (UNIFORM_BLOCK_STREAM, NORMAL_BLOCK_STREAM)
+        )
+        super().seed(int.from_bytes(uniform_seed.generate_state(4).tobytes(), "little"))
+        self._normals = np.random.default_rng(normal_seed)
+        self._start((self._normals.bit_generator.state, 0, iter(())))
+
+    def _block(self):
+        """Draws the next block of normals: (NumPy state before it, length, iterator)."""
+        state = self._normals.bit_generator.state
+        values = self._normals.standard_normal(self.block_size).tolist()
+        return state, len(values), iter(values)
+
+    def _refills(self):
+        while True:
+            self._block_state = self._block()
+            yield self._block_state[2]
+
+    def _start(self, block):
+        """Serves the rest of `block`, then new blocks as they are needed."""
+        self._block_state = block
+        # One C-level chain over the blocks: a draw is a list iterator step, a refill a generator step
+        self._next_normal = itertools.chain.from_iterable(itertools.chain((block[2],), self._refills())).__next__
+
+    def normalvariate(self, mu=0.0, sigma=1.0):
+        return mu + sigma * self._next_normal()
+
+    gauss = normalvariate
+
+    def lognormvariate(self, mu, sigma):
+        return math.exp(mu + sigma * self._next_normal())
+
+    def randint(self, a, b):
+        """Integer in [a, b] (one uniform draw)."""
+        return a + int(self.random() * (b - a + 1))
+
+    def getstate(self):
+        """(Mersenne Twister state, (NumPy state before the current block of normals, values used from it))."""
+        state, length, values = self._block_state
+        return super().getstate(), (state, length - values.__length_hint__())
+
+    def setstate(self, state):
+        uniform_state, (block_state, used) = state
+        super().setstate(uniform_state)
+        self._normals.bit_generator.state = block_state
+        block = self._block()
+        next(itertools.islice(block[2], used, used), None)
+        self._start(block)
+
+    def __reduce__(self):
+        return _restore_block_random, (self.block_size, self.getstate())
+
+
+def _restore_block_random(block_size, state):
+    stream = BlockRandom(0, block_size=block_size)
+    stream.setstate(state)
+    return stream
+
+
+def block_stream(rng):
+    """
+    BlockRandom seeded from a random stream (random.Random, AntitheticRandom, or None for the
+    global `random` state), for MCSimConfig.random_source == 'block'. An antithetic stream
+    gives the antithetic view of the BlockRandom its base stream seeds, so pairs stay pairs.
+    """
+    if isinstance(rng, AntitheticRandom):
+        return AntitheticRandom(block_stream(rng.rng))
+    return BlockRandom((rng if rng is not None else random).getrandbits(128))
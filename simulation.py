@@ -1,13 +1,127 @@
-from config import MISSION_DURATION, CREW_SIZE
-from models import Machine, CropModule, MarsEnvironment
+import copy
+import functools
+import random
+
+import numpy as np
+
+from config import MCSimConfig, MISSION_DURATION, CREW_SIZE
+from models import Machine, CropModule, MarsEnvironment, MACHINE_COUNTERS
+from environment import ScheduledMarsEnvironment
+from machine_bank import MachineBank
+from seeding import AntitheticRandom, BlockRandom, MACHINE_KINDS, block_stream, make_run_rng, make_run_streams
+from traces import TraceRecorder
+
+# Columns of MarsColony.machine_counters()
+MACHINE_COUNTER_COLUMNS = tuple(f"{group}_{counter}" for group in MACHINE_KINDS for counter in MACHINE_COUNTERS)
+
+# MCSimConfig fields that select a model implementation of MarsColony (the batch engine has its own)
+SCALAR_MODEL_FIELDS = ('failure_model', 'environment_model', 'machine_model', 'random_source')
+
+
+def scalar_model_changes(cfg):
+    """SCALAR_MODEL_FIELDS that cfg sets to something else than the defaults of its mode."""
+    defaults = MCSimConfig(cfg.mode)
+    return [name for name in SCALAR_MODEL_FIELDS if getattr(cfg, name) != getattr(defaults, name)]
+
+
+class _MachineClock:
+    """
+    Lazy countdown for a group of 'next_event' machines.
+    Every attempted check moves a machine one step closer to its next transition (failure
+    for a working machine, end of repair for a broken one). While every machine is attempted
+    and none reaches a transition, a day only adds one tick here; the ticks are applied to
+    the machines on the next flush().
+
+    min_countdown is a lower bound of the machines' countdowns (exact after sync()), so
+    n_working/n_broken can only change once it gets down to 1.
+    """
+    __slots__ = ('ticks', 'min_countdown', 'n_working', 'n_broken')
+
+    def __init__(self, machines):
+        self.ticks = 0
+        self.sync(machines)
+
+    def flush(self, machines):
+        if self.ticks:
+            for machine in machines:
+                if machine.is_broken:
+                    machine.days_to_repair -= self.ticks
+                else:
+                    machine.checks_to_failure -= self.ticks
+                    machine.checks_at_risk += self.ticks
+            self.min_countdown -= self.ticks
+            self.ticks = 0
+
+    def sync(self, machines):
+        countdowns = [machine.days_to_repair if machine.is_broken else machine.checks_to_failure
+                      for machine in machines]
+        self.min_countdown = min(countdowns, default=0)
+        self.n_broken = sum(machine.is_broken for machine in machines)
+        self.n_working = len(machines) - self.n_broken
+
+class ColonySnapshot:
+    """
+    State of a MarsColony at the end of a day (MarsColony.snapshot()): resources, crop
+    health, environment and machine states, and the state of every random stream.
+    Only plain values are kept (the storm schedule of a scheduled environment is shared),
+    so a snapshot is small and can be restored any number of times.
+    """
+    __slots__ = ('cfg', 'run_id', 'day', 'alive', 'cause_of_death', 'o2', 'water', 'waste_water',
+                 'battery', 'food', 'crop_health', 'environment', 'oxygenators', 'water_reclaimers',
+                 'machine_bank', 'stream_slots', 'stream_states')
+
+    def fork(self, n_forks, seed=0, crn=False, **overrides):
+        """
+        Independent continuations of this state.
+
+        Fork i draws from the stream of Run_ID i of `seed` (make_run_rng, or make_run_streams
+        with crn=True), so fork i of two what-if configurations sees the same randomness.
+        Failure times and storms sampled ahead of time are redrawn from the fork's stream.
+
+        Args:
+            n_forks (int): Number of continuations.
+            seed (int): Master seed of the forks.
+            crn (bool): One stream per model instead of a shared stream.
+            **overrides: MCSimConfig fields changed at the fork point (e.g. num_oxygenators=2).
+
+        Returns:
+            list: n_forks MarsColony objects, ready to step() from the snapshot day
+        """
+        cfg = self.cfg
+        if overrides:
+            cfg = copy.copy(cfg)
+            for name, value in overrides.items():
+                if name not in vars(cfg):
+                    raise ValueError(f"Unknown MCSimConfig field: {name}")
+                setattr(cfg, name, value)
+
+        if crn:
+            return [MarsColony.from_snapshot(self, cfg, streams=make_run_streams(seed, i)) for i in range(n_forks)]
+        return [MarsColony.from_snapshot(self, cfg, rng=make_run_rng(seed, i)) for i in range(n_forks)]
 
-# ==========================================
-# CORE SIMULATION LOGIC
-# ==========================================
 
 class MarsColony:
-    def __init__(self, config):
+    def __init__(self, config, rng=None, run_id=0, streams=None, storm_schedule=None, profiler=None):
+        """
+        Args:
+            config (MCSimConfig): Simulation parameters.
+            rng (random.Random, optional): Random stream shared by every stochastic model of this colony.
+                Defaults to the global `random` module state. With config.random_source='block' the
+                models draw from a seeding.BlockRandom seeded from it (likewise for streams).
+            run_id (int): Run index (used to label recorded traces).
+            streams (seeding.RunStreams, optional): One stream per model instead of a shared rng
+                (common random numbers across experiment modes).
+            storm_schedule (environment.StormSchedule, optional): Replays these storms
+                (uses a ScheduledMarsEnvironment whatever config.environment_model says).
+            profiler (profiler.StepProfiler, optional): Records phase times and event counts of step().
+        """
         self.cfg = config
+        self.profiler = profiler
+        if self.cfg.random_source not in ("python", "block"):
+            raise ValueError(f"Unknown random source: {self.cfg.random_source}")
+        # With random_source='block' the models draw from a BlockRandom seeded from rng (or the streams)
+        self.rng = self._stream(rng) if streams is None else rng
+        self.run_id = run_id
         self.day = 0
         self.alive = True
         self.cause_of_death = ""
@@ -20,24 +134,261 @@ class MarsColony:
         self.food = self.cfg.starting_food
         
         # Systems
-        self.env = MarsEnvironment()
-        self.crops = CropModule(self.cfg.crop_food_production, self.cfg.crop_o2_production, self.cfg.crop_decay_rate)
+        env_rng = self._stream(streams.environment()) if streams is not None else self.rng
+        crop_rng = self._stream(streams.crops()) if streams is not None else self.rng
+        if storm_schedule is not None or self.cfg.environment_model == "scheduled":
+            self.env = ScheduledMarsEnvironment(rng=env_rng, schedule=storm_schedule)
+        else:
+            self.env = MarsEnvironment(rng=env_rng)
+        self.crops = CropModule(self.cfg.crop_food_production, self.cfg.crop_o2_production, self.cfg.crop_decay_rate, rng=crop_rng)
         
-        # Oxygenators
-        self.oxygenators = [
-            Machine(f"Oxy-{i}", self.cfg.o2_production_rate, self.cfg.oxygenator_mtbf)
-            for i in range(self.cfg.num_oxygenators)
-        ]
+        # Machines: Machine objects, or every machine in the arrays of a MachineBank
+        self.bank = None
+        if self.cfg.machine_model == "bank":
+            self.bank = self._make_bank(streams)
+            self.oxygenators = []
+            self.water_reclaimers = []
+        elif self.cfg.machine_model == "objects":
+            # Oxygenators
+            self.oxygenators = [
+                self._make_machine(f"Oxy-{i}", self.cfg.o2_production_rate, self.cfg.oxygenator_mtbf, streams, 'oxygenator', i)
+                for i in range(self.cfg.num_oxygenators)
+            ]
 
-        # Water Reclaimers
-        self.water_reclaimers = [
-            Machine(f"WaterRec-{i}", self.cfg.water_reclamation_rate, self.cfg.water_reclaimer_mtbf)
-            for i in range(self.cfg.num_water_reclaimers)
-        ]
+            # Water Reclaimers
+            self.water_reclaimers = [
+                self._make_machine(f"WaterRec-{i}", self.cfg.water_reclamation_rate, self.cfg.water_reclaimer_mtbf, streams, 'water_reclaimer', i)
+                for i in range(self.cfg.num_water_reclaimers)
+            ]
+        else:
+            raise ValueError(f"Unknown machine model: {self.cfg.machine_model}")
+
+        # Next-event failures: days without a transition skip the per-machine loop
+        self._oxygenator_clock = None
+        self._reclaimer_clock = None
+        if self.cfg.failure_model == "next_event" and self.bank is None:
+            self._oxygenator_clock = _MachineClock(self.oxygenators)
+            self._reclaimer_clock = _MachineClock(self.water_reclaimers)
+
+    def _make_machine(self, name, production_rate, mtbf, streams, kind, index):
+        failure_model = self.cfg.failure_model
+        if streams is None:
+            return Machine(name, production_rate, mtbf, rng=self.rng, failure_model=failure_model)
+        failure_rng, repair_rng = (self._stream(stream) for stream in streams.machine(kind, index))
+        return Machine(name, production_rate, mtbf, rng=failure_rng, repair_rng=repair_rng, failure_model=failure_model)
+
+    def _stream(self, rng):
+        """Random stream of a model: `rng`, or a BlockRandom seeded from it (random_source='block')."""
+        return block_stream(rng) if self.cfg.random_source == "block" else rng
+
+    def _make_bank(self, streams):
+        if streams is not None:
+            rng = streams.machine_bank()
+        else:
+            rng = _bank_rng(self.rng)
+        bank = MachineBank(rng=rng, failure_model=self.cfg.failure_model)
+        bank.add('oxygenator', self.cfg.num_oxygenators, self.cfg.o2_production_rate,
+                 self.cfg.oxygenator_mtbf, self.cfg.oxygenator_power_cost)
+        bank.add('water_reclaimer', self.cfg.num_water_reclaimers, self.cfg.water_reclamation_rate,
+                 self.cfg.water_reclaimer_mtbf, self.cfg.water_reclaimer_power_cost)
+        return bank
+
+    def redraw_future_events(self):
+        """
+        Resamples everything that was sampled ahead of time from the current random streams
+        (e.g. after reseeding a cloned colony, so that clones diverge): the pending failure
+        time of every working 'next_event' machine and the remaining storms of a scheduled
+        environment. Valid at any time: the geometric time-to-failure is memoryless and the
+        storm process only depends on the storm in progress.
+        """
+        if isinstance(self.env, ScheduledMarsEnvironment):
+            self.env.redraw_storms()
+
+        if self.bank is not None:
+            # The bank's NumPy stream follows colony.rng (reseeded clones diverge too)
+            if self.rng is not None:
+                self.bank.rng = _bank_rng(self.rng)
+            self.bank.redraw()
+
+        for machines, clock in ((self.oxygenators, self._oxygenator_clock),
+                                (self.water_reclaimers, self._reclaimer_clock)):
+            if clock is None:
+                continue
+            clock.flush(machines)
+            for machine in machines:
+                if not machine.is_broken:
+                    machine.checks_to_failure = machine.sample_checks_to_failure()
+            clock.sync(machines)
+
+    # --- Snapshots ---
+
+    def _streams(self):
+        """Random stream of every model, in a fixed order (None for an unused colony.rng)."""
+        streams = [self.rng, self.env.rng, self.crops.rng]
+        for machine in self.oxygenators + self.water_reclaimers:
+            streams += (machine.rng, machine.repair_rng)
+        return streams
+
+    def snapshot(self):
+        """
+        Captures the current state (see ColonySnapshot). Restoring it, here or in a new
+        colony, continues exactly like this colony does.
+        """
+        # Apply the pending ticks of the lazy clocks, so the machine states are exact
+        for machines, clock in ((self.oxygenators, self._oxygenator_clock),
+                                (self.water_reclaimers, self._reclaimer_clock)):
+            if clock is not None:
+                clock.flush(machines)
+
+        snapshot = ColonySnapshot()
+        snapshot.cfg = self.cfg
+        snapshot.run_id = self.run_id
+        snapshot.day = self.day
+        snapshot.alive = self.alive
+        snapshot.cause_of_death = self.cause_of_death
+        snapshot.o2 = self.o2
+        snapshot.water = self.water
+        snapshot.waste_water = self.waste_water
+        snapshot.battery = self.battery
+        snapshot.food = self.food
+        snapshot.crop_health = self.crops.health
+        snapshot.environment = self.env.get_state()
+        snapshot.oxygenators = tuple(machine.get_state() for machine in self.oxygenators)
+        snapshot.water_reclaimers = tuple(machine.get_state() for machine in self.water_reclaimers)
+        snapshot.machine_bank = None
+        if self.bank is not None:
+            snapshot.machine_bank = (self.bank.get_state(), self.bank.rng.bit_generator.state)
+
+        # Streams shared by several models are saved once: slot -> index into stream_states
+        slots, states, seen = [], [], {}
+        for stream in self._streams():
+            if stream is None:
+                slots.append(None)
+                continue
+            if id(stream) not in seen:
+                seen[id(stream)] = len(states)
+                states.append((isinstance(stream, AntitheticRandom), stream.getstate()))
+            slots.append(seen[id(stream)])
+        snapshot.stream_slots = tuple(slots)
+        snapshot.stream_states = tuple(states)
+        return snapshot
+
+    def restore(self, snapshot, restore_streams=True):
+        """
+        Puts this colony back in a snapshot state.
+
+        Args:
+            snapshot (ColonySnapshot): State to restore.
+            restore_streams (bool): Also rewind the random streams (same continuation as the
+                snapshotted colony). They must be shared between models the same way.
+        """
+        self.day = snapshot.day
+        self.alive = snapshot.alive
+        self.cause_of_death = snapshot.cause_of_death
+        self.o2 = snapshot.o2
+        self.water = snapshot.water
+        self.waste_water = snapshot.waste_water
+        self.battery = snapshot.battery
+        self.food = snapshot.food
+        self.crops.health = snapshot.crop_health
+        self.env.set_state(snapshot.environment)
+        # Machines added by a config change start in their fresh state, removed ones are dropped
+        for machines, states in ((self.oxygenators, snapshot.oxygenators),
+                                 (self.water_reclaimers, snapshot.water_reclaimers)):
+            for machine, state in zip(machines, states):
+                machine.set_state(state)
+        if self.bank is not None and snapshot.machine_bank is not None:
+            self.bank.set_state(snapshot.machine_bank[0])
+        # Counters restart at the restored day
+        if self.bank is not None:
+            self.bank.reset_counters()
+        for machine in self.oxygenators + self.water_reclaimers:
+            machine.reset_counters()
+        if self._oxygenator_clock is not None:
+            self._oxygenator_clock = _MachineClock(self.oxygenators)
+            self._reclaimer_clock = _MachineClock(self.water_reclaimers)
+
+        if restore_streams:
+            streams = self._streams()
+            if len(streams) != len(snapshot.stream_slots):
+                raise ValueError("Cannot restore the random streams of a colony with other machines")
+            for stream, slot in zip(streams, snapshot.stream_slots):
+                if slot is not None:
+                    stream.setstate(snapshot.stream_states[slot][1])
+            if self.bank is not None and snapshot.machine_bank is not None:
+                self.bank.rng.bit_generator.state = snapshot.machine_bank[1]
+
+    @classmethod
+    def from_snapshot(cls, snapshot, config=None, rng=None, streams=None, profiler=None):
+        """
+        New colony in a snapshot state.
+
+        Without rng/streams the colony gets copies of the snapshot's random streams and
+        continues exactly like the snapshotted colony. With rng or streams it continues from
+        these (failure times and storms sampled ahead of time are redrawn from them).
+
+        Args:
+            snapshot (ColonySnapshot): State to start from.
+            config (MCSimConfig, optional): Config from the snapshot day on (defaults to the
+                snapshot's). Machines added by it start working, removed ones are dropped.
+            rng, streams: Random streams of the continuation (see MarsColony()).
+            profiler (profiler.StepProfiler, optional): See MarsColony().
+        """
+        config = config if config is not None else snapshot.cfg
+        if any(getattr(config, name) != getattr(snapshot.cfg, name) for name in SCALAR_MODEL_FIELDS):
+            raise ValueError("The failure, environment and machine models and the random source cannot change at a snapshot")
+        schedule = snapshot.environment[3] if len(snapshot.environment) == 4 else None
+        replay = rng is None and streams is None
+
+        colony = cls(config, rng=rng if not replay else random.Random(0), run_id=snapshot.run_id,
+                     streams=streams, storm_schedule=schedule, profiler=profiler)
+        colony.restore(snapshot, restore_streams=False)
+
+        if replay:
+            machines = ('num_oxygenators', 'num_water_reclaimers')
+            if any(getattr(config, name) != getattr(snapshot.cfg, name) for name in machines):
+                raise ValueError("A config with other machines needs new random streams (rng or streams)")
+            # Copies of the snapshotted streams, shared between models the same way
+            copies = []
+            for antithetic, state in snapshot.stream_states:
+                stream = BlockRandom(0) if config.random_source == "block" else random.Random()
+                stream.setstate(state)
+                copies.append(AntitheticRandom(stream) if antithetic else stream)
+            slots = iter(snapshot.stream_slots)
+            colony.rng, colony.env.rng, colony.crops.rng = (
+                copies[slot] if slot is not None else None for slot in (next(slots), next(slots), next(slots)))
+            for machine in colony.oxygenators + colony.water_reclaimers:
+                machine.rng, machine.repair_rng = copies[next(slots)], copies[next(slots)]
+            if colony.bank is not None:
+                colony.bank.rng.bit_generator.state = snapshot.machine_bank[1]
+        else:
+            colony.redraw_future_events()
+        return colony
+
+    # --- Machine counters ---
+
+    def machine_counters(self):
+        """
+        Failure/repair counters of each machine group since the colony was created or
+        restored (see Machine): '<group>_failures', '<group>_checks_at_risk', '<group>_repair_days'.
+        """
+        for machines, clock in ((self.oxygenators, self._oxygenator_clock),
+                                (self.water_reclaimers, self._reclaimer_clock)):
+            if clock is not None:
+                clock.flush(machines)
+
+        counters = {}
+        for group, machines in zip(MACHINE_KINDS, (self.oxygenators, self.water_reclaimers)):
+            for counter in MACHINE_COUNTERS:
+                if self.bank is not None:
+                    counters[f"{group}_{counter}"] = getattr(self.bank, counter)[group]
+                else:
+                    counters[f"{group}_{counter}"] = sum(getattr(machine, counter) for machine in machines)
+        return counters
 
     def _run_machines(self, machines, power_cost, available_power, 
                       current_storage, max_storage, 
-                      input_resource_limit=None):
+                      input_resource_limit=None, clock=None):
         """
         Generic machine runner.
 
@@ -48,10 +399,50 @@ class MarsColony:
             current_storage (float): Current amount of the output resource.
             max_storage (float): Maximum capacity for the output resource.
             input_resource_limit (float, optional): Limit on input resource consumption.
+            clock (_MachineClock, optional): Countdown of a 'next_event' group. On days where
+                every machine is working, none fails, and power, storage and input allow all of
+                them to run, the result is known without touching the machines.
 
         Returns:
             tuple: (produced amount, input consumed, power used)
         """
+        if clock is not None:
+            # Nothing can run (no power or storage full): no machine is checked
+            if available_power < power_cost or current_storage >= max_storage:
+                if self.profiler is not None:
+                    self._machines_skipped(machines, len(machines), available_power >= power_cost,
+                                           current_storage < max_storage)
+                return 0, 0, 0
+
+            n = len(machines)
+            rate = machines[0].production_rate if machines else 0.0
+            output = clock.n_working * rate
+            # The last machine must still see free storage (it can be a working one only when none is broken)
+            last_storage = current_storage + output - (rate if clock.n_broken == 0 else 0.0)
+            if (clock.min_countdown - clock.ticks > 1
+                    and available_power >= n * power_cost
+                    and last_storage < max_storage
+                    and (input_resource_limit is None or input_resource_limit >= output)):
+                clock.ticks += 1
+                return output, output, n * power_cost
+
+            # Only some machines are checked today: apply the pending ticks and check them one by one
+            clock.flush(machines)
+            result = self._run_machine_list(machines, power_cost, available_power,
+                                            current_storage, max_storage, input_resource_limit)
+            if clock.min_countdown > 1:
+                # No machine could reach a transition: the bound just moves one check closer
+                clock.min_countdown -= 1
+            else:
+                clock.sync(machines)
+            return result
+
+        return self._run_machine_list(machines, power_cost, available_power,
+                                      current_storage, max_storage, input_resource_limit)
+
+    def _run_machine_list(self, machines, power_cost, available_power,
+                          current_storage, max_storage, input_resource_limit):
+        """Checks the machines one by one (see _run_machines())."""
         produced = 0
         input_consumed = 0
         power_used = 0
@@ -64,29 +455,46 @@ class MarsColony:
             # Check storage (stop if full)
             needs_output = output_storage < max_storage
 
-            if has_power and needs_output:
-                raw_prod = machine.daily_check()
-
-                # Limit by input availability (waste water)
-                actual_prod = raw_prod
-                if input_resource_limit is not None:
-                    actual_prod = min(raw_prod, input_resource_limit - input_consumed)
-
-                # Determine if machine "ran" (consumed power)
-                # It consumes power if it produced something OR if it's broken but tried to run
-                if actual_prod > 0 or (raw_prod == 0 and machine.is_broken):
-                    produced += actual_prod
-                    input_consumed += actual_prod
-                    output_storage += actual_prod
-                    
-                    power_used += power_cost
-                    available_power -= power_cost
-        
+            # Power and free storage only go down: no later machine can run either
+            if not (has_power and needs_output):
+                if self.profiler is not None:
+                    self._machines_skipped(machines, len(machines) - machines.index(machine), has_power, needs_output)
+                break
+
+            raw_prod = machine.daily_check()
+
+            # Limit by input availability (waste water)
+            actual_prod = raw_prod
+            if input_resource_limit is not None:
+                actual_prod = min(raw_prod, input_resource_limit - input_consumed)
+
+            # Determine if machine "ran" (consumed power)
+            # It consumes power if it produced something OR if it's broken but tried to run
+            if actual_prod > 0 or (raw_prod == 0 and machine.is_broken):
+                produced += actual_prod
+                input_consumed += actual_prod
+                output_storage += actual_prod
+                
+                power_used += power_cost
+                available_power -= power_cost
+    
         return produced, input_consumed, power_used
 
+    def _machines_skipped(self, machines, count, has_power, needs_output):
+        group = 'oxygenator' if machines is self.oxygenators else 'water_reclaimer'
+        self.profiler.machines_skipped(group, count, has_power, needs_output)
+
+    def _bank_skip_hook(self, group):
+        if self.profiler is None:
+            return None
+        return functools.partial(self.profiler.machines_skipped, group)
+
     def step(self):
         """Simulates one day"""
         self.day += 1
+        profiler = self.profiler
+        if profiler is not None:
+            t = profiler.start_step(self)
         
         # --- 1. Environment & Power Generation ---
         sun_eff = self.env.get_sunlight_efficiency((self.day % 360))
@@ -98,6 +506,8 @@ class MarsColony:
         total_o2_need = self.cfg.daily_o2_consumption * CREW_SIZE
         total_water_need = self.cfg.daily_water_consumption * CREW_SIZE
         total_food_need = self.cfg.daily_food_consumption * CREW_SIZE
+        if profiler is not None:
+            t = profiler.lap('environment', t)
 
         # --- 3. Crop Production ---
         # Should have enough water for crews + crops and >= 5.5% tank remaining
@@ -110,33 +520,60 @@ class MarsColony:
         # --- 4. Waste Water ---
         # Waste water from crew consumption and crop transpiration
         self.waste_water += total_water_need * self.cfg.water_recycle_efficiency
+        if profiler is not None:
+            t = profiler.lap('crops', t)
         
         # --- 5. Machine Operation ---
         
         # Oxygenators
-        o2_produced, _, oxy_power = self._run_machines(
-            self.oxygenators,
-            self.cfg.oxygenator_power_cost,
-            available_power,
-            current_storage=self.o2,
-            max_storage=self.cfg.max_o2_tank,
-            input_resource_limit=None
-        )
+        if self.bank is not None:
+            o2_produced, _, oxy_power = self.bank.run(
+                'oxygenator',
+                available_power,
+                current_storage=self.o2,
+                max_storage=self.cfg.max_o2_tank,
+                on_skip=self._bank_skip_hook('oxygenator')
+            )
+        else:
+            o2_produced, _, oxy_power = self._run_machines(
+                self.oxygenators,
+                self.cfg.oxygenator_power_cost,
+                available_power,
+                current_storage=self.o2,
+                max_storage=self.cfg.max_o2_tank,
+                input_resource_limit=None,
+                clock=self._oxygenator_clock
+            )
         available_power -= oxy_power
         total_power_need += oxy_power
+        if profiler is not None:
+            t = profiler.lap('oxygenators', t)
 
         # Water Reclaimers
-        water_reclaimed, waste_processed, water_power = self._run_machines(
-            self.water_reclaimers,
-            self.cfg.water_reclaimer_power_cost,
-            available_power,
-            current_storage=self.water,
-            max_storage=self.cfg.max_water_tank,
-            input_resource_limit=self.waste_water
-        )
+        if self.bank is not None:
+            water_reclaimed, waste_processed, water_power = self.bank.run(
+                'water_reclaimer',
+                available_power,
+                current_storage=self.water,
+                max_storage=self.cfg.max_water_tank,
+                input_resource_limit=self.waste_water,
+                on_skip=self._bank_skip_hook('water_reclaimer')
+            )
+        else:
+            water_reclaimed, waste_processed, water_power = self._run_machines(
+                self.water_reclaimers,
+                self.cfg.water_reclaimer_power_cost,
+                available_power,
+                current_storage=self.water,
+                max_storage=self.cfg.max_water_tank,
+                input_resource_limit=self.waste_water,
+                clock=self._reclaimer_clock
+            )
         self.waste_water -= waste_processed
         available_power -= water_power
         total_power_need += water_power
+        if profiler is not None:
+            t = profiler.lap('water_reclaimers', t)
 
         # --- 6. Update Resources ---
         self.battery = min(self.cfg.max_battery, self.battery + power_gen - total_power_need)
@@ -148,19 +585,41 @@ class MarsColony:
         self.food *= (1 - self.cfg.food_spoilage_rate)
         self.food -= total_food_need
         self.food = min(self.cfg.max_food_storage, self.food)
+        if profiler is not None:
+            t = profiler.lap('resources', t)
         
         # --- 7. Check Survival Conditions ---
         if   self.battery < 0: self._die("Power Failure")
         elif self.o2 < 0:      self._die("Suffocation")
         elif self.water < 0:   self._die("Dehydration")
         elif self.food < 0:    self._die("Starvation")
+        if profiler is not None:
+            profiler.end_step(self, t)
 
     def _die(self, reason):
         self.alive = False
         self.cause_of_death = reason
 
-    def run_mission(self):
-        """Runs the full MISSION_DURATION days or until death"""
+    def run_mission(self, recorder=None, record=None):
+        """
+        Runs the full MISSION_DURATION days or until death
+
+        Args:
+            recorder (TraceRecorder, optional): Writes the daily trace straight into this
+                columnar recorder instead of building a list of dicts. What is written
+                (fields, decimation, events) follows the recorder's RecordingPolicy.
+            record (RecordingPolicy, optional): Records into a new single-run TraceRecorder
+                with this policy (e.g. RECORD_NONE when only the summary is needed).
+
+        Returns:
+            tuple: (survived, cause of death, history)
+                history is a list of dicts, or a RunTrace view when a recorder is given.
+        """
+        if recorder is None and record is not None:
+            recorder = TraceRecorder(1, policy=record, first_run=self.run_id)
+        if recorder is not None:
+            return self._run_mission_recorded(recorder)
+
         history = []
         for _ in range(MISSION_DURATION):
             if not self.alive:
@@ -177,3 +636,69 @@ class MarsColony:
                 'storm': self.env.is_storming
             })
         return self.alive, self.cause_of_death, history
+
+    def _run_mission_recorded(self, recorder):
+        recorder.start_run(self.run_id)
+        policy = recorder.policy
+        events = recorder.events
+        if events is not None:
+            self._run_mission_logged(recorder, events)
+        elif policy.traces(self.run_id):
+            record = recorder.record
+            for _ in range(MISSION_DURATION):
+                if not self.alive:
+                    break
+                self.step()
+                record(self.day, self.o2, self.water, self.waste_water, self.food,
+                       self.crops.health, self.battery, self.env.is_storming)
+        else:
+            # Summary only: nothing to write
+            step = self.step
+            for _ in range(MISSION_DURATION):
+                if not self.alive:
+                    break
+                step()
+        recorder.end_run()
+        return self.alive, self.cause_of_death, recorder[-1]
+
+    def _run_mission_logged(self, recorder, events):
+        """Mission loop that also logs the day's events (see traces.EVENT_KINDS)."""
+        record = recorder.record if recorder.policy.traces(self.run_id) else None
+        storming = self.env.is_storming
+        crops_alive = self.crops.health > 0
+        broken = self._broken_flags()
+        for _ in range(MISSION_DURATION):
+            if not self.alive:
+                break
+            self.step()
+            if record is not None:
+                record(self.day, self.o2, self.water, self.waste_water, self.food,
+                       self.crops.health, self.battery, self.env.is_storming)
+
+            if self.env.is_storming != storming:
+                storming = self.env.is_storming
+                events.add(self.run_id, self.day, 'storm_start' if storming else 'storm_end')
+            if crops_alive != (self.crops.health > 0):
+                crops_alive = not crops_alive
+                if not crops_alive:
+                    events.add(self.run_id, self.day, 'crop_death')
+            now_broken = self._broken_flags()
+            if now_broken != broken:
+                for group, before, after in zip(('oxygenator', 'water_reclaimer'), broken, now_broken):
+                    for index, (was, now) in enumerate(zip(before, after)):
+                        if was != now:
+                            events.add(self.run_id, self.day, f"{group}_{'failure' if now else 'repair'}", index)
+                broken = now_broken
+
+    def _broken_flags(self):
+        """(oxygenator, water reclaimer) lists of broken flags."""
+        if self.bank is not None:
+            return (self.bank.is_broken[self.bank.types['oxygenator']].tolist(),
+                    self.bank.is_broken[self.bank.types['water_reclaimer']].tolist())
+        return ([machine.is_broken for machine in self.oxygenators],
+                [machine.is_broken for machine in self.water_reclaimers])
+
+
+def _bank_rng(rng):
+    """NumPy stream of a MachineBank seeded from a random.Random stream (or the global `random` state)."""
+    return np.random.default_rng((rng if rng is not None else random).getrandbits(64))
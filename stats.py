@@ -0,0 +1,495 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+# ==========================================
+# STATISTICS HELPERS
+# ==========================================
+
+def z_score(confidence):
+    """Two-sided standard normal critical value (e.g. 1.96 for 0.95)."""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    """
+    Wilson score interval for a binomial proportion.
+
+    Returns:
+        tuple: (lower, upper)
+    """
+    if n == 0:
+        return 0.0, 1.0
+    z = z_score(confidence)
+    p = successes / n
+    denom = 1 + z ** 2 / n
+    center = (p + z ** 2 / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def _betacf(a, b, x):
+    """Continued fraction of the incomplete beta function (modified Lentz's method)."""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 1000):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-14:
+            break
+    return h
+
+
+def beta_cdf(x, a, b):
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _betacf(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _betacf(b, a, 1.0 - x) / b
+
+
+def beta_ppf(q, a, b):
+    """Inverse of beta_cdf (bisection, accurate to ~1e-12)."""
+    low, high = 0.0, 1.0
+    for _ in range(60):
+        mid = (low + high) / 2
+        if beta_cdf(mid, a, b) < q:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def clopper_pearson_interval(successes, n, confidence=0.95):
+    """
+    Exact (Clopper-Pearson) interval for a binomial proportion.
+
+    Returns:
+        tuple: (lower, upper)
+    """
+    if n == 0:
+        return 0.0, 1.0
+    alpha = 1 - confidence
+    lower = 0.0 if successes == 0 else beta_ppf(alpha / 2, successes, n - successes + 1)
+    upper = 1.0 if successes == n else beta_ppf(1 - alpha / 2, successes + 1, n - successes)
+    return lower, upper
+
+
+def binomial_interval(successes, n, confidence=0.95, method="wilson"):
+    """Confidence interval for successes/n ('wilson' or 'clopper-pearson')."""
+    if method == "wilson":
+        return wilson_interval(successes, n, confidence)
+    if method == "clopper-pearson":
+        return clopper_pearson_interval(successes, n, confidence)
+    raise ValueError(f"Unknown interval method: {method}")
+
+
+# ==========================================
+# SURVIVAL CURVES
+# ==========================================
+
+def deaths_per_day(day_ended, survived, n_days):
+    """Number of deaths on each day 0..n_days (one bincount)."""
+    dead = ~np.asarray(survived, dtype=bool)
+    return np.bincount(np.asarray(day_ended)[dead], minlength=n_days + 1)
+
+
+def kaplan_meier(deaths_by_day, n_runs, confidence=0.95):
+    """
+    Kaplan-Meier survival curve with a pointwise Greenwood confidence band
+    (log-log transform, so the band stays inside [0, 1]).
+    Runs that survive the mission are censored at its end.
+
+    Args:
+        deaths_by_day (np.ndarray): Number of deaths on each day 0..D.
+        n_runs (int): Number of runs.
+        confidence (float): Confidence level of the band.
+
+    Returns:
+        tuple: (survival, lower, upper) probability arrays for days 0..D
+    """
+    deaths = np.asarray(deaths_by_day, dtype=np.float64)
+    at_risk = n_runs - np.concatenate([[0.0], np.cumsum(deaths)[:-1]])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hazard = np.where(at_risk > 0, deaths / at_risk, 0.0)
+        survival = np.cumprod(1 - hazard)
+        # Greenwood: Var(S) / S^2 = sum d / (n (n - d))
+        greenwood = np.cumsum(np.where(at_risk > deaths, deaths / (at_risk * (at_risk - deaths)), 0.0))
+
+        log_s = np.log(survival)
+        spread = z_score(confidence) * np.sqrt(greenwood) / np.abs(log_s)
+        lower = survival ** np.exp(spread)
+        upper = survival ** np.exp(-spread)
+
+    # S = 1 (no death yet): no uncertainty; S = 0: everyone is dead
+    lower = np.where(survival >= 1, 1.0, np.where(survival <= 0, 0.0, lower))
+    upper = np.where(survival >= 1, 1.0, np.where(survival <= 0, 0.0, upper))
+    return survival, lower, upper
+
+
+# ==========================================
+# BOOTSTRAP (INDEPENDENT EXPERIMENTS)
+# ==========================================
+#
+# Run outcomes are categorical (cause of death, day ended), so resampling n runs with
+# replacement is the same as drawing the counts of every category from a multinomial with the
+# observed frequencies. Each batch of resamples is one Generator.multinomial call over a few
+# hundred categories instead of indexing n runs B times.
+
+# Resamples drawn per multinomial call (bounds the memory of a batch)
+BOOTSTRAP_BATCH = 1000
+
+
+def bootstrap_counts(counts, n_resamples, rng, n=None, batch_size=BOOTSTRAP_BATCH):
+    """
+    Bootstrap resamples of categorical data given as counts per category.
+
+    Args:
+        counts (np.ndarray): Observed count of every category.
+        n_resamples (int): Number of resamples.
+        rng (np.random.Generator): Resampling stream.
+        n (int, optional): Size of a resample (defaults to the number of observations).
+        batch_size (int): Resamples per multinomial call.
+
+    Yields:
+        np.ndarray: (batch, n categories) resampled counts, n_resamples rows in total
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    n = total if n is None else int(n)
+    pvals = counts / total
+    for start in range(0, n_resamples, batch_size):
+        yield rng.multinomial(n, pvals, size=min(batch_size, n_resamples - start))
+
+
+def _percentiles(samples, confidence):
+    """Percentile interval of bootstrap samples (along axis 0)."""
+    alpha = 1 - confidence
+    return np.quantile(samples, [alpha / 2, 1 - alpha / 2], axis=0)
+
+
+def bootstrap_survival(deaths_by_day, n_runs, n_resamples=2000, confidence=0.95, rng=None):
+    """
+    Survival curve with a pointwise percentile bootstrap band.
+
+    Args:
+        deaths_by_day (np.ndarray): Number of deaths on each day 0..D (see deaths_per_day()).
+        n_runs (int): Number of runs (the survivors are the runs not in deaths_by_day).
+        n_resamples (int): Bootstrap resamples.
+        confidence (float): Confidence level of the band.
+        rng (np.random.Generator, optional): Resampling stream.
+
+    Returns:
+        tuple: (survival, lower, upper) probability arrays for days 0..D
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    deaths = np.asarray(deaths_by_day, dtype=np.int64)
+    cells = np.append(deaths, n_runs - deaths.sum()) # Last cell: survivors
+
+    curves = np.empty((n_resamples, len(deaths)))
+    row = 0
+    for batch in bootstrap_counts(cells, n_resamples, rng):
+        curves[row:row + len(batch)] = 1 - np.cumsum(batch[:, :-1], axis=1) / n_runs
+        row += len(batch)
+    lower, upper = _percentiles(curves, confidence)
+    return 1 - np.cumsum(deaths) / n_runs, lower, upper
+
+
+def bootstrap_experiments(df_results, n_resamples=2000, confidence=0.95, seed=None):
+    """
+    Bootstrap confidence intervals of the success rate, the cause of death shares and the
+    survival curve of every experiment in a run_experiment summary frame (or a concat of several).
+
+    Args:
+        df_results (pd.DataFrame): Summary with Experiment, Survived, Cause and Day_Ended columns.
+        n_resamples (int): Bootstrap resamples per experiment.
+        confidence (float): Confidence level of the percentile intervals.
+        seed (int, optional): Seed of the resampling stream.
+
+    Returns:
+        dict:
+            success_rate: DataFrame indexed by Experiment (Runs, Success_Rate, Std_Error, CI_Low, CI_High)
+            cause_shares: DataFrame with one row per (Experiment, Cause) and the share of all runs
+                that died of it (Share, CI_Low, CI_High)
+            survival: Experiment -> (survival, lower, upper) arrays over days 0..MISSION_DURATION
+    """
+    import pandas as pd
+    from config import MISSION_DURATION
+
+    rng = np.random.default_rng(seed)
+    rates, shares, survival = [], [], {}
+    for name, group in df_results.groupby('Experiment', observed=True, sort=False):
+        n = len(group)
+        # Categories: survived + one per cause of death seen in this experiment
+        causes = group['Cause'].value_counts()
+        causes = causes[causes.index != '']
+        cells = np.append(int(group['Survived'].sum()), causes.to_numpy())
+        resampled = np.concatenate(list(bootstrap_counts(cells, n_resamples, rng))) / n
+
+        low, high = _percentiles(resampled[:, 0], confidence)
+        rates.append({
+            "Experiment": name,
+            "Runs": n,
+            "Success_Rate": cells[0] / n,
+            "Std_Error": resampled[:, 0].std(ddof=1),
+            "CI_Low": low,
+            "CI_High": high,
+        })
+        lows, highs = _percentiles(resampled[:, 1:], confidence)
+        for index, cause in enumerate(causes.index):
+            shares.append({
+                "Experiment": name,
+                "Cause": cause,
+                "Share": cells[index + 1] / n,
+                "CI_Low": lows[index],
+                "CI_High": highs[index],
+            })
+
+        deaths = deaths_per_day(group['Day_Ended'].to_numpy(), group['Survived'].to_numpy(), MISSION_DURATION)
+        survival[name] = bootstrap_survival(deaths, n, n_resamples, confidence, rng)
+
+    return {
+        'success_rate': pd.DataFrame(rates).set_index("Experiment"),
+        'cause_shares': pd.DataFrame(shares, columns=["Experiment", "Cause", "Share", "CI_Low", "CI_High"]),
+        'survival': survival,
+    }
+
+
+def holm_adjust(p_values):
+    """Holm-Bonferroni adjusted p-values (family-wise error rate control)."""
+    p = np.asarray(p_values, dtype=float)
+    m = p.size
+    order = np.argsort(p)
+    adjusted = np.minimum(np.maximum.accumulate((m - np.arange(m)) * p[order]), 1.0)
+    result = np.empty(m)
+    result[order] = adjusted
+    return result
+
+
+def _metric_cells(group, metric):
+    """(value, count) per category of a summary group, so that metric = values @ counts / n."""
+    if metric == "Success_Rate":
+        survived = int(group['Survived'].sum())
+        return np.array([1.0, 0.0]), np.array([survived, len(group) - survived])
+    if metric == "Mean_Day_Ended":
+        counts = np.bincount(group['Day_Ended'].to_numpy())
+        return np.arange(len(counts), dtype=float), counts
+    raise ValueError(f"Unknown metric: {metric}")
+
+
+def _bootstrap_means(values, counts, n_resamples, rng, n=None):
+    """Bootstrap distribution of the mean (values @ counts / n) of samples of n runs."""
+    n = int(counts.sum()) if n is None else int(n)
+    return np.concatenate([batch @ values / n for batch in bootstrap_counts(counts, n_resamples, rng, n=n)])
+
+
+def compare_experiments(df_results, baseline="CONTROL", metric="Success_Rate", n_resamples=10000,
+                        confidence=0.95, correction="holm", seed=None):
+    """
+    Pairwise bootstrap tests between independently simulated experiments.
+
+    For every pair, the difference (experiment - baseline) gets a percentile bootstrap CI and a
+    two-sided p-value from a null bootstrap: both samples are redrawn from the pooled runs (no
+    difference), and p is the share of redrawn differences at least as large as the observed one.
+    The p-values of the family of comparisons are then adjusted for multiple testing.
+
+    Args:
+        df_results (pd.DataFrame): Summary with Experiment, Survived and Day_Ended columns.
+        baseline (str, optional): Experiment compared with every other one. None compares all pairs.
+        metric (str): 'Success_Rate' or 'Mean_Day_Ended'.
+        n_resamples (int): Bootstrap resamples per comparison.
+        confidence (float): Confidence level of the intervals; 1 - confidence is the test level.
+        correction (str): 'holm' (Holm-Bonferroni), 'bonferroni' or 'none'.
+        seed (int, optional): Seed of the resampling stream.
+
+    Returns:
+        pd.DataFrame: One row per pair (Experiment, Baseline, Difference, CI_Low, CI_High,
+            P_Value, P_Adjusted, Significant).
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    groups = {name: _metric_cells(group, metric)
+              for name, group in df_results.groupby('Experiment', observed=True, sort=False)}
+    names = list(groups)
+    if baseline is None:
+        pairs = [(a, b) for i, b in enumerate(names) for a in names[i + 1:]]
+    else:
+        if baseline not in groups:
+            raise ValueError(f"Unknown baseline experiment: {baseline}")
+        pairs = [(name, baseline) for name in names if name != baseline]
+
+    rows = []
+    for name, base in pairs:
+        (values_a, counts_a), (values_b, counts_b) = groups[name], groups[base]
+        observed = values_a @ counts_a / counts_a.sum() - values_b @ counts_b / counts_b.sum()
+        diffs = (_bootstrap_means(values_a, counts_a, n_resamples, rng)
+                 - _bootstrap_means(values_b, counts_b, n_resamples, rng))
+        low, high = _percentiles(diffs, confidence)
+
+        # Null: both experiments are drawn from the pooled runs
+        pooled_values = np.concatenate([values_a, values_b])
+        pooled_counts = np.concatenate([counts_a, counts_b])
+        null_diffs = (_bootstrap_means(pooled_values, pooled_counts, n_resamples, rng, n=counts_a.sum())
+                      - _bootstrap_means(pooled_values, pooled_counts, n_resamples, rng, n=counts_b.sum()))
+        extreme = np.count_nonzero(np.abs(null_diffs) >= abs(observed) - 1e-12)
+        rows.append({
+            "Experiment": name,
+            "Baseline": base,
+            "Difference": observed,
+            "CI_Low": low,
+            "CI_High": high,
+            "P_Value": (1 + extreme) / (1 + n_resamples),
+        })
+
+    df = pd.DataFrame(rows, columns=["Experiment", "Baseline", "Difference", "CI_Low", "CI_High", "P_Value"])
+    p_values = df["P_Value"].to_numpy()
+    if correction == "holm":
+        df["P_Adjusted"] = holm_adjust(p_values)
+    elif correction == "bonferroni":
+        df["P_Adjusted"] = np.minimum(p_values * len(p_values), 1.0)
+    elif correction == "none":
+        df["P_Adjusted"] = p_values
+    else:
+        raise ValueError(f"Unknown correction: {correction}")
+    df["Significant"] = df["P_Adjusted"] < 1 - confidence
+    return df
+
+
+# ==========================================
+# PAIRED COMPARISONS (COMMON RANDOM NUMBERS)
+# ==========================================
+
+def paired_difference_report(summaries, baseline="CONTROL", metric="Survived", confidence=0.95, antithetic=False):
+    """
+    Compares every experiment with a baseline run by run.
+    Meant for summaries produced with run_experiment(crn=True): run i of every mode then
+    shares its random streams, so the per-run differences have much less noise than the
+    difference of two independent estimates.
+
+    Args:
+        summaries (dict): Experiment name -> summary DataFrame from run_experiment (same seed and runs).
+        baseline (str): Name of the reference experiment.
+        metric (str): Summary column to compare ('Survived', 'Day_Ended').
+        confidence (float): Confidence level of the intervals.
+        antithetic (bool): Runs 2k/2k+1 are antithetic pairs (run_experiment(antithetic=True));
+            pairs are averaged first since they are the independent units.
+
+    Returns:
+        pd.DataFrame: One row per experiment with the mean difference (experiment - baseline),
+            its CI, the paired and independent standard errors and the variance reduction factor.
+    """
+    import pandas as pd
+
+    z = z_score(confidence)
+    base = summaries[baseline].sort_values("Run_ID")[metric].to_numpy(dtype=float)
+    rows = []
+    for name, summary in summaries.items():
+        if name == baseline:
+            continue
+        values = summary.sort_values("Run_ID")[metric].to_numpy(dtype=float)
+        if len(values) != len(base):
+            raise ValueError(f"{name} and {baseline} must have the same runs")
+
+        diff = values - base
+        if antithetic:
+            diff = diff[:len(diff) // 2 * 2].reshape(-1, 2).mean(axis=1)
+        n = len(diff)
+        std_error = diff.std(ddof=1) / math.sqrt(n)
+        # What the standard error would be with independent runs
+        independent_error = math.sqrt((values.var(ddof=1) + base.var(ddof=1)) / len(values))
+        mean = diff.mean()
+        rows.append({
+            "Experiment": name,
+            "Baseline": baseline,
+            "Difference": mean,
+            "CI_Low": mean - z * std_error,
+            "CI_High": mean + z * std_error,
+            "Std_Error": std_error,
+            "Independent_Std_Error": independent_error,
+            "Variance_Reduction": (independent_error / std_error) ** 2 if std_error > 0 else float('inf'),
+        })
+    return pd.DataFrame(rows)
+
+
+# ==========================================
+# CONTROL VARIATES
+# ==========================================
+
+def control_variate_mean(y, controls, confidence=0.95, control_means=None, bounds=None):
+    """
+    Mean of y adjusted with control variates of known mean (regression estimator).
+
+    The coefficients are the least squares fit of y on the controls; the estimate is
+    mean(y) - beta . (mean(controls) - control_means) and its standard error comes from
+    the residuals (n - k - 1 degrees of freedom). Controls without variance are dropped.
+
+    Args:
+        y (np.ndarray): Per-run values (e.g. 0/1 survival).
+        controls (np.ndarray): (n, k) per-run controls.
+        confidence (float): Confidence level of the interval.
+        control_means (np.ndarray, optional): Exact means of the controls (default zeros).
+        bounds (tuple, optional): (low, high) clip of the interval (e.g. (0, 1) for a rate).
+
+    Returns:
+        dict: estimate, ci_low, ci_high, std_error, plain_estimate, plain_std_error,
+            variance_reduction (plain / adjusted variance), residual_variance, beta, n
+    """
+    y = np.asarray(y, dtype=np.float64)
+    controls = np.asarray(controls, dtype=np.float64).reshape(len(y), -1)
+    n = len(y)
+    means = np.zeros(controls.shape[1]) if control_means is None else np.asarray(control_means, dtype=np.float64)
+    z = z_score(confidence)
+
+    plain = float(y.mean()) if n else float('nan')
+    plain_error = float(y.std(ddof=1) / math.sqrt(n)) if n > 1 else float('inf')
+    keep = controls.std(axis=0) > 0 if n > 1 else np.zeros(controls.shape[1], dtype=bool)
+    beta = np.zeros(controls.shape[1])
+    estimate, std_error = plain, plain_error
+    residual_variance = float(y.var(ddof=1)) if n > 1 else float('nan')
+    k = int(keep.sum())
+    if k and n > k + 1:
+        centered = controls[:, keep] - controls[:, keep].mean(axis=0)
+        beta[keep] = np.linalg.lstsq(centered, y - plain, rcond=None)[0]
+        residuals = y - plain - centered @ beta[keep]
+        residual_variance = float(residuals @ residuals / (n - k - 1))
+        estimate = plain - float(beta[keep] @ (controls[:, keep].mean(axis=0) - means[keep]))
+        std_error = math.sqrt(residual_variance / n)
+
+    low, high = estimate - z * std_error, estimate + z * std_error
+    if bounds is not None:
+        low, high = max(bounds[0], low), min(bounds[1], high)
+    return {
+        "estimate": estimate,
+        "ci_low": low,
+        "ci_high": high,
+        "std_error": std_error,
+        "plain_estimate": plain,
+        "plain_std_error": plain_error,
+        "variance_reduction": (plain_error / std_error) ** 2 if std_error > 0 else float('inf'),
+        "residual_variance": residual_variance,
+        "beta": beta,
+        "n": n,
+    }
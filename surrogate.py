@@ -0,0 +1,252 @@
+import math
+
+import numpy as np
+
+from config import MISSION_DURATION, CREW_SIZE, MCSimConfig
+from models import REPAIR_LOG_MEAN, REPAIR_LOG_SIGMA
+from seeding import MACHINE_KINDS
+from stats import control_variate_mean
+
+# ==========================================
+# MACHINE AVAILABILITY SURROGATE
+# ==========================================
+# A machine is a small Markov chain, day by day (state at the end of a day):
+# - working: fails at the next check with p = 1 - e^(-1/MTBF) (that day produces nothing)
+#   and becomes broken with r = ceil(LogNormal) days to repair;
+# - broken with r days left: r - 1 at the next check, working again after the check
+#   where r reaches 0 (that day produces nothing either).
+# The chain is iterated exactly (repair times truncated at MAX_REPAIR_DAYS, tail folded
+# into the last day), which gives the probability that a machine produces on each day.
+# Machines of a group are independent and identical, so the number of producing machines
+# is Binomial(n, availability).
+#
+# Approximation: machines are assumed to be checked every day. In the colony a group is
+# skipped on days its tank is full or power is short, which pauses failures and repairs.
+# The surrogate is meant for screening; the control variates below stay exact.
+
+# Repair times beyond this are folded into it (P(ceil(LogNormal(1, 0.8)) > 200) ~ 1e-8)
+MAX_REPAIR_DAYS = 200
+
+
+def repair_days_pmf(max_days=MAX_REPAIR_DAYS):
+    """
+    Distribution of a repair time in days, ceil(LogNormal(REPAIR_LOG_MEAN, REPAIR_LOG_SIGMA)).
+
+    Returns:
+        np.ndarray: P(D = d) for d = 1..max_days (the tail beyond max_days is in the last entry)
+    """
+    days = np.arange(0, max_days + 1, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        z = (np.log(days) - REPAIR_LOG_MEAN) / REPAIR_LOG_SIGMA
+    cdf = 0.5 * (1.0 + np.array([math.erf(value / math.sqrt(2)) for value in z]))
+    pmf = np.diff(cdf)
+    pmf[-1] += 1.0 - cdf[-1]
+    return pmf
+
+
+def expected_repair_days():
+    """Mean repair time in days (E[ceil(LogNormal)])."""
+    pmf = repair_days_pmf(MAX_REPAIR_DAYS * 5)
+    return float(np.dot(np.arange(1, len(pmf) + 1), pmf))
+
+
+def availability_curve(mtbf, n_days=MISSION_DURATION):
+    """
+    Probability that a machine (working on day 0) produces on each day of the mission.
+
+    Args:
+        mtbf (float): Mean time between failures in days.
+        n_days (int): Days to compute.
+
+    Returns:
+        np.ndarray: Availability of days 1..n_days
+    """
+    p = 1 - math.exp(-1 / mtbf)
+    pmf = repair_days_pmf()
+    working = 1.0
+    # broken[r - 1] = P(broken with r days left)
+    broken = np.zeros(len(pmf))
+    availability = np.empty(n_days)
+    for day in range(n_days):
+        availability[day] = working * (1 - p)
+        repaired = broken[0]
+        broken[:-1] = broken[1:]
+        broken[-1] = 0.0
+        broken += working * p * pmf
+        working = working * (1 - p) + repaired
+    return availability
+
+
+def stationary_availability(mtbf):
+    """Long-run fraction of producing days (alternating renewal: up ~ Geometric, down = 1 + repair)."""
+    p = 1 - math.exp(-1 / mtbf)
+    up_days = (1 - p) / p
+    return up_days / (up_days + 1 + expected_repair_days())
+
+
+def up_distribution(n_machines, availability):
+    """
+    Distribution of the number of producing machines of a group on each day.
+
+    Args:
+        n_machines (int): Machines in the group.
+        availability (np.ndarray): Availability of one machine per day (availability_curve()).
+
+    Returns:
+        np.ndarray: (days, n_machines + 1) array, P(k machines produce) in column k
+    """
+    a = np.asarray(availability, dtype=np.float64)[:, None]
+    k = np.arange(n_machines + 1)[None, :]
+    return np.array([math.comb(n_machines, int(i)) for i in k[0]])[None, :] * a ** k * (1 - a) ** (n_machines - k)
+
+
+def expected_deficits(cfg, n_days=MISSION_DURATION):
+    """
+    Expected daily O2 and water deficits of a config from the availability of its machines.
+
+    O2 need is the crew consumption minus the O2 of healthy crops. Water need is the
+    recyclable share of the crew and crop consumption (x water_recycle_efficiency), which is
+    all the reclaimers can recover; the rest is a fixed daily loss, not counted as a deficit.
+
+    Returns:
+        dict: 'o2' and 'water' -> dict of per-day arrays:
+            availability (one machine), p_short (P(production < need)), deficit (expected
+            need - production, kg or L), and 'up' (distribution of producing machines)
+    """
+    o2_need = cfg.daily_o2_consumption * CREW_SIZE - cfg.crop_o2_production
+    water_need = (cfg.daily_water_consumption * CREW_SIZE + cfg.crop_daily_water_need) * cfg.water_recycle_efficiency
+    groups = {
+        'o2': (cfg.num_oxygenators, cfg.oxygenator_mtbf, cfg.o2_production_rate, o2_need),
+        'water': (cfg.num_water_reclaimers, cfg.water_reclaimer_mtbf, cfg.water_reclamation_rate, water_need),
+    }
+    result = {}
+    for resource, (n_machines, mtbf, rate, need) in groups.items():
+        availability = availability_curve(mtbf, n_days)
+        up = up_distribution(n_machines, availability)
+        shortfall = np.maximum(need - np.arange(n_machines + 1) * rate, 0.0)
+        result[resource] = {
+            'availability': availability,
+            'up': up,
+            'p_short': up @ (shortfall > 0),
+            'deficit': up @ shortfall,
+        }
+    return result
+
+
+def screen(configs):
+    """
+    Instant surrogate metrics of candidate configs, before any Monte Carlo.
+
+    Args:
+        configs: MCSimConfig, or list/dict of them (dict keys name the rows).
+
+    Returns:
+        pd.DataFrame: one row per config: O2_Availability / Water_Availability (stationary,
+            one machine), O2_Short_Days / Water_Short_Days (expected days production is
+            below need), O2_Deficit / Water_Deficit (expected total deficit over the mission),
+            O2_Worst_Day (highest probability of an O2 shortfall on a day)
+    """
+    import pandas as pd
+
+    if isinstance(configs, MCSimConfig):
+        configs = [configs]
+    items = configs.items() if isinstance(configs, dict) else ((cfg.mode, cfg) for cfg in configs)
+    rows = []
+    for name, cfg in items:
+        deficits = expected_deficits(cfg)
+        rows.append({
+            "Experiment": name,
+            "O2_Availability": stationary_availability(cfg.oxygenator_mtbf),
+            "Water_Availability": stationary_availability(cfg.water_reclaimer_mtbf),
+            "O2_Short_Days": float(deficits['o2']['p_short'].sum()),
+            "Water_Short_Days": float(deficits['water']['p_short'].sum()),
+            "O2_Deficit": float(deficits['o2']['deficit'].sum()),
+            "Water_Deficit": float(deficits['water']['deficit'].sum()),
+            "O2_Worst_Day": float(deficits['o2']['p_short'].max()),
+        })
+    return pd.DataFrame(rows).set_index("Experiment")
+
+
+def deficit_screen(max_o2_short_days=None, max_water_short_days=None):
+    """
+    Screen for optimize.find_cheapest_config(): keeps the configs whose expected days of
+    O2 / water production below need (see screen()) are within the limits.
+
+    Returns:
+        callable: cfg -> bool
+    """
+    def keep(cfg):
+        deficits = expected_deficits(cfg)
+        if max_o2_short_days is not None and deficits['o2']['p_short'].sum() > max_o2_short_days:
+            return False
+        if max_water_short_days is not None and deficits['water']['p_short'].sum() > max_water_short_days:
+            return False
+        return True
+    return keep
+
+
+# ==========================================
+# MARTINGALE CONTROL VARIATES
+# ==========================================
+# Per run and machine group (counters of run_experiment(control_variates=True)):
+# - failures - p x checks_at_risk: every check of a working machine fails with probability p
+#   whatever happened before, so this sum has mean zero;
+# - repair_days - E[D] x failures: every repair time is a fresh draw with mean E[D].
+# Both are martingales over the checks, so their mean stays exactly zero when a run stops
+# early (death) or a group is skipped on some days (optional stopping). Runs that had more
+# or longer breakdowns than expected die more often: regressing survival on these controls
+# removes that part of its variance, and the estimate stays asymptotically unbiased (O(1/n)
+# bias from the estimated coefficient).
+
+def machine_controls(summary, cfg):
+    """
+    Zero-mean control variates of each run.
+
+    Args:
+        summary: run_experiment() summary DataFrame with the counter columns
+            (Oxygenator_Failures...), or the summary arrays ('oxygenator_failures'...).
+        cfg (MCSimConfig): Config of the runs.
+
+    Returns:
+        np.ndarray: (n_runs, n_controls) array
+    """
+    mean_repair = expected_repair_days()
+    fail_probs = {
+        'oxygenator': 1 - math.exp(-1 / cfg.oxygenator_mtbf),
+        'water_reclaimer': 1 - math.exp(-1 / cfg.water_reclaimer_mtbf),
+    }
+
+    def column(name):
+        key = name if name in summary else name.title()
+        return np.asarray(summary[key], dtype=np.float64)
+
+    controls = []
+    for group in MACHINE_KINDS:
+        failures = column(f"{group}_failures")
+        controls.append(failures - fail_probs[group] * column(f"{group}_checks_at_risk"))
+        controls.append(column(f"{group}_repair_days") - mean_repair * failures)
+    return np.column_stack(controls)
+
+
+def control_variate_estimate(summary, cfg, target="Survival", confidence=0.95):
+    """
+    Survival rate (or share of a cause of death) with the machine control variates.
+
+    Args:
+        summary: run_experiment(..., control_variates=True) summary DataFrame (or arrays).
+        cfg (MCSimConfig): Config of the runs.
+        target (str): 'Survival' or a cause of death (e.g. 'Suffocation').
+        confidence (float): Confidence level of the interval.
+
+    Returns:
+        dict: see stats.control_variate_mean()
+    """
+    if "Survived" in summary:
+        survived, causes = np.asarray(summary["Survived"]), np.asarray(summary["Cause"])
+    else:
+        from batch_simulation import CAUSES
+        survived = np.asarray(summary['survived'])
+        causes = np.asarray(CAUSES, dtype=object)[np.asarray(summary['cause'])]
+    y = survived if target == "Survival" else causes == target
+    return control_variate_mean(np.asarray(y, dtype=np.float64), machine_controls(summary, cfg),
+                                confidence, bounds=(0.0, 1.0))
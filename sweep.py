@@ -0,0 +1,196 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config import MCSimConfig, MISSION_DURATION
+from batch_simulation import BatchMarsColony, CAUSES
+from simulation import MarsColony, scalar_model_changes
+from seeding import make_run_rng, make_run_streams, run_seed_sequence
+from stats import binomial_interval
+
+# ==========================================
+# PARAMETER SWEEPS
+# ==========================================
+
+def grid(**axes):
+    """
+    Cartesian product of parameter values, as a list of MCSimConfig overrides.
+
+    Example:
+        grid(num_oxygenators=[1, 2, 3], solar_capacity=[35.0, 45.0])
+        -> [{'num_oxygenators': 1, 'solar_capacity': 35.0}, {'num_oxygenators': 1, 'solar_capacity': 45.0}, ...]
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def make_config(point, base_mode="CONTROL"):
+    """MCSimConfig of a sweep point (overrides dict, optionally with its own 'mode')."""
+    overrides = dict(point)
+    mode = overrides.pop('mode', base_mode)
+    return MCSimConfig(mode, **overrides)
+
+
+def simulate_point(cfg, run_ids, seed, engine="batch", crn=False):
+    """
+    Worker task: simulates runs `run_ids` of one configuration and only keeps counts.
+
+    Args:
+        cfg (MCSimConfig): Configuration of the point.
+        run_ids (range): Runs of this work unit.
+        seed (int): Master seed of the sweep.
+        engine (str): 'batch' (one BatchMarsColony for the whole unit) or 'scalar'.
+        crn (bool): Scalar engine only: per-model streams, so run i sees the same storms,
+            crops and machine streams at every point.
+
+    Returns:
+        tuple: (survived count, cause counts indexed like CAUSES, sum of days ended)
+    """
+    if engine == "batch":
+        _check_batch_config(cfg)
+        # Same per-batch stream as run_experiment's batch engine (keyed by the first Run_ID)
+        rng = np.random.default_rng(run_seed_sequence(seed, run_ids.start))
+        alive, cause, day_ended, _ = BatchMarsColony(cfg, len(run_ids), rng=rng).run_mission(record_history=False)
+        cause_counts = np.bincount(cause, minlength=len(CAUSES))
+        return int(alive.sum()), cause_counts, int(day_ended.sum())
+
+    survived = 0
+    cause_counts = np.zeros(len(CAUSES), dtype=np.int64)
+    days = 0
+    for run_id in run_ids:
+        if crn:
+            colony = MarsColony(cfg, run_id=run_id, streams=make_run_streams(seed, run_id))
+        else:
+            colony = MarsColony(cfg, rng=make_run_rng(seed, run_id), run_id=run_id)
+        # No trace needed: just step until the end of the mission
+        while colony.alive and colony.day < MISSION_DURATION:
+            colony.step()
+        survived += colony.alive
+        cause_counts[CAUSES.index(colony.cause_of_death)] += 1
+        days += colony.day
+    return survived, cause_counts, days
+
+
+def _check_batch_config(cfg):
+    # The batch engine has its own vectorized models: these switches would be silently ignored
+    changed = scalar_model_changes(cfg)
+    if changed:
+        raise ValueError(f"{', '.join(changed)}: only supported by the scalar engine")
+
+
+def evaluate_units(tasks, seed, engine="batch", crn=False, pool=None):
+    """
+    Runs work units, in this process or on a pool.
+
+    Args:
+        tasks (list): (MCSimConfig, range of Run_IDs) per unit.
+        seed, engine, crn: See simulate_point().
+        pool (concurrent.futures.Executor, optional): Units are submitted all at once and
+            picked up by whichever worker is free (cheap units do not hold up the others).
+
+    Yields:
+        tuple: (task index, simulate_point() result), in completion order with a pool.
+    """
+    if pool is None:
+        for index, (cfg, run_ids) in enumerate(tasks):
+            yield index, simulate_point(cfg, run_ids, seed, engine, crn)
+        return
+
+    futures = {
+        pool.submit(simulate_point, cfg, run_ids, seed, engine, crn): index
+        for index, (cfg, run_ids) in enumerate(tasks)
+    }
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+
+def run_sweep(points, n_simulations=1000, base_mode="CONTROL", seed=2025, engine="batch",
+              n_workers=1, chunk_size=None, crn=False, confidence=0.95, executor=None):
+    """
+    Runs n_simulations missions at every point of a parameter sweep.
+
+    Every (point, chunk of runs) pair is an independent work unit. Units are handed to the
+    worker pool one at a time as workers become free, so points whose colonies die early
+    (cheap) do not hold up the others. Only counts travel back from the workers.
+
+    Args:
+        points (list): MCSimConfig overrides per point (e.g. from grid()). A point may set
+            'mode' to start from another experiment mode than base_mode.
+        n_simulations (int): Runs per point.
+        base_mode (str): MCSimConfig mode the overrides are applied to.
+        seed (int): Master seed. Every point uses the same Run_IDs, so with the scalar engine run i
+            starts from the same stream at every point (and with crn=True shares its storms,
+            crop variability and machine streams).
+        engine (str): 'batch' (vectorized, default) or 'scalar'.
+        n_workers (int): Worker processes (1 = run in this process).
+        chunk_size (int, optional): Runs per work unit. Defaults to up to 5000 (batch) or 250 (scalar).
+            Batch results depend on the chunking (one stream per chunk), scalar results do not.
+        crn (bool): Common random numbers across points (scalar engine only).
+        confidence (float): Confidence level of the survival interval.
+        executor (concurrent.futures.Executor, optional): Runs the units instead of n_workers
+            local processes (e.g. distributed.ClusterExecutor for several nodes).
+
+    Returns:
+        pd.DataFrame: Result cube indexed by the swept parameters (MultiIndex for several axes;
+            .unstack() gives a grid). Columns: Runs, Survived, Success_Rate, CI_Low, CI_High,
+            Mean_Day_Ended and one count column per cause of death.
+    """
+    import pandas as pd
+
+    if engine not in ("scalar", "batch"):
+        raise ValueError(f"Unknown engine: {engine}")
+    if crn and engine != "scalar":
+        raise ValueError("Common random numbers are only supported by the scalar engine")
+
+    configs = [make_config(point, base_mode) for point in points]
+    if engine == "batch":
+        # Before any unit is dispatched
+        for cfg in configs:
+            _check_batch_config(cfg)
+    if chunk_size is None:
+        chunk_size = min(n_simulations, 5000 if engine == "batch" else 250)
+    units = [
+        (index, range(start, min(start + chunk_size, n_simulations)))
+        for index in range(len(configs))
+        for start in range(0, n_simulations, chunk_size)
+    ]
+
+    survived = np.zeros(len(configs), dtype=np.int64)
+    cause_counts = np.zeros((len(configs), len(CAUSES)), dtype=np.int64)
+    days = np.zeros(len(configs), dtype=np.int64)
+
+    tasks = [(configs[index], run_ids) for index, run_ids in units]
+    if executor is not None:
+        results = evaluate_units(tasks, seed, engine, crn, executor)
+    elif n_workers <= 1:
+        results = evaluate_units(tasks, seed, engine, crn)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(evaluate_units(tasks, seed, engine, crn, pool))
+    for task, (unit_survived, unit_causes, unit_days) in results:
+        index = units[task][0]
+        survived[index] += unit_survived
+        cause_counts[index] += unit_causes
+        days[index] += unit_days
+
+    # One column per swept parameter (in order of first appearance)
+    axes = list(dict.fromkeys(name for point in points for name in point))
+    rows = []
+    for index, point in enumerate(points):
+        low, high = binomial_interval(int(survived[index]), n_simulations, confidence)
+        row = {name: point.get(name, getattr(configs[index], name)) for name in axes}
+        row.update({
+            "Runs": n_simulations,
+            "Survived": int(survived[index]),
+            "Success_Rate": survived[index] / n_simulations,
+            "CI_Low": low,
+            "CI_High": high,
+            "Mean_Day_Ended": days[index] / n_simulations,
+        })
+        for code, cause in enumerate(CAUSES[1:], start=1):
+            row[cause] = int(cause_counts[index, code])
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    return df.set_index(axes) if axes else df
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from experiment import run_experiment
+
+N_RUNS = 1500
+# Seeds are fixed, so the check is deterministic; the bound leaves room for changes in the
+# draws while still catching a model that drifts from the scalar engine
+MAX_Z = 4.0
+
+
+def _proportion_z(a, b):
+    """Two-sample z statistic of the proportions of True in a and b (pooled variance)."""
+    pooled = (a.sum() + b.sum()) / (len(a) + len(b))
+    se = np.sqrt(pooled * (1 - pooled) * (1 / len(a) + 1 / len(b)))
+    return (a.mean() - b.mean()) / se if se > 0 else 0.0
+
+
+def _mean_z(a, b):
+    """Welch z statistic of the difference of means."""
+    return (a.mean() - b.mean()) / np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+
+
+@pytest.mark.parametrize("mode", ["CONTROL", "COMBINED_TEST"])
+def test_batch_engine_matches_scalar_engine(mode):
+    scalar, _ = run_experiment(mode, N_RUNS, seed=2, engine="scalar")
+    batch, _ = run_experiment(mode, N_RUNS, seed=2, engine="batch")
+
+    assert abs(_proportion_z(scalar['Survived'].to_numpy(), batch['Survived'].to_numpy())) < MAX_Z
+    assert abs(_mean_z(scalar['Day_Ended'].to_numpy(), batch['Day_Ended'].to_numpy())) < MAX_Z
+    for cause in sorted(set(scalar['Cause']) - {""}):
+        in_scalar, in_batch = (scalar['Cause'] == cause).to_numpy(), (batch['Cause'] == cause).to_numpy()
+        if in_scalar.sum() + in_batch.sum() >= 20:
+            assert abs(_proportion_z(in_scalar, in_batch)) < MAX_Z, cause
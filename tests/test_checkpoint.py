@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import parallel
+from checkpoint import Checkpoint
+from experiment import run_experiment
+
+
+def _interrupt_after(monkeypatch, name, n_units):
+    """Makes parallel.<name> raise KeyboardInterrupt (as Ctrl+C would) once n_units work units are done."""
+    simulate = getattr(parallel, name)
+    calls = []
+
+    def interrupted(*args, **kwargs):
+        if len(calls) == n_units:
+            raise KeyboardInterrupt
+        calls.append(args)
+        return simulate(*args, **kwargs)
+
+    monkeypatch.setattr(parallel, name, interrupted)
+
+
+@pytest.mark.parametrize("engine, unit_function, unit_option", [
+    ("scalar", "simulate_runs", "chunk_size"),
+    ("batch", "simulate_batch", "batch_size"),
+])
+def test_resume_equals_uninterrupted_run(tmp_path, monkeypatch, capsys, engine, unit_function, unit_option):
+    options = {"engine": engine, unit_option: 6}
+    with monkeypatch.context() as patch:
+        _interrupt_after(patch, unit_function, 2)
+        with pytest.raises(KeyboardInterrupt):
+            run_experiment("CONTROL", 30, seed=9, checkpoint=Checkpoint(str(tmp_path)), **options)
+
+    summary, traces = run_experiment("CONTROL", 30, seed=9, checkpoint=Checkpoint(str(tmp_path)), **options)
+    assert "Resuming from checkpoint: 12 runs done, simulating 18 more" in capsys.readouterr().out
+
+    expected_summary, expected_traces = run_experiment("CONTROL", 30, seed=9, **options)
+    pd.testing.assert_frame_equal(summary, expected_summary)
+    for i in range(30):
+        np.testing.assert_array_equal(traces[i]['o2'], expected_traces[i]['o2'])
+
+
+def test_unseeded_resume_uses_the_campaign_seed(tmp_path, monkeypatch, capsys):
+    with monkeypatch.context() as patch:
+        _interrupt_after(patch, "simulate_runs", 1)
+        with pytest.raises(KeyboardInterrupt):
+            run_experiment("CONTROL", 20, chunk_size=8, checkpoint=Checkpoint(str(tmp_path)))
+
+    checkpoint = Checkpoint(str(tmp_path))
+    summary, _ = run_experiment("CONTROL", 20, chunk_size=8, checkpoint=checkpoint)
+    assert "Resuming from checkpoint: 8 runs done, simulating 12 more" in capsys.readouterr().out
+
+    expected_summary, _ = run_experiment("CONTROL", 20, seed=checkpoint.master_seed())
+    pd.testing.assert_frame_equal(summary, expected_summary)
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from distributed import ClusterExecutor, FileQueue, WorkQueue, run_worker
+from experiment import run_experiment
+
+
+def _start_workers(queue, n, idle_timeout=1.0):
+    workers = [threading.Thread(target=run_worker, args=(queue, f"worker-{i}"),
+                                kwargs=dict(poll=0.05, idle_timeout=idle_timeout))
+               for i in range(n)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+@pytest.mark.parametrize("options", [
+    dict(engine="scalar", chunk_size=7),
+    dict(engine="batch", batch_size=10),
+])
+def test_cluster_results_equal_local_run(tmp_path, options):
+    queue = FileQueue(str(tmp_path))
+    workers = _start_workers(queue, 2)
+    with ClusterExecutor(queue, poll=0.05) as executor:
+        summary, traces = run_experiment("CONTROL", 30, seed=3, executor=executor, **options)
+    for worker in workers:
+        worker.join()
+
+    expected_summary, expected_traces = run_experiment("CONTROL", 30, seed=3, **options)
+    pd.testing.assert_frame_equal(summary, expected_summary)
+    for i in range(30):
+        np.testing.assert_array_equal(traces[i]['o2'], expected_traces[i]['o2'])
+
+
+def test_expired_lease_is_redispatched(tmp_path):
+    queue = FileQueue(str(tmp_path), lease=0.5)
+    with ClusterExecutor(queue, poll=0.05) as executor:
+        future = executor.submit(pow, 2, 10)
+        # A worker takes the unit and dies without renewing its lease
+        assert queue.claim("lost-worker") is not None
+        workers = _start_workers(queue, 1)
+        assert future.result(timeout=30) == 1024
+        assert executor.redispatched == 1
+    for worker in workers:
+        worker.join()
+
+
+def test_claim_starts_a_fresh_lease(tmp_path, monkeypatch):
+    queue = FileQueue(str(tmp_path), lease=1.0)
+    queue.put("unit", b"payload")
+    # The unit waited in the queue for longer than the lease
+    old = time.time() - 10
+    os.utime(os.path.join(str(tmp_path), 'pending', "unit"), (old, old))
+
+    # The coordinator looks for expired leases right after the claim's rename
+    rename = os.rename
+    requeued = []
+
+    def rename_then_requeue(src, dst):
+        rename(src, dst)
+        if not requeued:
+            requeued.append(queue.requeue_expired())
+
+    monkeypatch.setattr(os, "rename", rename_then_requeue)
+    assert queue.claim("worker") == ("unit", b"payload")
+    assert requeued == [[]]
+    assert queue.renew("unit", "worker")
+
+
+def test_incomplete_queue_cannot_be_created():
+    class PendingOnly(WorkQueue):
+        def put(self, unit_id, payload):
+            pass
+
+    with pytest.raises(TypeError):
+        PendingOnly()
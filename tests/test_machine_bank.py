@@ -0,0 +1,98 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from config import MCSimConfig
+from machine_bank import MachineBank
+from models import Machine
+from simulation import MarsColony
+
+N_DAYS = 300
+N_MACHINES = 12
+POWER_COST = 2.0
+
+
+class ScriptedDraws:
+    """
+    One set of draws served to a MachineBank (NumPy Generator API) and to Machine objects
+    (random.Random API) in the order each of them asks for them.
+
+    'daily' failure rolls come from a (day, machine) table, since the bank rolls every
+    machine of the group while Machine objects only roll when they are checked. Everything
+    else (failure times, repair times) is drawn in check order by both, so it comes from queues.
+    """
+    def __init__(self, seed, failure_model):
+        rng = np.random.default_rng(seed)
+        self.failure_model = failure_model
+        self.day = 0
+        self.rolls = rng.random((N_DAYS, N_MACHINES))
+        self.uniforms = iter(rng.random(100000))
+        self.normals = iter(rng.standard_normal(100000))
+
+    def uniform(self, machines):
+        if self.failure_model == "daily":
+            return self.rolls[self.day, machines]
+        return np.array([next(self.uniforms) for _ in range(len(machines))])
+
+    def lognormal(self, mu, sigma):
+        return math.exp(mu + sigma * next(self.normals))
+
+
+class BankStream:
+    def __init__(self, draws):
+        self.draws = draws
+
+    def random(self, n):
+        return self.draws.uniform(np.arange(n))
+
+    def lognormal(self, mu, sigma, n):
+        return np.array([self.draws.lognormal(mu, sigma) for _ in range(n)])
+
+
+class MachineStream:
+    def __init__(self, draws, index):
+        self.draws = draws
+        self.index = index
+
+    def random(self):
+        return float(self.draws.uniform([self.index])[0])
+
+    def lognormvariate(self, mu, sigma):
+        return self.draws.lognormal(mu, sigma)
+
+
+@pytest.mark.parametrize("failure_model", ["daily", "next_event"])
+def test_bank_matches_machine_objects(failure_model):
+    rates = np.linspace(1.0, 2.0, N_MACHINES)
+    bank_draws = ScriptedDraws(3, failure_model)
+    bank = MachineBank(rng=BankStream(bank_draws), failure_model=failure_model)
+    bank.add("oxygenator", N_MACHINES, rates, 6.0, POWER_COST)
+
+    machine_draws = ScriptedDraws(3, failure_model)
+    machines = [Machine("Oxygenator", rate, 6.0, rng=MachineStream(machine_draws, i), failure_model=failure_model)
+                for i, rate in enumerate(rates)]
+    colony = MarsColony(MCSimConfig("CONTROL"), rng=random.Random(0))
+
+    # Power, storage and input limits that often stop the group part-way
+    conditions = np.random.default_rng(4)
+    for day in range(N_DAYS):
+        bank_draws.day = machine_draws.day = day
+        available_power = conditions.uniform(0, 1.2) * N_MACHINES * POWER_COST
+        current_storage = conditions.uniform(0, 30)
+        input_limit = conditions.uniform(0, 20) if day % 2 else None
+
+        expected = colony._run_machines(machines, POWER_COST, available_power, current_storage, 40.0, input_limit)
+        result = bank.run("oxygenator", available_power, current_storage, 40.0, input_limit)
+        assert result == pytest.approx(expected, rel=1e-12, abs=1e-12), f"day {day}"
+
+        broken, days_to_repair, checks_to_failure = bank.get_state()["oxygenator"]
+        assert list(broken) == [machine.is_broken for machine in machines], f"day {day}"
+        assert list(days_to_repair) == [machine.days_to_repair for machine in machines], f"day {day}"
+        if failure_model == "next_event":
+            assert list(checks_to_failure) == [machine.checks_to_failure for machine in machines], f"day {day}"
+
+    assert bank.failures["oxygenator"] == sum(machine.failures for machine in machines) > 0
+    assert bank.checks_at_risk["oxygenator"] == sum(machine.checks_at_risk for machine in machines)
+    assert bank.repair_days["oxygenator"] == sum(machine.repair_days for machine in machines)
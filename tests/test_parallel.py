@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from experiment import run_experiment
+
+
+def _assert_same_runs(a, b):
+    (summary_a, traces_a), (summary_b, traces_b) = a, b
+    pd.testing.assert_frame_equal(summary_a, summary_b)
+    assert len(traces_a) == len(traces_b)
+    for i in range(len(traces_a)):
+        np.testing.assert_array_equal(traces_a[i]['o2'], traces_b[i]['o2'])
+
+
+def test_seeded_runs_do_not_depend_on_workers():
+    serial = run_experiment("CONTROL", 24, seed=11)
+    sharded = run_experiment("CONTROL", 24, seed=11, n_workers=2, chunk_size=5)
+    _assert_same_runs(serial, sharded)
+
+
+def test_seeded_crn_runs_do_not_depend_on_workers():
+    serial = run_experiment("BATTERY_TEST", 16, seed=11, crn=True, antithetic=True)
+    sharded = run_experiment("BATTERY_TEST", 16, seed=11, crn=True, antithetic=True, n_workers=3, chunk_size=3)
+    _assert_same_runs(serial, sharded)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from experiment import iter_experiment, merge_parts, run_experiment, summary_frame
+from result_store import ResultStore
+
+
+def test_top_up_equals_one_run(tmp_path, capsys):
+    store = ResultStore(str(tmp_path))
+    run_experiment("CONTROL", 10, seed=5, store=store)
+    summary, traces = run_experiment("CONTROL", 25, seed=5, store=store)
+    assert "Loaded 10 cached runs, simulating 15 more" in capsys.readouterr().out
+
+    expected_summary, expected_traces = run_experiment("CONTROL", 25, seed=5)
+    pd.testing.assert_frame_equal(summary, expected_summary)
+    for i in range(25):
+        np.testing.assert_array_equal(traces[i]['o2'], expected_traces[i]['o2'])
+
+    # The topped-up entry now serves the whole experiment
+    summary, _ = run_experiment("CONTROL", 25, seed=5, store=store)
+    assert "Loaded 25 cached runs" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(summary, expected_summary)
+
+
+def test_aggregate_top_up_equals_one_run(tmp_path, capsys):
+    store = ResultStore(str(tmp_path))
+    run_experiment("CONTROL", 10, seed=5, aggregate=True, store=store)
+    accumulator = run_experiment("CONTROL", 25, seed=5, aggregate=True, store=store)
+    assert "Loaded 10 cached runs, simulating 15 more" in capsys.readouterr().out
+
+    expected = run_experiment("CONTROL", 25, seed=5, aggregate=True)
+    arrays, expected_arrays = accumulator.to_arrays(), expected.to_arrays()
+    assert arrays.keys() == expected_arrays.keys()
+    for name in arrays:
+        if arrays[name].dtype.kind == 'f':
+            # Sums merged in another order: equal up to rounding
+            np.testing.assert_allclose(arrays[name], expected_arrays[name], rtol=1e-12, err_msg=name)
+        else:
+            np.testing.assert_array_equal(arrays[name], expected_arrays[name], err_msg=name)
+
+
+def test_batch_top_up_equals_one_run(tmp_path, capsys):
+    store = ResultStore(str(tmp_path))
+    options = dict(seed=5, engine="batch", batch_size=10)
+    run_experiment("CONTROL", 25, store=store, **options)
+    summary, traces = run_experiment("CONTROL", 42, store=store, **options)
+    # The partial batch of the cached entry (runs 20-24) is simulated again, as part of a whole batch
+    assert "Loaded 20 cached runs, simulating 22 more" in capsys.readouterr().out
+
+    expected_summary, expected_traces = run_experiment("CONTROL", 42, **options)
+    pd.testing.assert_frame_equal(summary, expected_summary)
+    for i in range(42):
+        np.testing.assert_array_equal(traces[i]['o2'], expected_traces[i]['o2'])
+
+    # Fewer runs than cached: same as a fresh run too
+    summary, _ = run_experiment("CONTROL", 15, store=store, **options)
+    assert "Loaded 10 cached runs, simulating 5 more" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(summary, run_experiment("CONTROL", 15, **options)[0])
+
+
+def test_batch_iterator_top_up_equals_one_run(tmp_path):
+    store = ResultStore(str(tmp_path))
+    options = dict(seed=5, engine="batch", batch_size=10)
+    run_experiment("CONTROL", 25, store=store, **options)
+    units = list(iter_experiment("CONTROL", 42, store=store, **options))
+    assert [cached for _, cached in units] == [True, False, False, False]
+
+    summary, _ = merge_parts([part for part, _ in units])
+    expected_summary, _ = run_experiment("CONTROL", 42, **options)
+    pd.testing.assert_frame_equal(summary_frame("CONTROL", summary), expected_summary)
+
+
+def test_batch_aggregate_partial_hit_is_recomputed(tmp_path, capsys):
+    store = ResultStore(str(tmp_path))
+    options = dict(seed=5, engine="batch", batch_size=10, aggregate=True)
+    run_experiment("CONTROL", 25, store=store, **options)
+    accumulator = run_experiment("CONTROL", 42, store=store, **options)
+    assert "cached" not in capsys.readouterr().out
+
+    expected = run_experiment("CONTROL", 42, **options)
+    assert accumulator.n_survived == expected.n_survived
+    assert accumulator.cause_counts == expected.cause_counts
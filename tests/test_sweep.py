@@ -0,0 +1,21 @@
+import pytest
+
+from sweep import make_config, run_sweep, simulate_point
+
+
+@pytest.mark.parametrize("name, value", [
+    ("failure_model", "next_event"),
+    ("environment_model", "scheduled"),
+    ("machine_model", "bank"),
+    ("random_source", "block"),
+])
+def test_batch_sweep_rejects_scalar_model_axes(name, value):
+    with pytest.raises(ValueError, match=name):
+        run_sweep([{}, {name: value}], n_simulations=10, engine="batch")
+    with pytest.raises(ValueError, match=name):
+        simulate_point(make_config({name: value}), range(10), seed=1, engine="batch")
+
+
+def test_scalar_sweep_over_a_model_axis():
+    df = run_sweep([{'failure_model': "daily"}, {'failure_model': "next_event"}], n_simulations=20, engine="scalar")
+    assert list(df['Runs']) == [20, 20]
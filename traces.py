@@ -0,0 +1,448 @@
+import numpy as np
+
+from config import MISSION_DURATION
+
+# ==========================================
+# COLUMNAR TRACE STORAGE
+# ==========================================
+
+# One column per recorded field (same keys as the MarsColony.run_mission history).
+# float32 is plenty for plotting resource levels.
+TRACE_COLUMNS = {
+    'day': np.int16,
+    'o2': np.float32,
+    'water': np.float32,
+    'waste_water': np.float32,
+    'food': np.float32,
+    'crop_health': np.float32,
+    'battery': np.float32,
+    'storm': np.bool_,
+}
+
+# Fields a run can record ('day' is kept with any of them)
+TRACE_FIELDS = tuple(field for field in TRACE_COLUMNS if field != 'day')
+
+# Decimation of a recorded field over a window of days
+REDUCTIONS = ('sample', 'minmax')
+
+# Discrete events of an EventLog (codes are indices into this tuple)
+EVENT_KINDS = ('storm_start', 'storm_end', 'crop_death',
+               'oxygenator_failure', 'oxygenator_repair',
+               'water_reclaimer_failure', 'water_reclaimer_repair')
+
+
+# ==========================================
+# RECORDING POLICIES
+# ==========================================
+
+class RecordingPolicy:
+    """
+    What a run keeps besides its summary (Survived / Cause / Day_Ended).
+
+    - fields: daily fields to record (() = summary only)
+    - every: one row per window of `every` days. 'sample' keeps the last day of each window
+      (and the day the run ended); 'minmax' keeps the minimum and the maximum of each field
+      over the window, in the order they occurred, as a row dated at its first day and a row
+      dated at its last day, so short dips to zero still show in plots.
+    - n_traced: only runs with Run_ID < n_traced record daily fields (e.g. the sample runs of a plot)
+    - events: also keep an EventLog (storm start/end, machine failures/repairs, crop death)
+
+    run_experiment(record=...) and visualization.trace_policy() pick the cheapest policy a
+    result is needed for; RECORD_ALL is the full daily trace.
+    """
+    def __init__(self, fields=TRACE_FIELDS, every=1, reduce="sample", n_traced=None, events=False):
+        for field in fields:
+            if field not in TRACE_FIELDS:
+                raise ValueError(f"Unknown trace field: {field}")
+        if reduce not in REDUCTIONS:
+            raise ValueError(f"Unknown reduction: {reduce}")
+        if every < 1:
+            raise ValueError(f"every must be at least 1, got {every}")
+        # Recorder column order, whatever the order given
+        self.fields = tuple(field for field in TRACE_FIELDS if field in fields)
+        self.every = int(every)
+        self.reduce = reduce
+        self.n_traced = n_traced
+        self.events = bool(events)
+
+    def to_dict(self):
+        """Plain description (e.g. part of a ResultStore key)."""
+        return {'fields': list(self.fields), 'every': self.every, 'reduce': self.reduce,
+                'n_traced': self.n_traced, 'events': self.events}
+
+    def __eq__(self, other):
+        return isinstance(other, RecordingPolicy) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(tuple(self.fields) + (self.every, self.reduce, self.n_traced, self.events))
+
+    def __repr__(self):
+        return f"RecordingPolicy({', '.join(f'{name}={value!r}' for name, value in self.to_dict().items())})"
+
+    @property
+    def decimates(self):
+        return self.every > 1
+
+    def traces(self, run_id):
+        """True if run `run_id` records daily fields."""
+        return bool(self.fields) and (self.n_traced is None or run_id < self.n_traced)
+
+    def traced_runs(self, first_run, n_runs):
+        """Number of runs among first_run..first_run+n_runs-1 that record daily fields."""
+        if not self.fields:
+            return 0
+        if self.n_traced is None:
+            return n_runs
+        return max(0, min(first_run + n_runs, self.n_traced) - first_run)
+
+    def rows_per_run(self, max_days=MISSION_DURATION):
+        """Maximum recorded rows of one run."""
+        if not self.decimates:
+            return max_days
+        windows = -(-max_days // self.every)
+        return 2 * windows if self.reduce == "minmax" else windows + 1
+
+
+RECORD_ALL = RecordingPolicy()
+RECORD_NONE = RecordingPolicy(fields=())
+
+
+def reduce_history(history, day_ended, every, reduce="sample"):
+    """
+    Decimates the daily values of several runs (see RecordingPolicy).
+
+    Args:
+        history (dict): Field -> (days, n) array, valid up to each run's day ended.
+        day_ended (np.ndarray): Days recorded for each run.
+        every (int): Days per window.
+        reduce (str): 'sample' or 'minmax'.
+
+    Returns:
+        tuple: (day column, field -> column, rows of each run), rows in run-major order
+    """
+    day_ended = np.asarray(day_ended)
+    n_days = len(next(iter(history.values())))
+    days = np.arange(1, n_days + 1)
+
+    if reduce == "sample":
+        keep = (days[None, :] <= day_ended[:, None]) & ((days[None, :] % every == 0) | (days[None, :] == day_ended[:, None]))
+        columns = {field: values.T[keep] for field, values in history.items()}
+        return np.broadcast_to(days, keep.shape)[keep], columns, keep.sum(axis=1)
+
+    # Windows of `every` days (the last one padded): (window, day in window, run)
+    n_windows = -(-n_days // every)
+    window_days = np.arange(1, n_windows * every + 1).reshape(n_windows, every)
+    valid = window_days[:, :, None] <= day_ended[None, None, :]
+    # A window is recorded if its first day is; (run, window, min/max) in row order
+    keep = np.repeat(valid[:, 0, :].T[:, :, None], 2, axis=2)
+
+    columns = {}
+    for field, values in history.items():
+        padded = np.zeros((n_windows * every, len(day_ended)))
+        padded[:n_days] = values
+        padded = padded.reshape(n_windows, every, -1)
+        low_day = np.where(valid, padded, np.inf).argmin(axis=1)
+        high_day = np.where(valid, padded, -np.inf).argmax(axis=1)
+        low = np.take_along_axis(padded, low_day[:, None, :], axis=1)[:, 0, :]
+        high = np.take_along_axis(padded, high_day[:, None, :], axis=1)[:, 0, :]
+        # Extremes in the order they occurred (a falling window goes max -> min)
+        falling = high_day < low_day
+        first, second = np.where(falling, high, low), np.where(falling, low, high)
+        columns[field] = np.stack([first.T, second.T], axis=2)[keep]
+
+    first_day = window_days[:, 0]
+    last_day = np.minimum(window_days[:, -1][None, :], day_ended[:, None])
+    day_column = np.stack([np.broadcast_to(first_day, last_day.shape), last_day], axis=2)[keep]
+    return day_column, columns, keep.sum(axis=(1, 2))
+
+
+# ==========================================
+# EVENT LOG
+# ==========================================
+
+class EventLog:
+    """
+    Discrete events of many runs (RecordingPolicy(events=True)): storm start/end, machine
+    failures and repairs, crop death. Events are rare, so they are appended to a list and
+    only turned into columns on export.
+    """
+    def __init__(self):
+        self._rows = [] # (run_id, day, kind code, machine index or -1)
+
+    def add(self, run_id, day, kind, machine=-1):
+        self._rows.append((run_id, day, EVENT_KINDS.index(kind), machine))
+
+    def extend(self, other):
+        self._rows.extend(other._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def select(self, run_ids):
+        """New log with the events of these runs only."""
+        keep = set(int(run_id) for run_id in run_ids)
+        log = EventLog()
+        log._rows = [row for row in self._rows if row[0] in keep]
+        return log
+
+    def to_arrays(self):
+        """Columns 'run_id', 'day', 'kind' (code into EVENT_KINDS), 'machine'; inverse of from_arrays()."""
+        rows = np.array(self._rows, dtype=np.int64).reshape(-1, 4)
+        return {
+            'run_id': rows[:, 0],
+            'day': rows[:, 1].astype(np.int16),
+            'kind': rows[:, 2].astype(np.int8),
+            'machine': rows[:, 3].astype(np.int16),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        log = cls()
+        log._rows = list(zip(*(np.asarray(arrays[name]).tolist() for name in ('run_id', 'day', 'kind', 'machine'))))
+        return log
+
+    def to_frame(self):
+        """One row per event. Columns: Run_ID, Day, Event, Machine (-1 for storms and crops)."""
+        import pandas as pd
+        arrays = self.to_arrays()
+        return pd.DataFrame({
+            "Run_ID": arrays['run_id'],
+            "Day": arrays['day'],
+            "Event": np.asarray(EVENT_KINDS, dtype=object)[arrays['kind']],
+            "Machine": arrays['machine'],
+        })
+
+
+# ==========================================
+# TRACE RECORDER
+# ==========================================
+
+class RunTrace:
+    """
+    Zero-copy view of one run inside a TraceRecorder.
+    Indexing by field name returns a NumPy slice of the recorder's column.
+    """
+    def __init__(self, recorder, index):
+        self.recorder = recorder
+        self.run_id = recorder.run_ids[index]
+        self.start = recorder.offsets[index]
+        self.stop = recorder.offsets[index + 1]
+
+    def __getitem__(self, field):
+        return self.recorder.columns[field][self.start:self.stop]
+
+    def __len__(self):
+        return int(self.stop - self.start)
+
+    def to_frame(self):
+        """Copies this run into a DataFrame (same layout as the old per-run history)."""
+        import pandas as pd
+        df = pd.DataFrame({field: self[field] for field in self.recorder.columns})
+        df['Run_ID'] = self.run_id
+        return df
+
+
+class TraceRecorder:
+    """
+    Daily traces of many runs, written straight into preallocated typed arrays.
+    Runs are stored back to back; offsets[i]:offsets[i+1] is the slice of run i.
+
+    Behaves like a list of runs for plotting: len(traces), traces[i]['o2'].
+
+    A RecordingPolicy decides which fields and runs are kept (and how decimated): only
+    these columns are allocated, and runs without a trace have an empty slice.
+    """
+    def __init__(self, n_runs, max_days=MISSION_DURATION, policy=None, first_run=0):
+        """
+        Args:
+            n_runs (int): Maximum number of runs to store.
+            max_days (int): Maximum recorded days per run.
+            policy (RecordingPolicy, optional): What runs record (default: RECORD_ALL).
+            first_run (int): Run_ID of the first run (runs traced under policy.n_traced).
+        """
+        self.policy = policy if policy is not None else RECORD_ALL
+        fields = ('day',) + self.policy.fields if self.policy.fields else ()
+        capacity = self.policy.traced_runs(first_run, n_runs) * self.policy.rows_per_run(max_days)
+        self.columns = {field: np.empty(capacity, dtype=TRACE_COLUMNS[field]) for field in fields}
+        self.offsets = np.zeros(n_runs + 1, dtype=np.int64)
+        self.run_ids = np.empty(n_runs, dtype=np.int64)
+        self.events = EventLog() if self.policy.events else None
+        self.n_runs = 0
+        self._row = 0
+
+        # Day buffer of a decimating policy (reduced into the columns at end_run())
+        self._buffer = None
+        self._buffer_row = 0
+        if self.policy.decimates:
+            # Days of a run are consecutive: only the values are buffered
+            fields = self.policy.fields
+            self._buffer = {field: np.empty(max_days, dtype=TRACE_COLUMNS[field]) for field in fields}
+            self.record = self._record_buffered
+        elif self.policy.fields != TRACE_FIELDS:
+            self.record = self._record_selected
+        # Positions of the kept fields among the record() arguments
+        positions = {field: index for index, field in enumerate(('day',) + TRACE_FIELDS)}
+        self._positions = [(field, positions[field]) for field in fields]
+
+    @classmethod
+    def from_arrays(cls, columns, offsets, run_ids, events=None):
+        """
+        Wraps existing arrays (e.g. memory-mapped from disk) without copying them.
+
+        Args:
+            columns (dict): Field -> 1D array of all recorded days.
+            offsets (np.ndarray): Run offsets (n_runs + 1 entries).
+            run_ids (np.ndarray): Run_ID of each run.
+            events (EventLog, optional): Events of the runs.
+        """
+        recorder = cls.__new__(cls)
+        recorder.policy = None
+        recorder.columns = dict(columns)
+        recorder.offsets = offsets
+        recorder.run_ids = run_ids
+        recorder.events = events
+        recorder.n_runs = len(run_ids)
+        recorder._row = int(offsets[-1])
+        recorder._buffer = None
+        return recorder
+
+    # --- Writing ---
+
+    def start_run(self, run_id):
+        self.run_ids[self.n_runs] = run_id
+
+    def record(self, day, o2, water, waste_water, food, crop_health, battery, storm):
+        """Appends one day of the current run (every field, see RecordingPolicy for the others)."""
+        row = self._row
+        columns = self.columns
+        columns['day'][row] = day
+        columns['o2'][row] = o2
+        columns['water'][row] = water
+        columns['waste_water'][row] = waste_water
+        columns['food'][row] = food
+        columns['crop_health'][row] = crop_health
+        columns['battery'][row] = battery
+        columns['storm'][row] = storm
+        self._row = row + 1
+
+    def _record_selected(self, *values):
+        """record() of a policy keeping some of the fields."""
+        row = self._row
+        columns = self.columns
+        for field, position in self._positions:
+            columns[field][row] = values[position]
+        self._row = row + 1
+
+    def _record_buffered(self, *values):
+        """record() of a decimating policy: days are buffered until end_run()."""
+        row = self._buffer_row
+        buffer = self._buffer
+        for field, position in self._positions:
+            buffer[field][row] = values[position]
+        self._buffer_row = row + 1
+
+    def end_run(self):
+        if self._buffer is not None and self._buffer_row:
+            n_days = self._buffer_row
+            history = {field: values[:n_days, None] for field, values in self._buffer.items()}
+            days, columns, rows = reduce_history(history, [n_days], self.policy.every, self.policy.reduce)
+            self._write_rows(days, columns, int(rows[0]))
+            self._buffer_row = 0
+        self.n_runs += 1
+        self.offsets[self.n_runs] = self._row
+
+    def _write_rows(self, days, columns, rows):
+        start = self._row
+        self.columns['day'][start:start + rows] = days
+        for field, values in columns.items():
+            self.columns[field][start:start + rows] = values
+        self._row = start + rows
+
+    def add_batch(self, run_ids, day_ended, history):
+        """
+        Appends runs from BatchMarsColony.run_mission(), as recorded under this recorder's policy.
+
+        Args:
+            run_ids (np.ndarray): Run_ID of each colony.
+            day_ended (np.ndarray): Days recorded for each colony.
+            history (dict): Field -> (days, n) array (at least the policy's fields; None if it has none).
+        """
+        n = len(run_ids)
+        policy = self.policy
+        traced = np.array([policy.traces(run_id) for run_id in run_ids], dtype=bool)
+        rows = np.zeros(n, dtype=np.int64)
+        start = self._row
+        if traced.any():
+            history = {field: history[field][:, traced] for field in policy.fields}
+            if policy.decimates:
+                days, columns, rows[traced] = reduce_history(history, day_ended[traced], policy.every, policy.reduce)
+            else:
+                all_days = np.arange(1, MISSION_DURATION + 1)
+                # (n, days) mask of valid entries, in run-major order
+                valid = all_days[None, :] <= day_ended[traced][:, None]
+                days = np.broadcast_to(all_days, valid.shape)[valid]
+                columns = {field: values.T[valid] for field, values in history.items()}
+                rows[traced] = day_ended[traced]
+            self._write_rows(days, columns, int(rows.sum()))
+
+        self.run_ids[self.n_runs:self.n_runs + n] = run_ids
+        self.offsets[self.n_runs + 1:self.n_runs + n + 1] = start + np.cumsum(rows)
+        self.n_runs += n
+
+    def extend(self, other):
+        """Appends every run of another recorder (e.g. one returned by a worker)."""
+        rows = other._row
+        start = self._row
+        for field, column in self.columns.items():
+            column[start:start + rows] = other.columns[field][:rows]
+
+        n = other.n_runs
+        self.run_ids[self.n_runs:self.n_runs + n] = other.run_ids[:n]
+        self.offsets[self.n_runs + 1:self.n_runs + n + 1] = start + other.offsets[1:n + 1]
+        self.n_runs += n
+        self._row = start + rows
+        if self.events is not None and other.events is not None:
+            self.events.extend(other.events)
+
+    def trim(self):
+        """Releases unused capacity (e.g. before sending the recorder to another process)."""
+        self.columns = {field: column[:self._row].copy() for field, column in self.columns.items()}
+        self.offsets = self.offsets[:self.n_runs + 1].copy()
+        self.run_ids = self.run_ids[:self.n_runs].copy()
+        return self
+
+    # --- Reading ---
+
+    def __len__(self):
+        return self.n_runs
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.n_runs
+        if not 0 <= index < self.n_runs:
+            raise IndexError(f"Run index {index} out of range ({self.n_runs} runs)")
+        return RunTrace(self, index)
+
+    def __iter__(self):
+        for i in range(self.n_runs):
+            yield RunTrace(self, i)
+
+    def head(self, n):
+        """Zero-copy recorder over the first n runs."""
+        n = min(n, self.n_runs)
+        rows = int(self.offsets[n])
+        events = self.events.select(self.run_ids[:n]) if self.events is not None else None
+        return TraceRecorder.from_arrays(
+            {field: column[:rows] for field, column in self.columns.items()},
+            self.offsets[:n + 1], self.run_ids[:n], events
+        )
+
+    def run_lengths(self):
+        return np.diff(self.offsets[:self.n_runs + 1])
+
+    def to_frame(self):
+        """Single long-form table of every recorded day, with a Run_ID column."""
+        import pandas as pd
+        df = pd.DataFrame({field: column[:self._row] for field, column in self.columns.items()})
+        df['Run_ID'] = np.repeat(self.run_ids[:self.n_runs], self.run_lengths())
+        return df
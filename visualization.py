@@ -1,142 +1,375 @@
-import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
 import textwrap
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from config import MISSION_DURATION
+from stats import deaths_per_day, kaplan_meier, bootstrap_survival
+from traces import RecordingPolicy
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
+# Default figure directory (created by the first saved figure)
 output_dir = os.path.join(script_dir, 'results')
-os.makedirs(output_dir, exist_ok=True)
 
-def plot_survival_curves(df_results):
+# matplotlib and pandas are imported by the functions that draw / tabulate, so importing this
+# module (e.g. for trace_policy() in a compute-only run) stays cheap
+
+# Each plot is split in two steps:
+# - prepare: reduce the results to the few arrays that are drawn (vectorized, in this process)
+# - render: draw them on a standalone Figure, rendered by Agg when saved (headless, no pyplot
+#   state), so independent figures can be rendered in parallel processes (see plot_report())
+
+# Sample runs drawn per group in the trace plots
+N_SAMPLE_TRACES = 30
+
+# Grid of the trace density heatmaps (value bins; one column per day)
+DENSITY_BINS = 100
+
+# Fields drawn by the trace plots of plot_report(), per experiment
+TRACE_PLOT_FIELDS = {
+    "CONTROL": ('o2', 'battery'),
+    "OXYGENATOR_REDUNDANCY_TEST": ('o2',),
+    "BATTERY_TEST": ('battery',),
+}
+
+
+def _is_accumulators(results):
+    """True if results are ExperimentAccumulators (list or dict) rather than a summary DataFrame."""
+    return isinstance(results, (list, tuple, dict))
+
+
+def _accumulator_list(results):
+    return list(results.values()) if isinstance(results, dict) else list(results)
+
+
+def _save(fig, filename, directory=None):
+    directory = directory if directory is not None else output_dir
+    os.makedirs(directory, exist_ok=True)
+    fig.savefig(os.path.join(directory, filename))
+    print(f"Saved: {filename}")
+
+
+# ==========================================
+# SURVIVAL CURVES
+# ==========================================
+
+def prepare_survival_curves(df_results, confidence=0.95, band="greenwood", n_resamples=2000, seed=None):
     """
-    Shows the % of colonies still alive at each day (0-500).
-    Shows 'When' they die, not just 'If' they die.
+    Kaplan-Meier curve (%) and pointwise confidence band of every experiment.
+
+    Args:
+        band (str): 'greenwood' (analytic) or 'bootstrap' (percentile band of n_resamples
+            resamples, see stats.bootstrap_survival).
+
+    Returns:
+        list: (name, survival, lower, upper) per experiment, arrays over days 0..MISSION_DURATION
     """
-    plt.figure(figsize=(10, 6))
-    
-    experiments = df_results['Experiment'].unique()
-    
-    for exp in experiments:
-        subset = df_results[df_results['Experiment'] == exp]
-        
-        # Sort by day ended to calculate drop-off
-        dead_days = subset[subset['Survived'] == False]['Day_Ended'].sort_values()
-        
-        # Create X (Days) and Y (Survival %) coordinates
-        x_vals = range(501)
-        y_vals = []
-        
-        total_runs = len(subset)
-        current_alive = total_runs
-        
-        for day in x_vals:
-            # Subtract deaths that happened on this specific day
-            deaths_today = (dead_days == day).sum()
-            current_alive -= deaths_today
-            y_vals.append((current_alive / total_runs) * 100)
-            
-        plt.plot(x_vals, y_vals, label=exp, linewidth=2.5)
-
-    plt.title("Colony Survival Rate Over Time", fontsize=14)
-    plt.xlabel("Mission Day")
-    plt.ylabel("Survival Probability (%)")
-    plt.grid(True, alpha=0.3)
-    plt.legend()
-    plt.savefig(os.path.join(output_dir, "plot_survival_curves.png"))
-    print("Saved: plot_survival_curves.png")
+    if band not in ("greenwood", "bootstrap"):
+        raise ValueError(f"Unknown survival band: {band}")
+    rng = np.random.default_rng(seed)
 
+    def estimate(deaths, n_runs):
+        if band == "bootstrap":
+            return bootstrap_survival(deaths, n_runs, n_resamples, confidence, rng)
+        return kaplan_meier(deaths, n_runs, confidence)
 
-def plot_failure_analysis(df_results):
+    curves = []
+    if _is_accumulators(df_results):
+        for accumulator in _accumulator_list(df_results):
+            survival, low, high = estimate(accumulator.deaths_by_day, accumulator.n_runs)
+            curves.append((accumulator.name, survival * 100, low * 100, high * 100))
+        return curves
+
+    experiment = df_results['Experiment'].to_numpy()
+    survived = df_results['Survived'].to_numpy(dtype=bool)
+    day_ended = df_results['Day_Ended'].to_numpy()
+    for exp in df_results['Experiment'].unique():
+        mask = experiment == exp
+        deaths = deaths_per_day(day_ended[mask], survived[mask], MISSION_DURATION)
+        survival, low, high = estimate(deaths, int(mask.sum()))
+        curves.append((exp, survival * 100, low * 100, high * 100))
+    return curves
+
+
+def render_survival_curves(curves, directory=None):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    for name, survival, low, high in curves:
+        days = np.arange(len(survival))
+        line, = ax.plot(days, survival, label=name, linewidth=2.5)
+        ax.fill_between(days, low, high, color=line.get_color(), alpha=0.15, linewidth=0)
+
+    ax.set_title("Colony Survival Rate Over Time", fontsize=14)
+    ax.set_xlabel("Mission Day")
+    ax.set_ylabel("Survival Probability (%)")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    _save(fig, "plot_survival_curves.png", directory)
+
+
+def plot_survival_curves(df_results, band="greenwood"):
     """
-    Stacked Bar Chart of Failure Causes
-    Shows breakdown of 'How' colonies died per experiment.
+    Shows the % of colonies still alive at each day (0-500), with a 95% confidence band
+    ('greenwood' or 'bootstrap', see prepare_survival_curves()).
+    Shows 'When' they die, not just 'If' they die.
+    df_results can also be a list/dict of ExperimentAccumulators.
     """
-    # Pivot data to get counts of each Cause per Experiment
-    breakdown = df_results.groupby(['Experiment', 'Cause'], observed=True).size().unstack(fill_value=0)
-    
+    render_survival_curves(prepare_survival_curves(df_results, band=band))
+
+
+# ==========================================
+# FAILURE MODES
+# ==========================================
+
+def prepare_failure_analysis(df_results):
+    """Percentage of runs per experiment (rows) and cause (columns, '' = survived)."""
+    import pandas as pd
+
+    if _is_accumulators(df_results):
+        # Same table as the groupby below (survivors have an empty Cause)
+        breakdown = pd.DataFrame({
+            accumulator.name: {'': accumulator.n_survived, **accumulator.cause_counts}
+            for accumulator in _accumulator_list(df_results)
+        }).T.fillna(0)
+        breakdown = breakdown[sorted(breakdown.columns)]
+    else:
+        # Pivot data to get counts of each Cause per Experiment
+        breakdown = df_results.groupby(['Experiment', 'Cause'], observed=True).size().unstack(fill_value=0)
+
     # Convert to percentages for fair comparison
-    breakdown_pct = breakdown.div(breakdown.sum(axis=1), axis=0) * 100
-    
-    # Plot
-    ax = breakdown_pct.plot(kind='bar', stacked=True, figsize=(10, 6), colormap='viridis')
+    return breakdown.div(breakdown.sum(axis=1), axis=0) * 100
+
+
+def render_failure_analysis(breakdown_pct, directory=None):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    breakdown_pct.plot(kind='bar', stacked=True, ax=ax, colormap='viridis')
 
     # Wrap x-axis labels
     max_width = 15
-    new_labels = [textwrap.fill(label.get_text(), max_width) for label in ax.get_xticklabels()]
+    new_labels = [textwrap.fill(str(label), max_width) for label in breakdown_pct.index]
+    ax.set_xticks(range(len(new_labels)))
     ax.set_xticklabels(new_labels, rotation=0)
-    
-    plt.title("Failure Mode Analysis (Cause of Death)", fontsize=14)
-    plt.ylabel("Percentage of Runs (%)")
-    plt.xlabel("Experiment Configuration")
-    plt.legend(title="Cause", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "plot_failure_modes.png"))
-    print("Saved: plot_failure_modes.png")
 
+    ax.set_title("Failure Mode Analysis (Cause of Death)", fontsize=14)
+    ax.set_ylabel("Percentage of Runs (%)")
+    ax.set_xlabel("Experiment Configuration")
+    ax.legend(title="Cause", bbox_to_anchor=(1.05, 1), loc='upper left')
+    fig.tight_layout()
+    _save(fig, "plot_failure_modes.png", directory)
 
-def plot_redundancy_validation(control_traces, redundancy_traces):
+
+def plot_failure_analysis(df_results):
     """
-    Oxygen Stability Trace.
-    Overlays 20 random runs of Control vs Redundancy.
-    Visualizes how redundancy smooths out oxygen dips.
+    Stacked Bar Chart of Failure Causes
+    Shows breakdown of 'How' colonies died per experiment.
+    df_results can also be a list/dict of ExperimentAccumulators.
+    """
+    render_failure_analysis(prepare_failure_analysis(df_results))
+
+
+# ==========================================
+# RESOURCE TRACES
+# ==========================================
+
+def trace_policy(experiment_mode, density=False, every=1):
+    """
+    Cheapest RecordingPolicy for what plot_report() draws of an experiment (pass it to
+    run_experiment(record=...)): the plotted fields of the first N_SAMPLE_TRACES runs (of every
+    run with density=True), and nothing but the summary for the other experiments.
+
+    Args:
+        experiment_mode (str): MCSimConfig mode.
+        density (bool): The trace plots will include density heatmaps.
+        every (int): Days per recorded window. Windows keep their min and max, so dips to
+            zero still show.
     """
-    plt.figure(figsize=(12, 6))
-    
-    # Plot 30 random traces from Control (Red)
-    # These will look like "Cliffs" - steady, then plummeting to death.
-    for i in range(min(30, len(control_traces))):
-        # Only plot if they actually died of suffocation or survived to show the contrast
-        plt.plot(control_traces[i]['o2'], color='red', alpha=0.20, linewidth=1.5)
+    fields = TRACE_PLOT_FIELDS.get(experiment_mode, ())
+    return RecordingPolicy(fields, every=every, reduce="minmax", n_traced=None if density else N_SAMPLE_TRACES)
+
+
+def prepare_traces(traces, field, n_samples=N_SAMPLE_TRACES, density=False, upper=None):
+    """
+    Reduces the traces of one group to what the trace plots draw.
+
+    Args:
+        traces: TraceRecorder, list of per-run DataFrames, or ExperimentAccumulator.
+        field (str): Recorded field ('o2', 'battery'...).
+        n_samples (int): Sample runs drawn as lines (the first n runs).
+        density (bool): Also build a (value, day) histogram of every recorded day of every run.
+        upper (float, optional): Top of the density value range (default: largest value).
+
+    Returns:
+        dict: 'lines' (list of (day index, value) arrays), 'band' ((low, mean, high) for
+            accumulators), 'density' ((counts, value edges) or None)
+    """
+    if hasattr(traces, 'band'):
+        return {'lines': [], 'band': traces.band(field), 'density': None}
+
+    # Days come from the trace: decimated traces do not have one row per day
+    n = min(n_samples, len(traces))
+    lines = [np.column_stack([np.asarray(traces[i]['day'], dtype=np.float64) - 1,
+                              np.asarray(traces[i][field], dtype=np.float64)])
+             for i in range(n)]
+    lines = [line for line in lines if len(line)]
 
-    # Plot 30 random traces from Redundancy (Green)
-    # These will look like "Dips" - dropping slightly when 1 machine breaks, then recovering.
-    for i in range(min(30, len(redundancy_traces))):
-        plt.plot(redundancy_traces[i]['o2'], color='green', alpha=0.20, linewidth=1.5)
+    histogram = None
+    if density and lines:
+        if hasattr(traces, 'columns'):
+            rows = int(traces.offsets[traces.n_runs])
+            days = traces.columns['day'][:rows].astype(np.int64) - 1
+            values = traces.columns[field][:rows].astype(np.float64)
+        else:
+            days = np.concatenate([np.asarray(trace['day'], dtype=np.int64) - 1 for trace in traces])
+            values = np.concatenate([np.asarray(trace[field], dtype=np.float64) for trace in traces])
+        top = upper if upper is not None else max(float(values.max()), 1e-9)
+        low = min(0.0, float(values.min()))
+        edges = np.linspace(low, top, DENSITY_BINS + 1)
+        bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, DENSITY_BINS - 1)
+        counts = np.bincount(days * DENSITY_BINS + bins, minlength=MISSION_DURATION * DENSITY_BINS)
+        histogram = (counts.reshape(MISSION_DURATION, DENSITY_BINS).T, edges)
+    return {'lines': lines, 'band': None, 'density': histogram}
+
+
+def _draw_group(ax, group, color, linewidth=1.5, cmap=None):
+    """Draws one prepared group: density heatmap, mean + 5-95% band, and/or sample lines."""
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import LogNorm
+
+    if group['density'] is not None:
+        counts, edges = group['density']
+        masked = np.ma.masked_equal(counts, 0)
+        # Log scale: the rare low excursions stay visible next to the bulk of the runs
+        ax.pcolormesh(np.arange(MISSION_DURATION + 1) - 0.5, edges, masked,
+                      cmap=cmap, norm=LogNorm(), alpha=0.6, shading='flat')
+    if group['band'] is not None:
+        low, mean, high = group['band']
+        days = np.arange(len(mean))
+        ax.fill_between(days, low, high, color=color, alpha=0.15, linewidth=0)
+        ax.plot(days, mean, color=color, linewidth=2.0)
+    if group['lines']:
+        # All sample runs in a single artist
+        ax.add_collection(LineCollection(group['lines'], colors=color, alpha=0.20, linewidths=linewidth))
+        ax.autoscale_view()
+
+
+def render_redundancy_validation(control, redundancy, directory=None):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+
+    # Control (Red): "Cliffs" - steady, then plummeting to death.
+    _draw_group(ax, control, 'red', cmap='Reds')
+    # Redundancy (Green): "Dips" - dropping slightly when 1 machine breaks, then recovering.
+    _draw_group(ax, redundancy, 'green', cmap='Greens')
 
     # Threshold Line
-    plt.axhline(y=0, color='black', linestyle='--', linewidth=1, label='Death Threshold')
+    ax.axhline(y=0, color='black', linestyle='--', linewidth=1, label='Death Threshold')
 
     # Legend & Labels
-    plt.plot([], [], color='red', label='Control (1 Big Machine)')
-    plt.plot([], [], color='green', label='Redundancy (3 Small Machines)')
-    
-    plt.title("Oxygen Buffer Stability", fontsize=14)
-    plt.xlabel("Mission Day")
-    plt.ylabel("Oxygen Reserves (kg)")
-    plt.legend(loc='upper right')
-    plt.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "plot_o2_redundancy.png"))
-    print("Saved: plot_o2_redundancy.png")
-
-
-def plot_battery_stability(control_traces, battery_traces):
+    ax.plot([], [], color='red', label='Control (1 Big Machine)')
+    ax.plot([], [], color='green', label='Redundancy (3 Small Machines)')
+
+    ax.set_title("Oxygen Buffer Stability", fontsize=14)
+    ax.set_xlabel("Mission Day")
+    ax.set_ylabel("Oxygen Reserves (kg)")
+    ax.legend(loc='upper right')
+    ax.grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    _save(fig, "plot_o2_redundancy.png", directory)
+
+
+def plot_redundancy_validation(control_traces, redundancy_traces, density=False):
+    """
+    Oxygen Stability Trace.
+    Overlays 30 runs of Control vs Redundancy.
+    Visualizes how redundancy smooths out oxygen dips.
+    Traces can be a TraceRecorder or a list of per-run DataFrames.
+    ExperimentAccumulators are drawn as a mean line with a 5-95% band instead.
+    With density=True every run is also shown as a per-day density heatmap.
+    """
+    render_redundancy_validation(prepare_traces(control_traces, 'o2', density=density),
+                                 prepare_traces(redundancy_traces, 'o2', density=density))
+
+
+def render_battery_stability(control, battery, directory=None):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+
+    # Control (Red): the volatility of the small battery
+    _draw_group(ax, control, 'red', linewidth=1.0, cmap='Reds')
+    # Battery Test (Blue): the stability of the large battery
+    _draw_group(ax, battery, 'blue', linewidth=1.0, cmap='Blues')
+
+    # Dummy lines for legend
+    ax.plot([], [], color='red', label='Control (Low Capacity)')
+    ax.plot([], [], color='blue', label='Battery Test (High Capacity)')
+
+    ax.set_title("Battery Buffer Stability During Storms (Sample Traces)", fontsize=14)
+    ax.set_xlabel("Mission Day")
+    ax.set_ylabel("Battery Charge (kWh)")
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    _save(fig, "plot_battery_traces.png", directory)
+
+
+def plot_battery_stability(control_traces, battery_traces, density=False):
     """
     Resource Trace.
-    Overlays 20 random runs of Control vs Battery Test.
+    Overlays 30 runs of Control vs Battery Test.
     Visualizes how the 'Buffer' strategy smooths out the storms.
+    Traces can be a TraceRecorder or a list of per-run DataFrames.
+    ExperimentAccumulators are drawn as a mean line with a 5-95% band instead.
+    With density=True every run is also shown as a per-day density heatmap.
     """
-    plt.figure(figsize=(12, 6))
-    
-    # Plot 30 random traces from Control (Red)
-    # This shows the volatility of the small battery
-    for i in range(min(30, len(control_traces))):
-        plt.plot(control_traces[i]['battery'], color='red', alpha=0.20)
-        
-    # Plot 30 random traces from Battery Test (Blue)
-    # This shows the stability of the large battery
-    for i in range(min(30, len(battery_traces))):
-        plt.plot(battery_traces[i]['battery'], color='blue', alpha=0.20)
-        
-    # Dummy lines for legend
-    plt.plot([], [], color='red', label='Control (Low Capacity)')
-    plt.plot([], [], color='blue', label='Battery Test (High Capacity)')
-
-    plt.title("Battery Buffer Stability During Storms (Sample Traces)", fontsize=14)
-    plt.xlabel("Mission Day")
-    plt.ylabel("Battery Charge (kWh)")
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.savefig(os.path.join(output_dir, "plot_battery_traces.png"))
-    print("Saved: plot_battery_traces.png")
\ No newline at end of file
+    render_battery_stability(prepare_traces(control_traces, 'battery', density=density),
+                             prepare_traces(battery_traces, 'battery', density=density))
+
+
+# ==========================================
+# FULL REPORT
+# ==========================================
+
+def plot_report(df_results, control_traces, redundancy_traces, battery_traces, n_workers=1, density=False,
+                survival_band="greenwood", directory=None):
+    """
+    Renders the four standard figures. The data is reduced here, then the independent
+    figures are rendered in parallel when n_workers > 1 (only the reduced arrays are
+    sent to the workers).
+
+    Args:
+        df_results: Summary DataFrame of every experiment (or list/dict of accumulators).
+        control_traces, redundancy_traces, battery_traces: Traces (or accumulators) of
+            CONTROL, OXYGENATOR_REDUNDANCY_TEST and BATTERY_TEST.
+        n_workers (int): Rendering processes.
+        density (bool): Add density heatmaps to the trace plots.
+        survival_band (str): Confidence band of the survival curves ('greenwood' or 'bootstrap').
+        directory (str, optional): Figure directory (default: output_dir).
+    """
+    directory = directory if directory is not None else output_dir
+    jobs = [
+        (render_survival_curves, (prepare_survival_curves(df_results, band=survival_band),)),
+        (render_failure_analysis, (prepare_failure_analysis(df_results),)),
+        (render_redundancy_validation, (prepare_traces(control_traces, 'o2', density=density),
+                                        prepare_traces(redundancy_traces, 'o2', density=density))),
+        (render_battery_stability, (prepare_traces(control_traces, 'battery', density=density),
+                                    prepare_traces(battery_traces, 'battery', density=density))),
+    ]
+
+    if n_workers <= 1:
+        for render, args in jobs:
+            render(*args, directory=directory)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as pool:
+        futures = [pool.submit(render, *args, directory=directory) for render, args in jobs]
+        for future in futures:
+            future.result()